@@ -3,23 +3,30 @@ FisherMate.AI Backend - Main Flask Application
 Multilingual Fisherfolk Chatbot System
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
-import google.generativeai as genai
 import os
+import gc
+import copy
+import hmac
+import time
+import threading
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from datetime import datetime
 import json
 
 # Import custom modules
-from modules.language_processor import LanguageProcessor
-from modules.weather_service import WeatherService
-from modules.legal_info import LegalInfoService
-from modules.safety_guide import SafetyGuideService
-from modules.voice_handler import VoiceHandler
-from modules.whatsapp_handler import WhatsAppHandler
-from modules.sms_handler import SMSHandler
+from modules.service_registry import ServiceRegistry
+from modules.bulkhead import bulkhead, get_bulkhead_stats
+from modules.response_cache import PrecomputedResponseCache
+from modules.compression import ResponseCompressor, negotiate as negotiate_encoding
+from modules.compact_format import MIMETYPE as COMPACT_MIMETYPE, pack as pack_compact, wants_compact
+from modules.serialization import FastJSONProvider, dumps as dump_json, BACKEND as JSON_BACKEND
+from modules.metrics import RequestMetrics, registry as metrics_registry
+from modules.profiler import SamplingProfiler, ProfilerBusyError, to_collapsed
+from modules.session_store import expiry_ticker
 
 # Load environment variables
 load_dotenv()
@@ -30,20 +37,110 @@ logger = logging.getLogger(__name__)
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)
+# Registered before the compressor so the timing covers compression too
+request_metrics = RequestMetrics(app)
+compressor = ResponseCompressor(app)
 
-# Configure Google Gemini
-genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
-model = genai.GenerativeModel('gemini-pro')
+def build_gemini_model(genai):
+    """Configure Google Gemini"""
+    genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
+    return genai.GenerativeModel('gemini-pro')
 
-# Initialize services
-language_processor = LanguageProcessor()
-weather_service = WeatherService()
-legal_info_service = LegalInfoService()
-safety_guide_service = SafetyGuideService()
-voice_handler = VoiceHandler()
-whatsapp_handler = WhatsAppHandler()
-sms_handler = SMSHandler()
+def build_sms_handler(sms):
+    """SMS commands answer from the shared weather cache and legal data"""
+    return sms.SMSHandler(services.get('weather_service'), services.get('legal_info_service'))
+
+def build_whatsapp_handler(whatsapp):
+    """Voice notes are answered by the chat pipeline"""
+    return whatsapp.WhatsAppHandler(services.get('voice_handler'), process_chat_message)
+
+def build_alert_pipeline(alerts):
+    """Wire weather readings to SMS/WhatsApp area alerts"""
+    return alerts.create_alert_pipeline(
+        services.get('weather_service'), services.get('sms_handler'), services.get('whatsapp_handler')
+    )
+
+# Services are imported and constructed on first use; see PRELOAD_SERVICES
+services = ServiceRegistry()
+services.register('gemini_model', 'google.generativeai', factory=build_gemini_model)
+services.register('language_processor', 'modules.language_processor', 'LanguageProcessor')
+services.register('weather_service', 'modules.weather_service', 'WeatherService')
+services.register('legal_info_service', 'modules.legal_info', 'LegalInfoService')
+services.register('safety_guide_service', 'modules.safety_guide', 'SafetyGuideService')
+services.register('voice_handler', 'modules.voice_handler', 'VoiceHandler')
+services.register('whatsapp_handler', 'modules.whatsapp_handler', factory=build_whatsapp_handler)
+services.register('sms_handler', 'modules.sms_handler', factory=build_sms_handler)
+services.register('alert_pipeline', 'modules.alerts', factory=build_alert_pipeline)
+
+model = services.proxy('gemini_model')
+language_processor = services.proxy('language_processor')
+weather_service = services.proxy('weather_service')
+legal_info_service = services.proxy('legal_info_service')
+safety_guide_service = services.proxy('safety_guide_service')
+voice_handler = services.proxy('voice_handler')
+whatsapp_handler = services.proxy('whatsapp_handler')
+sms_handler = services.proxy('sms_handler')
+alert_pipeline = services.proxy('alert_pipeline')
+
+if os.getenv('PRELOAD_SERVICES', 'false').lower() == 'true':
+    # Under gunicorn --preload this runs once in the master; freezing the
+    # loaded objects keeps the GC from dirtying pages shared with workers
+    services.preload()
+    gc.freeze()
+
+# Background threads run in serving workers only, never at import: under
+# PRELOAD_SERVICES the app is imported in the gunicorn master, and threads
+# started there would send Twilio traffic alongside the workers'
+_background_lock = threading.Lock()
+_background_pid = None
+
+def start_background_work():
+    """Resume interrupted broadcasts, start session expiry, the webhook queue and the alert monitor; once per worker process
+
+    gunicorn.conf.py calls this as each worker starts; under other servers
+    the first request does. Services not built yet do it on first use.
+    """
+    global _background_pid
+    with _background_lock:
+        if _background_pid == os.getpid():
+            return
+        _background_pid = os.getpid()
+    # Stores registered later start expiring as they are built
+    expiry_ticker.start()
+    if os.getenv('ALERT_MONITOR', 'false').lower() == 'true':
+        # Re-read subscribed tiles periodically and alert on safety changes
+        alert_pipeline.start()
+    for name in ('sms_handler', 'whatsapp_handler'):
+        handler = services.loaded(name)
+        if handler is not None:
+            handler.resume_broadcasts()
+    if services.loaded('whatsapp_handler') is not None:
+        whatsapp_handler.start_webhook_queue()
+
+@app.before_request
+def ensure_background_work():
+    if _background_pid != os.getpid():
+        start_background_work()
+
+# On-demand sampling profiles; the admin endpoint is disabled without a token
+ADMIN_API_TOKEN = os.getenv('ADMIN_API_TOKEN', '')
+profiler = SamplingProfiler(app)
+
+# Pre-serialized legal/safety responses, rebuilt when the data version changes
+STATIC_CACHE_MAX_AGE = int(os.getenv('STATIC_CACHE_MAX_AGE', 3600))
+# Synthesized speech is content-addressed: a URL's audio never changes
+AUDIO_CACHE_MAX_AGE = 365 * 24 * 3600
+response_cache = PrecomputedResponseCache(dump_json, name='response')
+compact_response_cache = PrecomputedResponseCache(pack_compact, name='compact_response')
+
+# Offline-sync clients upload their queued questions in one batch
+MAX_CHAT_BATCH_SIZE = int(os.getenv('CHAT_BATCH_MAX_SIZE', 50))
+chat_batch_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('CHAT_BATCH_WORKERS', 8)),
+    thread_name_prefix='chat-batch'
+)
 
 @app.route('/')
 def health_check():
@@ -54,6 +151,109 @@ def health_check():
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/status')
+def service_status():
+    """Runtime status for operators: bulkheads, services, caches, compression"""
+    return jsonify({
+        'bulkheads': get_bulkhead_stats(),
+        'services': services.get_startup_report(),
+        'response_cache': response_cache.get_stats(),
+        'compact_response_cache': compact_response_cache.get_stats(),
+        'json_backend': JSON_BACKEND,
+        'compression': compressor.stats.get_stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+def collect_compression_metrics():
+    """Per-route compression savings and CPU cost for /metrics"""
+    stats = compressor.stats.get_stats()
+    yield ('fishermate_compression_bytes_in_total', 'counter', 'Response bytes before compression',
+           [({'route': route}, s['bytes_in']) for route, s in stats.items()])
+    yield ('fishermate_compression_bytes_out_total', 'counter', 'Response bytes after compression',
+           [({'route': route}, s['bytes_out']) for route, s in stats.items()])
+    yield ('fishermate_compression_cpu_seconds_total', 'counter', 'CPU time spent compressing responses',
+           [({'route': route}, s['cpu_seconds']) for route, s in stats.items()])
+
+metrics_registry.register_collector(collect_compression_metrics)
+
+def is_admin_request() -> bool:
+    """Check the admin bearer token; always false when none is configured"""
+    if not ADMIN_API_TOKEN:
+        return False
+    header = request.headers.get('Authorization', '')
+    token = header[7:] if header.startswith('Bearer ') else request.headers.get('X-Admin-Token', '')
+    return hmac.compare_digest(token.encode(), ADMIN_API_TOKEN.encode())
+
+@app.route('/api/admin/profile', methods=['POST'])
+def profile():
+    """Sample the live worker and return flamegraph collapsed stacks"""
+    if not is_admin_request():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval = float(request.args.get('interval_ms', 5)) / 1000
+    except ValueError:
+        return jsonify({'error': 'seconds and interval_ms must be numbers'}), 400
+    
+    try:
+        stacks = profiler.profile(
+            seconds,
+            interval=interval,
+            route=request.args.get('route'),
+            all_threads=request.args.get('all_threads') == '1'
+        )
+    except ProfilerBusyError as e:
+        return jsonify({'error': str(e)}), 409
+    
+    return Response(to_collapsed(stacks), mimetype='text/plain')
+
+@app.route('/api/admin/broadcast', methods=['POST'])
+def broadcast():
+    """Queue an SMS broadcast; returns the job's progress at once"""
+    if not is_admin_request():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    numbers = data.get('numbers')
+    message = data.get('message', '').strip()
+    if not isinstance(numbers, list) or not numbers or not message:
+        return jsonify({'error': 'numbers (a list) and message are required'}), 400
+    
+    if request.args.get('dry_run') == '1':
+        plan = sms_handler.plan_message(message).as_dict()
+        plan.update(recipients=len(numbers), total_segments=plan['segments'] * len(numbers))
+        return jsonify(plan)
+    
+    job = sms_handler.broadcast_sms(numbers, message, wait=False)
+    if 'job_id' not in job:
+        return jsonify({'error': job.get('error', 'SMS service unavailable')}), 503
+    return jsonify(job), 202
+
+@app.route('/api/admin/broadcast/<job_id>', methods=['GET'])
+def broadcast_progress(job_id):
+    """Live progress of a broadcast"""
+    if not is_admin_request():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    progress = sms_handler.get_broadcast_progress(job_id)
+    if progress is None:
+        return jsonify({'error': 'Unknown broadcast'}), 404
+    return jsonify(progress)
+
+@app.route('/api/admin/alerts', methods=['GET'])
+def alerts():
+    """Tile safety levels and recent area alerts"""
+    if not is_admin_request():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return jsonify(alert_pipeline.get_stats(request.args.get('limit', 20, type=int)))
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Main chat endpoint for processing user queries"""
@@ -61,41 +261,176 @@ def chat():
         data = request.json
         user_message = data.get('message', '')
         user_language = data.get('language', 'en')
-        user_location = data.get('location', {})
-        message_type = data.get('type', 'text')  # text, voice, image
         
         logger.info(f"Received message: {user_message[:50]}... Language: {user_language}")
         
-        # Detect language if not provided
-        if user_language == 'auto':
-            user_language = language_processor.detect_language(user_message)
+        return api_response(process_chat_message(data))
         
-        # Process voice input if needed
-        if message_type == 'voice':
-            audio_data = data.get('audio_data')
-            user_message = voice_handler.speech_to_text(audio_data, user_language)
+    except Exception as e:
+        logger.error(f"Chat error: {str(e)}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': 'कुछ गलत हुआ है। कृपया फिर से कोशिश करें।'
+        }), 500
+
+def process_chat_message(data):
+    """Run one chat request through the chat stages, in order
+    
+    Each stage needs the one before it. The only independent work is the
+    weather for a voice message's location, fetched while STT runs.
+    """
+    context = {'data': data}
+    started = time.perf_counter()
+    if _chat_should_prefetch_weather(context):
+        chat_prefetch_executor.submit(_chat_prefetch_weather, context)
+    
+    timings = {}
+    for name, stage, when in CHAT_STAGES:
+        if when is not None and not when(context):
+            context[name] = None
+            continue
+        stage_started = time.perf_counter()
+        context[name] = stage(context)
+        timings[name] = round((time.perf_counter() - stage_started) * 1000, 2)
+    
+    response = context['respond']
+    if context.get('tts') is not None:
+        response['audio_url'] = context['tts']
+    
+    response['metadata'] = {
+        'stage_timings_ms': timings,
+        'total_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+    return response
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """Process a burst of queued chat messages from offline-sync clients"""
+    try:
+        data = request.get_json(silent=True) or {}
+        messages = data.get('messages')
         
-        # Determine intent/category
-        intent = determine_intent(user_message, user_language)
+        if not isinstance(messages, list) or not messages:
+            return jsonify({'error': 'messages must be a non-empty list'}), 400
+        if len(messages) > MAX_CHAT_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_CHAT_BATCH_SIZE} messages per batch'}), 413
         
-        # Generate response based on intent
-        response = generate_response(user_message, intent, user_language, user_location)
+        logger.info(f"Received chat batch of {len(messages)} messages")
         
-        # Convert to voice if requested
-        if data.get('voice_response', False):
-            response['audio_url'] = voice_handler.text_to_speech(
-                response['text'], user_language
-            )
+        results = run_chat_batch(messages)
+        failed = sum(1 for result in results if result['status'] == 'error')
         
-        return jsonify(response)
+        return jsonify({
+            'results': results,
+            'total': len(results),
+            'failed': failed
+        })
         
     except Exception as e:
-        logger.error(f"Chat error: {str(e)}")
+        logger.error(f"Chat batch error: {str(e)}")
         return jsonify({
             'error': 'Internal server error',
             'message': 'कुछ गलत हुआ है। कृपया फिर से कोशिश करें।'
         }), 500
 
+def run_chat_batch(messages):
+    """Run batch items concurrently; identical items are answered once"""
+    unique = {}
+    item_keys = []
+    for item in messages:
+        if not isinstance(item, dict):
+            item_keys.append(None)
+            continue
+        key = json.dumps({k: v for k, v in item.items() if k != 'id'}, sort_keys=True, default=str)
+        if key not in unique:
+            unique[key] = chat_batch_executor.submit(process_chat_message, item)
+        item_keys.append(key)
+    
+    results = []
+    seen = set()
+    for index, (item, key) in enumerate(zip(messages, item_keys)):
+        result = {'index': index, 'id': item.get('id') if isinstance(item, dict) else None}
+        if key is None:
+            result.update(status='error', error='Each message must be an object')
+        else:
+            try:
+                response = unique[key].result()
+                # Duplicates get their own copy: responses are mutated downstream
+                result.update(status='ok', response=copy.deepcopy(response) if key in seen else response)
+                seen.add(key)
+            except Exception as e:
+                logger.error(f"Chat batch item {index} error: {str(e)}")
+                result.update(status='error', error='Could not process this message')
+        results.append(result)
+    
+    return results
+
+# Chat pipeline stages. Each reads the request data and the results of the
+# stages it depends on from the shared context.
+
+def _chat_language(context):
+    """Detect language if not provided"""
+    data = context['data']
+    language = data.get('language', 'en')
+    if language == 'auto':
+        language = language_processor.detect_language(data.get('message', ''))
+    return language
+
+def _chat_transcript(context):
+    """Process voice input if needed"""
+    data = context['data']
+    if data.get('type', 'text') == 'voice':
+        return voice_handler.speech_to_text(data.get('audio_data'), context['language'])
+    return data.get('message', '')
+
+def _chat_should_prefetch_weather(context):
+    """Speculate on weather only while STT is running anyway"""
+    data = context['data']
+    location = data.get('location') or {}
+    return data.get('type', 'text') == 'voice' and 'lat' in location and 'lon' in location
+
+def _chat_prefetch_weather(context):
+    """Warm the weather cache for the user's location"""
+    try:
+        location = context['data']['location']
+        weather_service.get_current_weather(float(location['lat']), float(location['lon']))
+    except Exception as e:
+        logger.warning(f"Weather prefetch failed: {str(e)}")
+
+def _chat_intent(context):
+    """Determine intent/category"""
+    return determine_intent(context['transcript'], context['language'])
+
+def _chat_respond(context):
+    """Generate response based on intent"""
+    location = context['data'].get('location') or {}
+    return generate_response(context['transcript'], context['intent'], context['language'], location)
+
+def _chat_wants_voice(context):
+    return bool(context['data'].get('voice_response', False))
+
+def _chat_tts(context):
+    """Convert to voice if requested"""
+    return voice_handler.text_to_speech(context['respond']['text'], context['language'])
+
+# (name, stage, condition): the chat stages, each reading the results before it
+CHAT_STAGES = (
+    ('language', _chat_language, None),
+    ('transcript', _chat_transcript, None),
+    ('intent', _chat_intent, None),
+    ('respond', _chat_respond, None),
+    ('tts', _chat_tts, _chat_wants_voice),
+)
+
+# Weather prefetches; upstream concurrency is capped by the bulkheads
+chat_prefetch_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('PIPELINE_WORKERS', 16)),
+    thread_name_prefix='chat-prefetch'
+)
+
+# The prefetch runs on its own thread, away from the view frame
+profiler.tag(_chat_prefetch_weather, '/api/chat')
+
 def determine_intent(message, language):
     """Determine the intent/category of the user message"""
     # Keywords for different categories in multiple languages
@@ -180,7 +515,8 @@ def generate_general_response(message, language):
         Provide a helpful, culturally sensitive response in {language}.
         """
         
-        response = model.generate_content(context)
+        with bulkhead('gemini'):
+            response = model.generate_content(context)
         
         return {
             'text': response.text,
@@ -215,7 +551,7 @@ def get_weather():
         if language != 'en':
             weather_data = language_processor.translate_weather_data(weather_data, language)
         
-        return jsonify(weather_data)
+        return api_response(weather_data)
         
     except Exception as e:
         logger.error(f"Weather API error: {str(e)}")
@@ -227,10 +563,19 @@ def get_legal_info():
     try:
         state = request.args.get('state', 'general')
         language = request.args.get('language', 'en')
+        compact = wants_compact(request.accept_mimetypes)
         
-        legal_data = legal_info_service.get_legal_info(state, language)
+        legal_info_service.reload_if_changed()
+        cache = compact_response_cache if compact else response_cache
+        entry = cache.get(
+            ('legal', state, language),
+            legal_info_service.data_version,
+            lambda: legal_info_service.get_legal_info(state, language)
+        )
+        if entry is None:
+            return api_response(legal_info_service.get_legal_info(state, language))
         
-        return jsonify(legal_data)
+        return precomputed_response(entry, COMPACT_MIMETYPE if compact else 'application/json')
         
     except Exception as e:
         logger.error(f"Legal info error: {str(e)}")
@@ -243,14 +588,50 @@ def get_safety_info():
         category = request.args.get('category', 'general')
         language = request.args.get('language', 'en')
         
-        safety_data = safety_guide_service.get_safety_info(category, language)
+        entry = response_cache.get(
+            ('safety', category, language),
+            safety_guide_service.data_version,
+            lambda: safety_guide_service.get_safety_info(category, language)
+        )
+        if entry is None:
+            return jsonify(safety_guide_service.get_safety_info(category, language))
         
-        return jsonify(safety_data)
+        return precomputed_response(entry)
         
     except Exception as e:
         logger.error(f"Safety info error: {str(e)}")
         return jsonify({'error': 'Safety information service unavailable'}), 500
 
+def api_response(payload):
+    """JSON response, or the compact format when the client's Accept prefers it"""
+    if wants_compact(request.accept_mimetypes):
+        response = Response(pack_compact(payload), mimetype=COMPACT_MIMETYPE)
+    else:
+        response = jsonify(payload)
+    response.vary.add('Accept')
+    return response
+
+def precomputed_response(entry, mimetype='application/json'):
+    """Serve a cached response, answering revalidations with 304"""
+    encoding = None
+    if len(entry.body) >= compressor.min_size:
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    headers = {
+        'ETag': entry.etag(encoding),
+        'Cache-Control': f'public, max-age={STATIC_CACHE_MAX_AGE}',
+        'Vary': 'Accept, Accept-Encoding'
+    }
+    
+    if entry.matches(request.headers.get('If-None-Match'), encoding):
+        return Response(status=304, headers=headers)
+    
+    body, cpu_seconds = entry.variant(encoding)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    compressor.stats.record(request.url_rule.rule, encoding or 'identity', len(entry.body), len(body),
+                            cpu_seconds, cached=True)
+    return Response(body, mimetype=mimetype, headers=headers)
+
 @app.route('/api/whatsapp', methods=['POST'])
 def whatsapp_webhook():
     """Handle WhatsApp messages"""
@@ -288,6 +669,15 @@ def text_to_speech():
         logger.error(f"TTS error: {str(e)}")
         return jsonify({'error': 'Text-to-speech service error'}), 500
 
+@app.route('/audio/<path:filename>')
+def serve_audio(filename):
+    """Serve generated speech: TTS answers and WhatsApp voice replies"""
+    if filename.startswith('tts_'):
+        # The name is the content hash, so it doubles as a strong ETag
+        return send_from_directory(voice_handler.audio_dir, filename, etag=filename,
+                                   max_age=AUDIO_CACHE_MAX_AGE)
+    return send_from_directory(voice_handler.audio_dir, filename)
+
 @app.route('/api/voice/stt', methods=['POST'])
 def speech_to_text():
     """Convert speech to text"""
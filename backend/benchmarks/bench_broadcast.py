@@ -0,0 +1,80 @@
+"""
+Broadcast benchmark for FisherMate.AI
+
+Sends an alert to N numbers (default 5,000) through
+SMSHandler.broadcast_sms against a local Twilio stand-in that
+enforces an account throughput limit. It prints live progress, then
+throughput, retries, failures and how far the send rate stayed from
+the limit. With --serial it first times the old one-at-a-time loop
+over a sample of the numbers and extrapolates it to N.
+
+Usage (from backend/):
+    python -m benchmarks.bench_broadcast [--numbers 5000] [--mps 100] [--workers 8]
+        [--latency-ms 150] [--error-rate 0.01] [--serial 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.twilio_standin import start_standin  # noqa: E402
+
+ALERT = ("🚨 WEATHER ALERT\nCyclonic storm over the Bay of Bengal\n💨 Wind: 85 km/h\n"
+         "❌ DO NOT FISH\nCoast Guard: 1554")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--numbers', type=int, default=5000)
+    parser.add_argument('--mps', type=float, default=100, help='Stand-in account limit, segments per second')
+    parser.add_argument('--rate', type=float, help='Engine send rate (default: the stand-in limit)')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=150)
+    parser.add_argument('--error-rate', type=float, default=0.01)
+    parser.add_argument('--serial', type=int, default=0, help='Time the serial loop over this many numbers first')
+    args = parser.parse_args()
+
+    server = start_standin(mps=args.mps, latency_ms=args.latency_ms, error_rate=args.error_rate)
+    workdir = tempfile.mkdtemp(prefix='broadcast-bench-')
+    os.environ.update({
+        'TWILIO_ACCOUNT_SID': 'ACbench', 'TWILIO_AUTH_TOKEN': 'bench', 'TWILIO_SMS_NUMBER': '+15005550006',
+        'TWILIO_API_BASE_URL': server.url,
+        'BROADCAST_QUEUE_PATH': os.path.join(workdir, 'broadcasts.db'),
+        'BROADCAST_RATE': str(args.rate or args.mps),
+        'BROADCAST_WORKERS': str(args.workers),
+        'BROADCAST_BACKOFF': '0.5'
+    })
+    from modules.sms_handler import SMSHandler
+    handler = SMSHandler()
+    numbers = [f"+9198{i:08d}" for i in range(args.numbers)]
+
+    if args.serial:
+        started = time.perf_counter()
+        for number in numbers[:args.serial]:
+            handler.send_sms_message(number, ALERT)
+        per_message = (time.perf_counter() - started) / args.serial
+        print(f"serial: {per_message * 1000:.0f} ms/recipient, ~{per_message * args.numbers / 60:.1f} min "
+              f"for {args.numbers}")
+
+    started = time.perf_counter()
+    job = handler.broadcast_sms(numbers, ALERT, wait=False)
+    while job['status'] != 'finished':
+        time.sleep(1)
+        job = handler.get_broadcast_progress(job['job_id'])
+        print(f"  {job['sent'] + job['failed']:>7}/{job['total']} sent={job['sent']} failed={job['failed']} "
+              f"retrying={job['retrying']} {job['per_second']}/s eta={job['eta_seconds']}s", flush=True)
+    elapsed = time.perf_counter() - started
+
+    segments = job['segments'] * job['sent']
+    print(f"engine: {job['total']} recipients ({segments} segments sent) in {elapsed:.1f}s, "
+          f"{segments / elapsed:.1f} segments/s of {args.mps} MPS limit")
+    print(f"stand-in: {server.get_stats()}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Cold start benchmark for FisherMate.AI
+
+Measures, in fresh interpreters, how long `import app` takes with lazy
+services, how long each service takes to import and construct on first
+use, and which top-level packages dominate import time (from
+`python -X importtime`).
+
+Usage (from backend/):
+    python -m benchmarks.bench_cold_start [--runs 3] [--top 15]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, logging, time
+logging.disable(logging.INFO)
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+report = app.services.preload()
+print(json.dumps({
+    'app_import_ms': round((imported - started) * 1000, 1),
+    'preload_ms': round((time.perf_counter() - imported) * 1000, 1),
+    'services': report
+}))
+"""
+
+
+def probe() -> dict:
+    env = dict(os.environ, PRELOAD_SERVICES='false')
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_breakdown() -> dict:
+    """Cumulative self import time per top-level package, in ms"""
+    env = dict(os.environ, PRELOAD_SERVICES='false')
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app; app.services.preload()'],
+                            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True).stderr
+    totals = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        totals[name.split('.')[0]] += int(self_us) / 1000
+    return dict(totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [probe() for _ in range(args.runs)]
+    best = min(runs, key=lambda run: run['app_import_ms'] + run['preload_ms'])
+
+    print(f"import app (lazy services): {best['app_import_ms']} ms")
+    print(f"preload all services:       {best['preload_ms']} ms\n")
+    print(f"{'service':<22} {'import ms':>10} {'construct ms':>13}")
+    for name, timing in best['services'].items():
+        print(f"{name:<22} {timing['import_ms']:>10} {timing['construct_ms']:>13}")
+
+    print(f"\n{'package':<22} {'self import ms':>15}")
+    breakdown = sorted(import_breakdown().items(), key=lambda item: item[1], reverse=True)
+    for package, ms in breakdown[:args.top]:
+        print(f"{package:<22} {ms:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Command parser benchmark for FisherMate.AI
+
+Classifies a replay of webhook message bodies with the shared command
+trie (CommandParser.parse), with and without its memo of recent bodies.
+For comparison it runs the chained keyword scans the SMS and WhatsApp
+handlers used before, which rescanned the message once per keyword
+list. Bodies come from a loadgen_webhooks recording or, by default, a
+synthetic mix of SMS commands, WhatsApp quick-reply buttons and free
+text in English, Hindi and Tamil.
+
+Usage (from backend/):
+    python -m benchmarks.bench_command_parser [--messages 200000] [--repeat 5]
+    python -m benchmarks.bench_command_parser --replay recording.jsonl
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.command_parser import get_command_parser  # noqa: E402
+from benchmarks.bench_scenarios import SMS_BODIES, WHATSAPP_SESSION  # noqa: E402
+from benchmarks.loadgen_webhooks import recorded_traffic  # noqa: E402
+
+WHATSAPP_BODIES = WHATSAPP_SESSION + [
+    '🌦️ Weather', '⚖️ Legal Info', '🦺 Safety', '🆘 Emergency', '🏠 Main Menu',
+    '🌤️ Current Weather', '📅 3-Day Forecast', '⚠️ Weather Alerts', '🔙 Back',
+    '🌦️ मौसम', '🔙 वापस', '⚖️ சட்ட தகவல்', '🔙 பின்னே',
+    '/start', '/help', '/alerts Chennai', '/alerts stop',
+    'Hindi', 'தமிழ்', 'change language',
+    'Is it safe to go fishing near Rameswaram tomorrow morning?',
+    'tamil nadu fishing laws', 'मौसम कैसा है', 'இன்று வானிலை எப்படி?', 'ok thanks'
+]
+
+# Keyword lists of the old handlers, tested in order by substring scan
+LEGACY_SMS = [
+    ('weather', ['weather', 'mausam', 'vanilai']),
+    ('legal', ['law', 'legal', 'ban', 'kanoon', 'sattam']),
+    ('safety', ['safety', 'suraksha', 'padhukaapu']),
+    ('emergency', ['emergency', 'help', 'madad', 'udavi']),
+    ('greeting', ['hello', 'hi', 'start', 'namaste'])
+]
+LEGACY_WHATSAPP = [
+    ('language', ['hindi', 'हिंदी', 'tamil', 'தமிழ்', 'english', 'language',
+                  'भाषा', 'மொழி', 'change language', 'भाषा बदलें', 'மொழி மாற்று']),
+    ('menu', ['menu', 'मेनू', 'மெனு', 'back', 'वापस', 'பின்னே', 'home', 'घर', 'வீடு']),
+    ('quick_reply', ['🌦️', '🌤️', '📅', '🌊', '⚖️', '🚫', '📋', '🦺', '✅', '⚓', '🆘', '🔙', '🏠'])
+] + LEGACY_SMS[:4]
+LEGACY_LETTERS = {'W': 'weather', 'L': 'legal', 'S': 'safety', 'E': 'emergency', 'H': 'help', 'M': 'menu', 'A': 'alerts'}
+
+
+def legacy_classify(message: str, channel: str) -> str:
+    """The old if/elif chains, reduced to the intent they picked"""
+    if channel == 'sms':
+        upper = message.upper().strip()
+        if upper in ('EN', 'ENGLISH', 'HI', 'HINDI', 'TA', 'TAMIL'):
+            return 'language'
+        if upper in LEGACY_LETTERS:
+            return LEGACY_LETTERS[upper]
+        if len(upper) > 2 and upper[1] == ' ' and upper[0] in 'WLSA':
+            return LEGACY_LETTERS[upper[0]]
+        rules = LEGACY_SMS
+    else:
+        if message.strip().startswith('/'):
+            return 'command'
+        rules = LEGACY_WHATSAPP
+    lower = message.lower()
+    for intent, keywords in rules:
+        if any(keyword in lower for keyword in keywords):
+            return intent
+    return 'none'
+
+
+def synthetic_bodies(count: int, seed: int = 7) -> List[Tuple[str, str]]:
+    rng = random.Random(seed)
+    return [('sms', rng.choice(SMS_BODIES)) if rng.random() < 0.5 else ('whatsapp', rng.choice(WHATSAPP_BODIES))
+            for _ in range(count)]
+
+
+def best_of(repeat: int, run) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--messages', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--replay', help='loadgen_webhooks JSON lines recording')
+    args = parser.parse_args()
+
+    if args.replay:
+        bodies = [(channel, form.get('Body', '')) for _, channel, form in recorded_traffic(args.replay)]
+    else:
+        bodies = synthetic_bodies(args.messages)
+
+    started = time.perf_counter()
+    command_parser = get_command_parser()
+    print(f"compiled {command_parser.phrases} phrases in {(time.perf_counter() - started) * 1000:.2f} ms")
+
+    results = (
+        ('trie', best_of(args.repeat, lambda: [command_parser.parse(body, channel) for channel, body in bodies])),
+        ('trie, no memo', best_of(args.repeat, lambda: [command_parser._parse(body, channel) for channel, body in bodies])),
+        ('keyword scans', best_of(args.repeat, lambda: [legacy_classify(body, channel) for channel, body in bodies]))
+    )
+
+    print(f"{'classifier':<14} {'total ms':>9} {'us/msg':>8}")
+    for name, elapsed in results:
+        print(f"{name:<14} {elapsed * 1000:>9.1f} {elapsed / len(bodies) * 1e6:>8.2f}")
+
+    intents = Counter(command_parser.parse(body, channel).intent for channel, body in bodies)
+    print(f"\n{len(bodies)} messages: " + ', '.join(f"{intent}={count}" for intent, count in intents.most_common()))
+
+
+if __name__ == '__main__':
+    main()
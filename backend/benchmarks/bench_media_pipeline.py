@@ -0,0 +1,108 @@
+"""
+Voice note pipeline benchmark for FisherMate.AI
+
+Sends a burst of WhatsApp voice notes through the media pipeline:
+streamed download, transcode in the process pool, then
+VoiceHandler.speech_to_text with Google STT stubbed. Notes are copied
+from local audio fixtures in place of the Twilio download, so runs
+never leave the machine. Without --fixtures, OGG/Opus notes of a few lengths are
+generated with pydub, like the ones WhatsApp records, plus one over
+the length limit. It reports outcomes, per-note latency, the peak
+transcode bulkhead occupancy and RSS growth.
+
+Usage (from backend/):
+    python -m benchmarks.bench_media_pipeline [--notes 200] [--concurrency 32]
+    python -m benchmarks.bench_media_pipeline --fixtures path/to/voice_notes
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.bulkhead import get_bulkhead  # noqa: E402
+from modules.media_pipeline import MediaPipeline, MediaRejected  # noqa: E402
+from modules.voice_handler import VoiceHandler  # noqa: E402
+from benchmarks.bench_scenarios import current_rss_kb, percentile  # noqa: E402
+from benchmarks.stubs import UpstreamStubs  # noqa: E402
+
+
+def generate_fixtures(directory: str, max_seconds: float):
+    """Opus voice notes of 3 to 60 seconds, and one past the limit"""
+    from pydub.generators import Sine
+
+    for seconds in (3, 10, 30, 60, max_seconds + 10):
+        note = Sine(440).to_audio_segment(duration=seconds * 1000).set_frame_rate(48000).set_channels(1)
+        note.export(os.path.join(directory, f"note_{seconds:g}s.ogg"), format='ogg', codec='libopus')
+
+
+def copy_fixture(path: str, dest: str, max_bytes: int) -> int:
+    """Stands in for the Twilio media download"""
+    if os.path.getsize(path) > max_bytes:
+        raise MediaRejected('too_large')
+    shutil.copyfile(path, dest)
+    return os.path.getsize(dest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--notes', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--fixtures', help='Directory of voice notes (default: generated)')
+    parser.add_argument('--max-seconds', type=float, default=120)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        fixtures = args.fixtures
+        if not fixtures:
+            fixtures = os.path.join(workdir, 'fixtures')
+            os.makedirs(fixtures)
+            generate_fixtures(fixtures, args.max_seconds)
+        notes = [str(path) for path in sorted(Path(fixtures).iterdir()) if path.is_file()]
+        print(f"{len(notes)} fixtures from {fixtures}")
+
+        stubs = UpstreamStubs()
+        voice_handler = VoiceHandler()
+        pipeline = MediaPipeline(voice_handler, max_seconds=args.max_seconds, workdir=workdir, fetch=copy_fixture)
+
+        def transcribe(i: int):
+            started = time.perf_counter()
+            try:
+                outcome = 'transcribed' if pipeline.transcribe(notes[i % len(notes)], 'ta') else 'unheard'
+            except MediaRejected as e:
+                outcome = e.reason
+            return outcome, time.perf_counter() - started
+
+        with mock.patch.object(voice_handler.recognizer, 'recognize_google', stubs.recognize_google):
+            # Warm the process pool so its start-up is not timed
+            transcribe(0)
+            rss_before = current_rss_kb()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                results = list(pool.map(transcribe, range(args.notes)))
+            elapsed = time.perf_counter() - started
+
+        outcomes = Counter(outcome for outcome, _ in results)
+        latencies = sorted(latency for _, latency in results)
+        transcode = get_bulkhead('transcode').get_stats()
+        print(f"{args.notes} notes in {elapsed:.1f}s ({args.notes / elapsed:.1f}/s), "
+              + ', '.join(f"{outcome}={count}" for outcome, count in outcomes.most_common()))
+        print(f"latency p50 {percentile(latencies, 0.5) * 1000:.0f} ms, "
+              f"p95 {percentile(latencies, 0.95) * 1000:.0f} ms, p99 {percentile(latencies, 0.99) * 1000:.0f} ms")
+        print(f"transcode pool {transcode['max_concurrent']}, peak active {transcode['peak_active']}, "
+              f"peak waiting {transcode['peak_waiting']}/{transcode['max_queue']}, shed "
+              f"{transcode['rejected_queue_full'] + transcode['rejected_timeout']}")
+        left = sum(1 for name in os.listdir(workdir) if name.startswith('voice-'))
+        print(f"rss +{current_rss_kb() - rss_before} KB, voice note work dirs left: {left}")
+
+
+if __name__ == '__main__':
+    main()
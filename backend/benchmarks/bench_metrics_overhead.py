@@ -0,0 +1,87 @@
+"""
+Metrics overhead benchmark for FisherMate.AI
+
+Measures what the instrumentation in modules.metrics costs: the raw
+histogram/counter operations, a bulkhead slot with and without timing,
+and a full Flask request with and without RequestMetrics installed.
+
+Usage (from backend/):
+    python -m benchmarks.bench_metrics_overhead [--number 20000]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify  # noqa: E402
+
+from modules.bulkhead import Bulkhead  # noqa: E402
+from modules.metrics import MetricsRegistry, RequestMetrics  # noqa: E402
+
+
+def build_app(instrumented: bool) -> Flask:
+    app = Flask(f"bench_{'instrumented' if instrumented else 'bare'}")
+    if instrumented:
+        RequestMetrics(app)
+
+    @app.route('/api/weather')
+    def weather():
+        return jsonify({'temperature': 31.2, 'humidity': 74})
+
+    return app
+
+
+def timed(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    histogram = registry.histogram('bench_seconds', 'bench', ('route', 'method', 'status'))
+    counter = registry.counter('bench_total', 'bench', ('cache', 'result'))
+    for i in range(20):
+        histogram.observe(0.01 * i, f'/route/{i}', 'GET', '200')
+
+    bulkhead = Bulkhead('bench', 4, 4, 1.0)
+
+    def untimed_slot():
+        bulkhead.acquire()
+        bulkhead.release()
+
+    def timed_slot():
+        with bulkhead.slot():
+            pass
+
+    rows = [
+        ('histogram.observe', lambda: histogram.observe(0.042, '/api/weather', 'GET', '200')),
+        ('counter.inc', lambda: counter.inc('weather', 'hit')),
+        ('bulkhead acquire/release', untimed_slot),
+        ('bulkhead.slot (timed)', timed_slot),
+        ('registry.render (20 series)', registry.render)
+    ]
+
+    print(f"{'operation':<30} {'us/op':>8}")
+    for name, func in rows:
+        print(f"{name:<30} {timed(func, args.number) * 1e6:>8.2f}")
+
+    requests_number = max(args.number // 20, 100)
+    results = {}
+    for instrumented in (False, True):
+        client = build_app(instrumented).test_client()
+        results[instrumented] = timed(lambda: client.get('/api/weather'), requests_number)
+
+    overhead = results[True] - results[False]
+    print(f"\n{'flask request (bare)':<30} {results[False] * 1e6:>8.1f}")
+    print(f"{'flask request (instrumented)':<30} {results[True] * 1e6:>8.1f}")
+    print(f"{'middleware overhead':<30} {overhead * 1e6:>8.1f}  ({overhead / results[False]:.1%})")
+
+
+if __name__ == '__main__':
+    main()
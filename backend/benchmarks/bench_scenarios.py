@@ -0,0 +1,267 @@
+"""
+End-to-end scenario benchmark for FisherMate.AI
+
+Drives the real Flask app through its test client with every upstream
+replaced by an in-process stub (benchmarks.stubs), and reports
+throughput, p50/p95/p99 latency, error rate and memory per scenario.
+
+Scenarios:
+    chat_mix        /api/chat traffic across intents, languages and voice replies
+    cyclone_surge   /api/weather and weather chats for the coast while
+                    OpenWeather is slow and Gemini is failing
+    sms_flood       /api/sms commands from thousands of distinct numbers
+    whatsapp_menu   /api/whatsapp sessions browsing the menus
+
+Usage (from backend/):
+    python -m benchmarks.bench_scenarios [--scenario chat_mix] [--requests 500]
+        [--concurrency 16] [--latency-scale 1.0] [--tracemalloc] [--json out.json]
+        [--baseline previous.json --threshold 0.2]
+
+With --baseline, the exit status is 1 when any scenario's p95 grows or
+its throughput drops by more than --threshold relative to the baseline.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stubs import DEFAULT_PROFILE, UpstreamStubs  # noqa: E402
+
+# (method, path, test-client kwargs)
+RequestSpec = Tuple[str, str, Dict]
+
+COAST = [
+    (8.88, 76.59), (9.96, 76.24), (11.25, 75.77), (13.08, 80.27), (10.77, 79.84),
+    (15.49, 73.82), (19.07, 72.88), (21.63, 69.6), (17.69, 83.22), (19.81, 85.83)
+]
+
+CHAT_MESSAGES = [
+    ('What is the weather for fishing today?', 'en'),
+    ('Is there a fishing ban in Kerala now?', 'en'),
+    ('What safety equipment should I carry?', 'en'),
+    ('How do I get a fishing license?', 'en'),
+    ('Best time to catch mackerel near Kochi?', 'en'),
+    ('आज मौसम कैसा है?', 'hi'),
+    ('மீன்பிடி தடை எப்போது?', 'ta')
+]
+
+SMS_BODIES = ['W', 'L', 'S', 'H', 'M', 'W Chennai', 'L Kerala', 'S storm', 'weather tomorrow please', 'TA']
+
+WHATSAPP_SESSION = ['hi', '1', 'weather', '0', '2', 'legal', 'menu', '3', 'safety', 'bye']
+
+
+def chat_mix(i: int, rng: random.Random) -> RequestSpec:
+    message, language = rng.choice(CHAT_MESSAGES)
+    lat, lon = rng.choice(COAST)
+    return ('POST', '/api/chat', {'json': {
+        'message': message,
+        'language': language,
+        'location': {'lat': lat, 'lon': lon},
+        'voice_response': rng.random() < 0.1
+    }})
+
+
+def cyclone_surge(i: int, rng: random.Random) -> RequestSpec:
+    # Boats spread along the coast, so most reads miss the ~1 km weather cache
+    # and reach the slow OpenWeather stub
+    lat, lon = rng.choice(COAST)
+    lat, lon = round(lat + rng.uniform(-0.25, 0.25), 3), round(lon + rng.uniform(-0.25, 0.25), 3)
+    if i % 3:
+        return ('GET', '/api/weather', {'query_string': {'lat': lat, 'lon': lon}})
+    return ('POST', '/api/chat', {'json': {
+        'message': 'Cyclone warning - is it safe to go to sea?',
+        'language': 'en',
+        'location': {'lat': lat, 'lon': lon}
+    }})
+
+
+def sms_flood(i: int, rng: random.Random) -> RequestSpec:
+    return ('POST', '/api/sms', {'data': {
+        'From': f"+9198{rng.randrange(5000):08d}",
+        'To': '+15005550006',
+        'Body': rng.choice(SMS_BODIES)
+    }})
+
+
+def whatsapp_menu(i: int, rng: random.Random) -> RequestSpec:
+    # Sessions advance through the script in order, 200 users interleaved
+    user, step = i % 200, (i // 200) % len(WHATSAPP_SESSION)
+    return ('POST', '/api/whatsapp', {'data': {
+        'From': f"whatsapp:+9197{user:08d}",
+        'To': 'whatsapp:+14155238886',
+        'Body': WHATSAPP_SESSION[step]
+    }})
+
+
+# name -> (request generator, upstream overrides)
+SCENARIOS: Dict[str, Tuple[Callable[[int, random.Random], RequestSpec], Dict]] = {
+    'chat_mix': (chat_mix, {}),
+    'cyclone_surge': (cyclone_surge, {
+        'openweather': {'latency_ms': 1500, 'jitter_ms': 500},
+        'gemini': {'error_rate': 0.2}
+    }),
+    'sms_flood': (sms_flood, {}),
+    'whatsapp_menu': (whatsapp_menu, {})
+}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def current_rss_kb() -> int:
+    """Resident set size now, falling back to the peak where /proc is missing"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * (os.sysconf('SC_PAGE_SIZE') // 1024)
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def scale_latency(overrides: Dict, scale: float) -> Dict:
+    scaled = {}
+    for name, defaults in DEFAULT_PROFILE.items():
+        config = dict(defaults, **overrides.get(name, {}))
+        config['latency_ms'] *= scale
+        config['jitter_ms'] *= scale
+        scaled[name] = config
+    return scaled
+
+
+def reset_caches(app_module):
+    """Start a scenario cold, so it does not run on what the previous one fetched"""
+    app_module.weather_service.clear_cache()
+    sms_handler = app_module.services.loaded('sms_handler')
+    if sms_handler is not None:
+        sms_handler.reply_cache.clear()
+
+
+def run_scenario(app_module, name: str, total: int, concurrency: int, latency_scale: float,
+                 trace_allocations: bool = False, seed: int = 7) -> Dict:
+    generator, overrides = SCENARIOS[name]
+    stubs = UpstreamStubs(scale_latency(overrides, latency_scale))
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker(worker_id: int):
+        nonlocal errors
+        client = app_module.app.test_client()
+        rng = random.Random(seed + worker_id)
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            method, path, kwargs = generator(i, rng)
+            started = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                errors += int(response.status_code >= 400)
+
+    reset_caches(app_module)
+    if trace_allocations:
+        tracemalloc.start()
+    rss_before = current_rss_kb()
+    with stubs.installed(app_module):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for future in [pool.submit(worker, w) for w in range(concurrency)]:
+                future.result()
+        wall = time.perf_counter() - started
+    traced_current, traced_peak = tracemalloc.get_traced_memory()
+    if trace_allocations:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'throughput_rps': round(len(latencies) / wall, 1) if wall else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        'error_rate': round(errors / len(latencies), 4) if latencies else 0.0,
+        'alloc_peak_kb': traced_peak // 1024,
+        'alloc_retained_kb': traced_current // 1024,
+        'rss_growth_kb': current_rss_kb() - rss_before,
+        'upstream_calls': stubs.get_stats()
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Describe every scenario that regressed beyond threshold"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if before['p95_ms'] and result['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+        if before['throughput_rps'] and result['throughput_rps'] < before['throughput_rps'] * (1 - threshold):
+            regressions.append(f"{name}: throughput {before['throughput_rps']} -> {result['throughput_rps']} rps")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append',
+                        help='Scenario to run; repeatable (default: all)')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--latency-scale', type=float, default=1.0,
+                        help='Multiply every stub latency, e.g. 0.1 for quick CI runs')
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help='Also report Python allocation peak/retained (slows the run)')
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--baseline', help='Results file from a previous run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    import app as app_module
+
+    results = {}
+    print(f"{'scenario':<15} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} "
+          f"{'alloc KB':>9} {'rss +KB':>8}")
+    for name in args.scenario or list(SCENARIOS):
+        result = run_scenario(app_module, name, args.requests, args.concurrency, args.latency_scale,
+                              trace_allocations=args.tracemalloc)
+        results[name] = result
+        print(f"{name:<15} {result['throughput_rps']:>8} {result['p50_ms']:>8} {result['p95_ms']:>8} "
+              f"{result['p99_ms']:>8} {result['error_rate']:>7.1%} {result['alloc_peak_kb']:>9} "
+              f"{result['rss_growth_kb']:>8}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
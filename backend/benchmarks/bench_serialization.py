@@ -0,0 +1,88 @@
+"""
+Serialization microbenchmark for FisherMate.AI
+
+Compares the stdlib encoder as Flask configures it (ensure_ascii, sort_keys,
+datetime default hook) with modules.serialization on the real payload shapes
+returned by WeatherService.get_forecast and LegalInfoService.get_legal_info.
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization [--number 2000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from werkzeug.http import http_date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import serialization  # noqa: E402
+from modules.legal_info import LegalInfoService  # noqa: E402
+from modules.weather_service import WeatherService  # noqa: E402
+from benchmarks.fixtures import CannedResponse, openweather_forecast  # noqa: E402
+
+
+def build_payloads() -> dict:
+    """Produce the payloads the API actually serializes"""
+    weather = WeatherService()
+    with mock.patch('modules.weather_service.requests.get',
+                    return_value=CannedResponse(openweather_forecast())):
+        forecast = weather.get_forecast(13.08, 80.27, days=5)
+
+    legal = LegalInfoService()
+    legal_info = legal.get_legal_info('Tamil Nadu', 'ta')
+    return {'forecast': forecast, 'legal': legal_info}
+
+
+def flask_default(obj):
+    """What Flask's DefaultJSONProvider does for non-JSON types"""
+    if isinstance(obj, date):
+        return http_date(obj)
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(type(obj).__name__)
+
+
+def stdlib_dumps(obj) -> bytes:
+    return json.dumps(obj, default=flask_default, ensure_ascii=True, sort_keys=True).encode('utf-8')
+
+
+def bench(label: str, func, number: int):
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    size = len(func())
+    print(f"  {label:<28} {seconds * 1e6:9.1f} us/op  {size:8d} bytes")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--number', type=int, default=2000)
+    args = parser.parse_args()
+
+    payloads = build_payloads()
+    print(f"serialization backend: {serialization.BACKEND}")
+
+    for name, payload in payloads.items():
+        print(f"\n{name}:")
+        # Must decode to the same document as Flask's encoder
+        assert json.loads(serialization.dumps(payload)) == json.loads(stdlib_dumps(payload)), name
+        base = bench('stdlib json (Flask default)', lambda: stdlib_dumps(payload), args.number)
+        fast = bench('serialization.dumps', lambda: serialization.dumps(payload), args.number)
+        print(f"  speedup: {base / fast:.1f}x")
+
+    # Legal body with the per-state section pre-serialized once as a fragment
+    legal = payloads['legal']
+    fragment = serialization.Fragment(serialization.dumps(legal['legal_info']))
+    with_fragment = dict(legal, legal_info=fragment)
+    print("\nlegal with pre-serialized fragment:")
+    bench('serialization.dumps', lambda: serialization.dumps(with_fragment), args.number)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Session store benchmark for FisherMate.AI
+
+Loads N SMS/WhatsApp-shaped sessions (default 1,000,000) into each
+session store backend. Then it replays a get/mutate/save workload
+with a skewed user distribution, like a webhook burst, and reports
+write and read throughput, p50/p99 latency, process memory and the
+on-disk size.
+
+Usage (from backend/):
+    python -m benchmarks.bench_session_store [--sessions 1000000] [--ops 200000]
+        [--backend memory --backend sqlite --backend sqlite+lru]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.session_store import (  # noqa: E402
+    MemorySessionStore, SQLiteSessionStore, TieredSessionStore, RedisSessionStore
+)
+from benchmarks.bench_scenarios import current_rss_kb, percentile  # noqa: E402
+
+TTL = 24 * 3600
+
+
+def make_session(phone: str) -> dict:
+    return {
+        'phone': phone,
+        'language': random.choice(['en', 'hi', 'ta', 'ml']),
+        'current_menu': 'main',
+        'context': {},
+        'last_activity': datetime.now(),
+        'message_count': 1
+    }
+
+
+def build_store(backend: str, sessions: int, workdir: str):
+    if backend == 'memory':
+        return MemorySessionStore(TTL, max_entries=sessions)
+    if backend == 'redis':
+        return RedisSessionStore(TTL, 'bench', os.getenv('SESSION_REDIS_URL', 'redis://localhost:6379/0'))
+    shared = SQLiteSessionStore(TTL, 'bench', os.path.join(workdir, f'{backend}.db'))
+    return TieredSessionStore(shared) if backend == 'sqlite+lru' else shared
+
+
+def run(backend: str, sessions: int, ops: int, workdir: str) -> dict:
+    rss_before = current_rss_kb()
+    store = build_store(backend, sessions, workdir)
+    phones = [f"+9198{i:08d}" for i in range(sessions)]
+
+    started = time.perf_counter()
+    for phone in phones:
+        store.save(phone, make_session(phone))
+    load_seconds = time.perf_counter() - started
+
+    # Zipf-ish skew: a few numbers message far more than the long tail
+    rng = random.Random(3)
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(ops):
+        phone = phones[min(int(rng.paretovariate(1.2)) - 1, sessions - 1)] if rng.random() < 0.8 \
+            else phones[rng.randrange(sessions)]
+        op_started = time.perf_counter()
+        session = store.get(phone) or make_session(phone)
+        session['message_count'] += 1
+        session['last_activity'] = datetime.now()
+        store.save(phone, session)
+        latencies.append(time.perf_counter() - op_started)
+    workload_seconds = time.perf_counter() - started
+
+    latencies.sort()
+    stats = store.get_stats()
+    return {
+        'load_per_s': round(sessions / load_seconds),
+        'ops_per_s': round(ops / workload_seconds),
+        'p50_us': round(percentile(latencies, 0.50) * 1e6, 1),
+        'p99_us': round(percentile(latencies, 0.99) * 1e6, 1),
+        'rss_mb': round((current_rss_kb() - rss_before) / 1024, 1),
+        'disk_mb': round(stats.get('file_bytes', 0) / 1024 / 1024, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sessions', type=int, default=1000000)
+    parser.add_argument('--ops', type=int, default=200000)
+    parser.add_argument('--backend', action='append',
+                        choices=['memory', 'sqlite', 'sqlite+lru', 'redis'],
+                        help='Backend to run; repeatable (default: memory, sqlite, sqlite+lru)')
+    args = parser.parse_args()
+
+    print(f"{'backend':<12} {'load/s':>9} {'get+save/s':>11} {'p50 us':>8} {'p99 us':>8} "
+          f"{'rss MB':>8} {'disk MB':>8}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for backend in args.backend or ['memory', 'sqlite', 'sqlite+lru']:
+            result = run(backend, args.sessions, args.ops, workdir)
+            print(f"{backend:<12} {result['load_per_s']:>9} {result['ops_per_s']:>11} {result['p50_us']:>8} "
+                  f"{result['p99_us']:>8} {result['rss_mb']:>8} {result['disk_mb']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Subscription registry benchmark for FisherMate.AI
+
+Loads N alert subscriptions (default 1,000,000) scattered around the
+registry's home ports. It then times resolving the recipients of one
+alert tile, and of a 50 km radius, through the geohash index. For
+comparison it times the linear scan that filtering every subscriber
+in Python would need.
+
+Usage (from backend/):
+    python -m benchmarks.bench_subscriptions [--subscriptions 1000000] [--queries 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import geohash  # noqa: E402
+from modules.gazetteer import get_gazetteer  # noqa: E402
+from modules.subscriptions import SubscriptionRegistry, group_recipients, tile_of  # noqa: E402
+from benchmarks.bench_scenarios import percentile  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--subscriptions', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    ports = [(port.lat, port.lon) for port in get_gazetteer().harbours()]
+    with tempfile.TemporaryDirectory() as workdir:
+        registry = SubscriptionRegistry(os.path.join(workdir, 'subscriptions.db'))
+        conn = registry._conn()
+
+        started = time.perf_counter()
+        conn.execute("BEGIN")
+        for i in range(args.subscriptions):
+            lat, lon = rng.choice(ports)
+            lat, lon = lat + rng.gauss(0, 0.3), lon + rng.gauss(0, 0.3)
+            conn.execute(
+                "INSERT INTO subscriptions (channel, address, language, lat, lon, geohash, port, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, NULL, 0)",
+                (rng.choice(['sms', 'whatsapp']), f"+9198{i:08d}", rng.choice(['en', 'hi', 'ta']),
+                 lat, lon, geohash.encode(lat, lon))
+            )
+        conn.execute("COMMIT")
+        print(f"loaded {args.subscriptions} subscriptions in {time.perf_counter() - started:.1f}s")
+
+        points = [rng.choice(ports) for _ in range(args.queries)]
+        results = {}
+        for name, resolve in (
+            ('tile', lambda lat, lon: registry.in_tiles([tile_of(lat, lon)])),
+            ('50 km radius', lambda lat, lon: registry.near(lat, lon, 50))
+        ):
+            latencies, matched = [], 0
+            for lat, lon in points:
+                started = time.perf_counter()
+                groups = group_recipients(resolve(lat, lon))
+                latencies.append(time.perf_counter() - started)
+                matched += sum(len(addresses) for addresses in groups.values())
+            latencies.sort()
+            results[name] = (percentile(latencies, 0.5), percentile(latencies, 0.99), matched / len(points))
+
+        # Linear baseline: every subscriber checked against the tile
+        lat, lon = points[0]
+        tile = tile_of(lat, lon)
+        started = time.perf_counter()
+        rows = [row for row in conn.execute("SELECT address, geohash FROM subscriptions") if row[1].startswith(tile)]
+        linear = time.perf_counter() - started
+
+        print(f"{'query':<14} {'p50 ms':>8} {'p99 ms':>8} {'recipients':>11}")
+        for name, (p50, p99, matched) in results.items():
+            print(f"{name:<14} {p50 * 1000:>8.2f} {p99 * 1000:>8.2f} {matched:>11.0f}")
+        print(f"{'linear scan':<14} {linear * 1000:>8.2f} {'':>8} {len(rows):>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Wire format benchmark for FisherMate.AI
+
+Compares JSON with the compact MessagePack format (modules.compact_format)
+on the real response shapes of /api/weather, /api/chat and /api/legal:
+payload size raw and gzipped, encode time and client-side parse time.
+
+Usage (from backend/):
+    python -m benchmarks.bench_wire_formats [--number 2000]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import timeit
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import compact_format, serialization  # noqa: E402
+from modules.legal_info import LegalInfoService  # noqa: E402
+from modules.weather_service import WeatherService  # noqa: E402
+from benchmarks.fixtures import canned_get  # noqa: E402
+
+
+def build_payloads() -> dict:
+    weather = WeatherService()
+    with mock.patch('modules.weather_service.requests.get', side_effect=canned_get):
+        current = weather.get_current_weather(13.08, 80.27)
+        chat_forecast = weather.get_weather_response('forecast for tomorrow', 'en', {'lat': 13.08, 'lon': 80.27})
+
+    legal = LegalInfoService().get_legal_info('Kerala', 'en')
+    return {
+        '/api/weather': current,
+        '/api/chat (forecast)': chat_forecast,
+        '/api/legal': legal
+    }
+
+
+def timed(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--number', type=int, default=2000)
+    args = parser.parse_args()
+
+    if not compact_format.is_available():
+        sys.exit("msgpack is not installed; pip install msgpack")
+
+    print(f"{'route':<22} {'format':<8} {'bytes':>7} {'gzip':>7} {'encode us':>10} {'parse us':>9}")
+    for route, payload in build_payloads().items():
+        as_json = serialization.dumps(payload)
+        as_compact = compact_format.pack(payload)
+
+        rows = [
+            ('json', as_json, lambda: serialization.dumps(payload), lambda: json.loads(as_json)),
+            ('compact', as_compact, lambda: compact_format.pack(payload), lambda: compact_format.unpack(as_compact))
+        ]
+        for name, body, encode, parse in rows:
+            print(f"{route:<22} {name:<8} {len(body):>7} {len(gzip.compress(body)):>7} "
+                  f"{timed(encode, args.number) * 1e6:>10.1f} {timed(parse, args.number) * 1e6:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
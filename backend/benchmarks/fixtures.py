@@ -0,0 +1,60 @@
+"""
+Canned upstream responses for FisherMate.AI benchmarks
+
+OpenWeatherMap bodies in the shape the real API returns, and a minimal
+requests.Response stand-in to hand them to WeatherService.
+"""
+
+import time
+
+
+class CannedResponse:
+    """Minimal stand-in for requests.Response"""
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+def openweather_forecast(days: int = 5) -> dict:
+    """OpenWeatherMap /forecast body with 3-hourly items"""
+    start = int(time.time())
+    return {
+        'city': {'name': 'Chennai', 'country': 'IN'},
+        'list': [
+            {
+                'dt': start + i * 3 * 3600,
+                'main': {'temp': 28 + (i % 5), 'humidity': 70 + (i % 10), 'pressure': 1008 + (i % 4)},
+                'weather': [{'description': 'scattered clouds', 'icon': '03d'}],
+                'wind': {'speed': 4.5 + (i % 7), 'deg': 220},
+                'rain': {'3h': (i % 6) * 1.5}
+            }
+            for i in range(days * 8)
+        ]
+    }
+
+
+def openweather_current() -> dict:
+    """OpenWeatherMap /weather body"""
+    now = int(time.time())
+    return {
+        'name': 'Chennai',
+        'sys': {'country': 'IN', 'sunrise': now - 6 * 3600, 'sunset': now + 6 * 3600},
+        'main': {'temp': 31.2, 'feels_like': 36.8, 'humidity': 74, 'pressure': 1006},
+        'weather': [{'description': 'light rain', 'icon': '10d'}],
+        'wind': {'speed': 8.4, 'deg': 200},
+        'visibility': 6000,
+        'rain': {'1h': 2.1}
+    }
+
+
+def canned_get(url, params=None, timeout=None):
+    """requests.get replacement answering both OpenWeatherMap endpoints"""
+    if url.endswith('/forecast'):
+        return CannedResponse(openweather_forecast())
+    return CannedResponse(openweather_current())
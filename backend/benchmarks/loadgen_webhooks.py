@@ -0,0 +1,228 @@
+"""
+Webhook load generator for FisherMate.AI
+
+Replays Twilio SMS/WhatsApp webhook traffic, either recorded or
+synthetic, straight into SMSHandler.handle_message and
+WhatsAppHandler.handle_message at a configurable rate and phone-number
+cardinality. Requests are scheduled open-loop. Latency is measured from
+each request's scheduled send time, so a stalled handler shows up as
+queueing delay instead of quietly lowering the offered load.
+
+Every --report-every seconds it prints throughput, p50/p95/p99 latency,
+error rate and the in-process size of each handler's session store.
+
+Recorded traffic is JSON lines, one webhook per line:
+    {"channel": "sms", "offset": 0.013, "body": "From=%2B919800000001&Body=W"}
+    {"channel": "whatsapp", "offset": 0.020, "form": {"From": "whatsapp:+9197...", "Body": "1"}}
+where offset is seconds since the start of the recording.
+
+Usage (from backend/):
+    python -m benchmarks.loadgen_webhooks --rate 200 --duration 60 --numbers 20000
+    python -m benchmarks.loadgen_webhooks --rate 50 --burst-every 20 --burst-factor 10
+    python -m benchmarks.loadgen_webhooks --replay alerts_2024_05.jsonl --speed 2
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Tuple
+from urllib.parse import parse_qsl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.sms_handler import SMSHandler  # noqa: E402
+from modules.whatsapp_handler import WhatsAppHandler  # noqa: E402
+from benchmarks.bench_scenarios import SMS_BODIES, WHATSAPP_SESSION, percentile  # noqa: E402
+
+# (offset seconds, channel, form fields)
+Webhook = Tuple[float, str, Dict[str, str]]
+
+SMS_NUMBER = '+15005550006'
+WHATSAPP_NUMBER = 'whatsapp:+14155238886'
+
+
+def webhook_request(handler, channel: str, form: Dict[str, str]) -> SimpleNamespace:
+    """Stand-in for the Flask request, signed like Twilio's if the handler checks signatures"""
+    path = f"/api/{channel}"
+    url = f"{getattr(handler, 'public_base_url', '') or 'http://localhost'}{path}"
+    validator = getattr(handler, 'validator', None)
+    headers = {'X-Twilio-Signature': validator.compute_signature(url, form)} if validator else {}
+    return SimpleNamespace(form=form, url=url, full_path=f"{path}?", headers=headers)
+
+
+def session_store_size(handler) -> Tuple[int, int]:
+    """(sessions, bytes held in this process) for a handler's session store"""
+    stats = handler.user_sessions.get_stats()
+    return stats['sessions'], stats.get('memory_bytes', 0)
+
+
+def synthetic_traffic(rate: float, duration: float, numbers: int, channels: List[str],
+                      burst_every: float = 0, burst_factor: float = 1, burst_length: float = 2,
+                      seed: int = 11) -> Iterator[Webhook]:
+    """Poisson arrivals; during a burst the rate is multiplied, like an alert going out"""
+    rng = random.Random(seed)
+    whatsapp_steps = defaultdict(int)
+    offset = 0.0
+    sent = 0
+    while True:
+        in_burst = burst_every > 0 and (offset % burst_every) < burst_length
+        offset += rng.expovariate(rate * (burst_factor if in_burst else 1))
+        if offset >= duration:
+            return
+        user = rng.randrange(numbers)
+        channel = rng.choice(channels)
+        sent += 1
+        if channel == 'sms':
+            form = {'From': f"+9198{user:08d}", 'To': SMS_NUMBER, 'Body': rng.choice(SMS_BODIES)}
+        else:
+            step = whatsapp_steps[user]
+            whatsapp_steps[user] += 1
+            form = {'From': f"whatsapp:+9197{user:08d}", 'To': WHATSAPP_NUMBER,
+                    'Body': WHATSAPP_SESSION[step % len(WHATSAPP_SESSION)]}
+        form['MessageSid'] = f"SM{seed:04x}{sent:028x}"
+        yield offset, channel, form
+
+
+def recorded_traffic(path: str, speed: float = 1.0) -> Iterator[Webhook]:
+    """Webhooks from a JSON lines recording, in offset order"""
+    webhooks = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            form = record.get('form') or dict(parse_qsl(record.get('body', ''), keep_blank_values=True))
+            webhooks.append((float(record.get('offset', 0)) / speed, record.get('channel', 'sms'), form))
+    webhooks.sort(key=lambda webhook: webhook[0])
+    yield from webhooks
+
+
+class LoadReport:
+    """Latency and error samples, reported per interval"""
+
+    def __init__(self, handlers: Dict):
+        self.handlers = handlers
+        self._lock = threading.Lock()
+        self._latencies: List[float] = []
+        self._errors = 0
+        self.total = 0
+        self.total_errors = 0
+        self.started = time.monotonic()
+        self._interval_started = self.started
+        self.baseline_bytes = {channel: session_store_size(h)[1] for channel, h in handlers.items()}
+
+    def record(self, latency: float, error: bool):
+        with self._lock:
+            self._latencies.append(latency)
+            self._errors += int(error)
+
+    def header(self):
+        stores = ' '.join(f"{channel + ' sessions':>17} {channel + ' KB':>12}" for channel in self.handlers)
+        print(f"{'t (s)':>6} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {stores}")
+
+    def flush(self):
+        with self._lock:
+            latencies, self._latencies = sorted(self._latencies), []
+            errors, self._errors = self._errors, 0
+        now = time.monotonic()
+        elapsed, self._interval_started = now - self._interval_started, now
+        self.total += len(latencies)
+        self.total_errors += errors
+
+        stores = []
+        for handler in self.handlers.values():
+            sessions, size = session_store_size(handler)
+            stores.append(f"{sessions:>17} {size // 1024:>12}")
+        error_rate = errors / len(latencies) if latencies else 0.0
+        print(f"{now - self.started:>6.0f} {len(latencies) / elapsed if elapsed else 0:>7.1f} "
+              f"{percentile(latencies, 0.50) * 1000:>8.1f} {percentile(latencies, 0.95) * 1000:>8.1f} "
+              f"{percentile(latencies, 0.99) * 1000:>8.1f} {error_rate:>7.1%} {' '.join(stores)}")
+
+    def summary(self):
+        print(f"\n{self.total} webhooks, {self.total_errors} errors "
+              f"({self.total_errors / self.total if self.total else 0:.2%})")
+        for channel, handler in self.handlers.items():
+            sessions, size = session_store_size(handler)
+            growth = size - self.baseline_bytes[channel]
+            print(f"{channel}: {sessions} sessions, session store grew {growth // 1024} KB "
+                  f"({growth / sessions if sessions else 0:.0f} B/session)")
+
+
+def run(traffic: Iterator[Webhook], handlers: Dict, workers: int, report_every: float):
+    error_bodies = {channel: handler.send_error_response() for channel, handler in handlers.items()}
+    report = LoadReport(handlers)
+    report.header()
+    stop = threading.Event()
+
+    def reporter():
+        while not stop.wait(report_every):
+            report.flush()
+
+    def deliver(channel: str, form: Dict, scheduled: float):
+        error = False
+        try:
+            body = handlers[channel].handle_message(webhook_request(handlers[channel], channel, form))
+            error = body == error_bodies[channel]
+        except Exception:
+            error = True
+        report.record(time.monotonic() - scheduled, error)
+
+    reporter_thread = threading.Thread(target=reporter, daemon=True)
+    reporter_thread.start()
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='loadgen') as pool:
+        for offset, channel, form in traffic:
+            if channel not in handlers:
+                continue
+            scheduled = started + offset
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(deliver, channel, form, scheduled)
+    stop.set()
+    reporter_thread.join()
+    report.flush()
+    report.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--channel', choices=['sms', 'whatsapp', 'both'], default='both')
+    parser.add_argument('--rate', type=float, default=100, help='Mean webhooks per second')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of synthetic traffic')
+    parser.add_argument('--numbers', type=int, default=10000, help='Distinct phone numbers')
+    parser.add_argument('--burst-every', type=float, default=0, help='Seconds between alert bursts')
+    parser.add_argument('--burst-factor', type=float, default=10, help='Rate multiplier during a burst')
+    parser.add_argument('--burst-length', type=float, default=2, help='Seconds each burst lasts')
+    parser.add_argument('--replay', help='JSON lines recording to replay instead of synthetic traffic')
+    parser.add_argument('--speed', type=float, default=1.0, help='Replay speed multiplier')
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--report-every', type=float, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    channels = ['sms', 'whatsapp'] if args.channel == 'both' else [args.channel]
+    handlers = {}
+    if 'sms' in channels:
+        handlers['sms'] = SMSHandler()
+    if 'whatsapp' in channels:
+        handlers['whatsapp'] = WhatsAppHandler()
+
+    if args.replay:
+        traffic = recorded_traffic(args.replay, args.speed)
+    else:
+        traffic = synthetic_traffic(args.rate, args.duration, args.numbers, channels,
+                                    args.burst_every, args.burst_factor, args.burst_length)
+    run(traffic, handlers, args.workers, args.report_every)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+In-process stub upstreams for FisherMate.AI benchmarks
+
+Replaces Gemini, OpenWeather, googletrans, gTTS, Google STT and Twilio
+with fakes that sleep for a configurable latency and fail at a
+configurable rate, so benchmark runs never leave the machine and the
+upstream behaviour is reproducible.
+
+    stubs = UpstreamStubs({'openweather': {'latency_ms': 400}})
+    with stubs.installed(app_module):
+        ...
+"""
+
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from types import SimpleNamespace
+from typing import Dict, Optional
+from unittest import mock
+
+from benchmarks.fixtures import canned_get
+
+# Typical latencies observed from the production region, in milliseconds
+DEFAULT_PROFILE = {
+    'gemini': {'latency_ms': 900, 'jitter_ms': 400},
+    'openweather': {'latency_ms': 120, 'jitter_ms': 60},
+    'googletrans': {'latency_ms': 150, 'jitter_ms': 80},
+    'gtts': {'latency_ms': 600, 'jitter_ms': 200},
+    'google_stt': {'latency_ms': 700, 'jitter_ms': 300},
+    'twilio': {'latency_ms': 200, 'jitter_ms': 100}
+}
+
+
+class StubUpstreamError(Exception):
+    """Injected upstream failure"""
+
+
+class StubUpstream:
+    """Latency and error injection for one fake upstream"""
+
+    def __init__(self, name: str, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.name = name
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def call(self):
+        """Sleep for one simulated round trip, then maybe fail"""
+        with self._lock:
+            self.calls += 1
+            delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if failed:
+            raise StubUpstreamError(f"{self.name}: injected failure")
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {'calls': self.calls, 'errors': self.errors}
+
+
+class UpstreamStubs:
+    """The full set of fake upstreams, patched into the imported app"""
+
+    def __init__(self, overrides: Optional[Dict[str, Dict]] = None, seed: int = 42):
+        self.upstreams: Dict[str, StubUpstream] = {}
+        for offset, (name, defaults) in enumerate(DEFAULT_PROFILE.items()):
+            config = dict(defaults, **(overrides or {}).get(name, {}))
+            self.upstreams[name] = StubUpstream(name, seed=seed + offset, **config)
+
+    def __getitem__(self, name: str) -> StubUpstream:
+        return self.upstreams[name]
+
+    def get_stats(self) -> Dict:
+        return {name: upstream.get_stats() for name, upstream in self.upstreams.items()}
+
+    # Fakes, one per upstream client API
+
+    def openweather_get(self, url, params=None, timeout=None):
+        self['openweather'].call()
+        return canned_get(url, params, timeout)
+
+    def gemini_generate(self, prompt, *args, **kwargs):
+        self['gemini'].call()
+        return SimpleNamespace(text=(
+            "Check the local forecast, carry a life jacket and a charged phone, "
+            "and tell someone ashore when you expect to return."
+        ))
+
+    def translate(self, text, src='auto', dest='en'):
+        self['googletrans'].call()
+        return SimpleNamespace(text=text, src=src, dest=dest)
+
+    def recognize_google(self, audio, language=None, **kwargs):
+        self['google_stt'].call()
+        return 'weather for fishing today'
+
+    def twilio_create(self, **kwargs):
+        self['twilio'].call()
+        return SimpleNamespace(sid=f"SM{random.getrandbits(64):016x}", status='queued')
+
+    def gtts_class(self):
+        stubs = self
+
+        class FakeTTS:
+            def __init__(self, text, lang='en', slow=False):
+                self.text = text
+
+            def save(self, path):
+                stubs['gtts'].call()
+                with open(path, 'wb') as f:
+                    f.write(b'ID3' + self.text.encode('utf-8')[:512])
+
+        return FakeTTS
+
+    @contextmanager
+    def installed(self, app_module):
+        """Patch every upstream client used by the imported app module"""
+        twilio_client = SimpleNamespace(messages=SimpleNamespace(create=self.twilio_create))
+        with ExitStack() as stack:
+            stack.enter_context(mock.patch('modules.weather_service.requests.get', side_effect=self.openweather_get))
+            stack.enter_context(mock.patch('modules.voice_handler.gTTS', self.gtts_class()))
+            stack.enter_context(mock.patch.object(app_module.model, 'generate_content', self.gemini_generate))
+            stack.enter_context(mock.patch.object(
+                app_module.language_processor.translator, 'translate', self.translate))
+            stack.enter_context(mock.patch.object(
+                app_module.voice_handler.recognizer, 'recognize_google', self.recognize_google))
+            for handler in (app_module.sms_handler, app_module.whatsapp_handler):
+                stack.enter_context(mock.patch.object(handler, 'client', twilio_client))
+            yield self
@@ -0,0 +1,147 @@
+"""
+Local Twilio stand-in for FisherMate.AI broadcast tests
+
+Serves the Messages endpoint of the Twilio REST API on localhost. It
+enforces an account throughput limit in segments per second, answering
+429 (code 20429) like Twilio does when it is exceeded. It also injects
+latency and random 500s, and rejects numbers ending in 000 as invalid
+(400, code 21211). Point the app at it with
+TWILIO_API_BASE_URL=http://127.0.0.1:<port>.
+
+Usage (from backend/):
+    python -m benchmarks.twilio_standin [--port 8099] [--mps 100] [--latency-ms 150] [--error-rate 0.01]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.sms_encoding import count_segments  # noqa: E402
+
+
+class TwilioStandin(ThreadingHTTPServer):
+    """Messages API with a token-bucket MPS limit and fault injection"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], mps: float = 100, latency_ms: float = 150,
+                 error_rate: float = 0.0, seed: int = 7):
+        super().__init__(address, _Handler)
+        self.mps = mps
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._tokens = mps
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.throttled = 0
+        self.errors = 0
+        self.invalid = 0
+        self.segments = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def admit(self, segments: int = 1) -> str:
+        """Decide the fate of one request: ok, throttled or error"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.mps, self._tokens + (now - self._updated) * self.mps)
+            self._updated = now
+            if self._tokens < segments:
+                self.throttled += 1
+                return 'throttled'
+            self._tokens -= segments
+            if self._random.random() < self.error_rate:
+                self.errors += 1
+                return 'error'
+            return 'ok'
+
+    def get_stats(self) -> dict:
+        return {'accepted': self.accepted, 'segments': self.segments, 'throttled': self.throttled,
+                'errors': self.errors, 'invalid': self.invalid}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: TwilioStandin
+
+    def do_POST(self):
+        if not self.path.endswith('/Messages.json'):
+            return self._reply(404, {'code': 20404, 'message': 'Not Found', 'status': 404})
+        length = int(self.headers.get('Content-Length', 0))
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode('utf-8')).items()}
+        time.sleep(self.server.latency_ms / 1000)
+
+        to = form.get('To', '')
+        if to.endswith('000'):
+            self.server.invalid += 1
+            return self._reply(400, {'code': 21211, 'message': f"The 'To' number {to} is not a valid phone number.",
+                                     'status': 400})
+        segments = count_segments(form.get('Body', ''))
+        outcome = self.server.admit(segments)
+        if outcome == 'throttled':
+            return self._reply(429, {'code': 20429, 'message': 'Too Many Requests', 'status': 429})
+        if outcome == 'error':
+            return self._reply(500, {'code': 20500, 'message': 'Internal Server Error', 'status': 500})
+
+        self.server.accepted += 1
+        self.server.segments += segments
+        self._reply(201, {
+            'sid': 'SM' + uuid.uuid4().hex,
+            'to': to,
+            'from': form.get('From'),
+            'body': form.get('Body'),
+            'status': 'queued',
+            'num_segments': str(segments)
+        })
+
+    def _reply(self, status: int, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_standin(port: int = 0, **options) -> TwilioStandin:
+    """Run a stand-in on a background thread; port 0 picks a free one"""
+    server = TwilioStandin(('127.0.0.1', port), **options)
+    threading.Thread(target=server.serve_forever, name='twilio-standin', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--mps', type=float, default=100, help='Account throughput limit, segments per second')
+    parser.add_argument('--latency-ms', type=float, default=150)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 500')
+    args = parser.parse_args()
+
+    server = TwilioStandin(('127.0.0.1', args.port), args.mps, args.latency_ms, args.error_rate)
+    print(f"Twilio stand-in on {server.url} ({args.mps} MPS)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(server.get_stats()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+"""
+Gunicorn configuration for FisherMate.AI
+
+PRELOAD_SERVICES=true imports the app in the master and builds every
+service there (see ServiceRegistry.preload), so heavy modules and VOSK
+models are loaded once and shared copy-on-write with forked workers.
+Background threads are only started in the workers (post_worker_init).
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+preload_app = os.getenv('PRELOAD_SERVICES', 'false').lower() == 'true'
+
+
+def post_worker_init(worker):
+    """Start this worker's background threads; see app.start_background_work"""
+    from app import start_background_work
+    start_background_work()
@@ -0,0 +1,282 @@
+"""
+Alerts Module for FisherMate.AI
+Fans weather safety changes out to subscribed SMS/WhatsApp users, tile by tile
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from modules import geohash
+from modules.metrics import registry
+from modules.subscriptions import SubscriptionRegistry, group_recipients, tile_of
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ALERTS_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'alerts.db')
+
+SEVERITY = {'safe': 0, 'caution': 1, 'dangerous': 2}
+
+ALERTS = registry.counter(
+    'fishermate_alerts_total', 'Area weather alerts sent, by safety level', ['level']
+)
+ALERT_ESTIMATE = registry.histogram(
+    'fishermate_alert_delivery_estimate_seconds', 'Estimated time for an alert to reach every subscriber',
+    ['channel'], buckets=(5, 15, 30, 60, 120, 300, 600, 1800)
+)
+
+
+class AlertState:
+    """Last observed and last alerted safety level per tile, in SQLite
+
+    Claims run in BEGIN IMMEDIATE transactions, so when several workers
+    see the same transition only one of them sends the alert.
+    """
+
+    def __init__(self, path: str = DEFAULT_ALERTS_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(
+            "CREATE TABLE IF NOT EXISTS alert_tiles ("
+            " tile TEXT PRIMARY KEY, level TEXT NOT NULL, observed REAL NOT NULL,"
+            " alerted_level TEXT NOT NULL DEFAULT 'safe', alerted_at REAL NOT NULL DEFAULT 0) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS alert_log ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, tile TEXT NOT NULL, level TEXT NOT NULL, created REAL NOT NULL,"
+            " recipients INTEGER NOT NULL, estimate REAL NOT NULL, jobs TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS alert_leases ("
+            " name TEXT PRIMARY KEY, owner TEXT, lease_until REAL NOT NULL DEFAULT 0) WITHOUT ROWID;"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def claim(self, tile: str, level: str, cooldown: float, now: Optional[float] = None) -> bool:
+        """Record an observation; True if it should be alerted
+
+        A rise in severity is alerted at once. Anything else, including
+        the all-clear back to safe, waits until `cooldown` seconds after
+        the tile's last alert, so a level flapping around a threshold
+        does not re-alert everyone.
+        """
+        now = time.time() if now is None else now
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT alerted_level, alerted_at FROM alert_tiles WHERE tile = ?", (tile,)
+            ).fetchone()
+            alerted_level, alerted_at = row or ('safe', 0.0)
+            alert = level != alerted_level and (
+                SEVERITY[level] > SEVERITY[alerted_level] or now - alerted_at >= cooldown
+            )
+            if alert:
+                alerted_level, alerted_at = level, now
+            conn.execute(
+                "INSERT OR REPLACE INTO alert_tiles (tile, level, observed, alerted_level, alerted_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (tile, level, now, alerted_level, alerted_at)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return alert
+
+    def log(self, tile: str, level: str, recipients: int, estimate: float, jobs: Dict[str, str]):
+        self._conn().execute(
+            "INSERT INTO alert_log (tile, level, created, recipients, estimate, jobs) VALUES (?, ?, ?, ?, ?, ?)",
+            (tile, level, time.time(), recipients, estimate, json.dumps(jobs))
+        )
+
+    def recent(self, limit: int = 20) -> List[Dict]:
+        return [
+            {'tile': tile, 'level': level, 'created': created, 'recipients': recipients,
+             'estimated_seconds': estimate, 'jobs': json.loads(jobs)}
+            for tile, level, created, recipients, estimate, jobs in self._conn().execute(
+                "SELECT tile, level, created, recipients, estimate, jobs FROM alert_log ORDER BY id DESC LIMIT ?",
+                (limit,)
+            )
+        ]
+
+    def levels(self) -> Dict[str, int]:
+        """Number of tiles currently at each level"""
+        return dict(self._conn().execute("SELECT level, COUNT(*) FROM alert_tiles GROUP BY level"))
+
+    def acquire_lease(self, name: str, owner: str, seconds: float) -> bool:
+        """Take a named lease if free or expired; renews it if already held by owner"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("INSERT OR IGNORE INTO alert_leases (name) VALUES (?)", (name,))
+        return conn.execute(
+            "UPDATE alert_leases SET owner = ?, lease_until = ? WHERE name = ? AND (lease_until < ? OR owner = ?)",
+            (owner, now + seconds, name, now, owner)
+        ).rowcount == 1
+
+
+class AlertPipeline:
+    """Weather readings in, area alerts out
+
+    Each fresh reading from the WeatherService is mapped to its alert
+    tile. When the tile's safety level changes (AlertState.claim), its
+    subscribers are grouped by channel and language, the alert is
+    rendered once per group and queued as one broadcast per group on the
+    channel's rate-limited BroadcastEngine. Before queueing, the time to
+    reach every subscriber is estimated from the channel's backlog and
+    rate, and a warning is logged when it exceeds `delivery_bound`.
+
+    With the monitor started, the tiles that have subscribers are also
+    re-read every `interval` seconds, by one worker at a time.
+    """
+
+    def __init__(self, weather_service, sms_handler, whatsapp_handler, subscriptions: SubscriptionRegistry,
+                 state: AlertState, cooldown: float = 10800, delivery_bound: float = 300, interval: float = 600):
+        self.weather_service = weather_service
+        self.handlers = {'sms': sms_handler, 'whatsapp': whatsapp_handler}
+        self.subscriptions = subscriptions
+        self.state = state
+        self.cooldown = cooldown
+        self.delivery_bound = delivery_bound
+        self.interval = interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        # One fan-out at a time, off the request thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='alert-fanout')
+        self._monitor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        weather_service.add_safety_listener(self.observe)
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Threads do not survive a fork; a serving worker starts its own monitor
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='alert-fanout')
+        self._monitor = None
+        self._stop = threading.Event()
+
+    def observe(self, lat: float, lon: float, weather_info: Dict):
+        """WeatherService listener"""
+        level = weather_info.get('safety_assessment', {}).get('level')
+        if level in SEVERITY:
+            self._executor.submit(self._process, tile_of(lat, lon), level, weather_info)
+
+    def _process(self, tile: str, level: str, weather_info: Dict):
+        try:
+            self.process(tile, level, weather_info)
+        except Exception as e:
+            logger.error(f"Alert fan-out error for tile {tile}: {str(e)}")
+
+    def process(self, tile: str, level: str, weather_info: Dict) -> Optional[Dict]:
+        """Alert the tile's subscribers if its level changed; returns the alert, or None"""
+        if not self.state.claim(tile, level, self.cooldown):
+            return None
+
+        groups = group_recipients(self.subscriptions.in_tiles([tile]))
+        current = weather_info.get('current', {})
+        alert = {
+            'safety_level': level,
+            'description': current.get('description', 'Weather update').capitalize(),
+            'wind_speed': round(current.get('wind_speed', 0))
+        }
+
+        # Render once per (channel, language) and cost it in rate-limiter tokens
+        messages, tokens = {}, {}
+        for (channel, language), addresses in groups.items():
+            handler = self.handlers.get(channel)
+            if handler is None or not handler.client:
+                logger.warning(f"Alert for tile {tile}: {channel} unavailable, {len(addresses)} subscribers skipped")
+                continue
+            message = handler.format_weather_alert(alert, language)
+            # SMS goes out as planned segments (GSM-7 fallback, numbered parts)
+            parts = handler.plan_message(message).parts if channel == 'sms' else [message]
+            messages[(channel, language)] = parts
+            tokens[channel] = tokens.get(channel, 0) + len(addresses) * sum(map(handler.broadcasts.cost, parts))
+
+        estimate = 0.0
+        for channel, cost in tokens.items():
+            seconds = self.handlers[channel].broadcasts.estimate_seconds(cost)
+            ALERT_ESTIMATE.observe(seconds, channel)
+            estimate = max(estimate, seconds)
+        if estimate > self.delivery_bound:
+            logger.warning(f"Alert for tile {tile} needs ~{estimate:.0f}s to reach every subscriber, over the "
+                           f"{self.delivery_bound:.0f}s bound; raise BROADCAST_RATE/WHATSAPP_BROADCAST_RATE")
+
+        jobs = {}
+        for (channel, language), parts in messages.items():
+            job_id = self.handlers[channel].broadcasts.submit(groups[(channel, language)], parts)
+            jobs[f"{channel}:{language}"] = job_id
+
+        recipients = sum(len(groups[key]) for key in messages)
+        ALERTS.inc(level)
+        self.state.log(tile, level, recipients, round(estimate, 1), jobs)
+        logger.info(f"Alert {level} for tile {tile}: {recipients} subscribers, {len(jobs)} broadcast(s), "
+                    f"~{estimate:.0f}s")
+        return {'tile': tile, 'level': level, 'recipients': recipients, 'estimated_seconds': round(estimate, 1),
+                'jobs': jobs}
+
+    def refresh(self) -> int:
+        """Re-read the weather at the centre of every subscribed tile; returns tiles read"""
+        tiles = self.subscriptions.tiles()
+        for tile in tiles:
+            lat_min, lat_max, lon_min, lon_max = geohash.bbox(tile)
+            # A fresh reading reaches observe() through the listener
+            self.weather_service.get_current_weather((lat_min + lat_max) / 2, (lon_min + lon_max) / 2)
+        return len(tiles)
+
+    def start(self):
+        """Run refresh() every interval in the background, leased across workers
+
+        Call it in serving workers only (see app.start_background_work),
+        not where the pipeline is built, which may be a preloading master.
+        """
+        if self._monitor is None:
+            self._stop.clear()
+            self._monitor = threading.Thread(target=self._run_monitor, name='alert-monitor', daemon=True)
+            self._monitor.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run_monitor(self):
+        while not self._stop.is_set():
+            # The lease lasts one interval, so only one worker refreshes per interval
+            if self.state.acquire_lease('monitor', self.owner, self.interval):
+                try:
+                    started = time.monotonic()
+                    count = self.refresh()
+                    logger.info(f"Alert monitor: {count} tiles refreshed in {time.monotonic() - started:.1f}s")
+                except Exception as e:
+                    logger.error(f"Alert monitor error: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def get_stats(self, limit: int = 20) -> Dict:
+        return {
+            'tiles': self.state.levels(),
+            'monitor': self._monitor is not None,
+            'cooldown_seconds': self.cooldown,
+            'delivery_bound_seconds': self.delivery_bound,
+            'recent': self.state.recent(limit)
+        }
+
+
+def create_alert_pipeline(weather_service, sms_handler, whatsapp_handler) -> AlertPipeline:
+    """Pipeline configured from ALERT_* environment variables"""
+    return AlertPipeline(
+        weather_service, sms_handler, whatsapp_handler,
+        subscriptions=sms_handler.subscriptions,
+        state=AlertState(os.getenv('ALERTS_PATH', DEFAULT_ALERTS_PATH)),
+        cooldown=float(os.getenv('ALERT_COOLDOWN', 10800)),
+        delivery_bound=float(os.getenv('ALERT_DELIVERY_BOUND', 300)),
+        interval=float(os.getenv('ALERT_REFRESH_INTERVAL', 600))
+    )
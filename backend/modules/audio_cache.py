@@ -0,0 +1,172 @@
+"""
+Audio Cache Module for FisherMate.AI
+Content-addressed store of synthesized speech, evicted least recently used first
+"""
+
+import hashlib
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from modules.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# Partial files of a synthesis that died are removed after this many seconds
+STALE_PARTIAL_SECONDS = 3600
+
+
+def content_key(*parts) -> str:
+    """Stable hex digest of the inputs that determine the audio"""
+    return hashlib.sha256('\0'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:32]
+
+
+class _Flight:
+    __slots__ = ('done', 'ok')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+
+
+class AudioCache:
+    """Audio files named by the hash of what they say, in one directory
+
+    A file is written once, to a partial name then renamed into place, so
+    a name that exists is always complete and never changes; it can be
+    served with a long max-age and its name as ETag. Concurrent requests
+    for the same name share one synthesis. Files are tracked by size and
+    last access, and the least recently used are removed once the
+    directory holds more than `max_bytes`.
+
+    Several processes may share the directory: a file another process
+    wrote is a hit, a file another process evicted is a miss, and each
+    access is stamped on the file's atime so the order survives restarts.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024, suffix: str = '.mp3',
+                 name: str = 'tts'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.name = name
+        self._files: 'OrderedDict[str, int]' = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """Index the files already on disk, least recently used first"""
+        found = []
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            try:
+                stat = entry.stat()
+                if entry.name.endswith(self.suffix):
+                    found.append((stat.st_atime, entry.name, stat.st_size))
+                elif entry.name.endswith('.partial') and stat.st_mtime < now - STALE_PARTIAL_SECONDS:
+                    os.remove(entry.path)
+            except OSError:
+                continue
+        for _, filename, size in sorted(found):
+            self._files[filename] = size
+            self.total_bytes += size
+        self._evict()
+
+    def _touch(self, filename: str) -> bool:
+        """Record an access; False if the file is gone"""
+        path = os.path.join(self.directory, filename)
+        try:
+            stat = os.stat(path)
+            os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+        except FileNotFoundError:
+            self.total_bytes -= self._files.pop(filename, 0)
+            return False
+        if filename not in self._files:
+            # Written by another process
+            self._files[filename] = stat.st_size
+            self.total_bytes += stat.st_size
+        self._files.move_to_end(filename)
+        return True
+
+    def _evict(self):
+        # The newest file stays even if it alone is over the limit
+        while self.total_bytes > self.max_bytes and len(self._files) > 1:
+            filename, size = self._files.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                pass
+
+    def get(self, filename: str, synthesize: Callable[[str], None]) -> Optional[str]:
+        """Name of the cached file, calling synthesize(path) to write it on a miss
+
+        Errors of synthesize() propagate to the request that ran it. Requests
+        that waited on it get None rather than trying the upstream again.
+        """
+        with self._lock:
+            if self._touch(filename):
+                self.hits += 1
+                record_cache_lookup(self.name, True)
+                return filename
+            flight = self._inflight.get(filename)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[filename] = _Flight()
+                self.misses += 1
+            else:
+                self.shared += 1
+        record_cache_lookup(self.name, not leader)
+
+        if not leader:
+            flight.done.wait()
+            return filename if flight.ok else None
+
+        path = os.path.join(self.directory, filename)
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}.partial"
+        try:
+            synthesize(partial)
+            os.replace(partial, path)
+            size = os.path.getsize(path)
+            with self._lock:
+                self.total_bytes += size - self._files.get(filename, 0)
+                self._files[filename] = size
+                self._files.move_to_end(filename)
+                self._evict()
+            flight.ok = True
+            return filename
+        finally:
+            if not flight.ok:
+                try:
+                    os.remove(partial)
+                except FileNotFoundError:
+                    pass
+            with self._lock:
+                self._inflight.pop(filename, None)
+            flight.done.set()
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics"""
+        with self._lock:
+            total = self.hits + self.shared + self.misses
+            return {
+                'files': len(self._files),
+                'size_mb': round(self.total_bytes / (1024 * 1024), 2),
+                'max_mb': round(self.max_bytes / (1024 * 1024), 2),
+                'hits': self.hits,
+                'shared': self.shared,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': (self.hits + self.shared) / total if total else 0
+            }
@@ -0,0 +1,494 @@
+"""
+Broadcast Module for FisherMate.AI
+Concurrent, rate-limited SMS/WhatsApp broadcasts from a persistent, resumable job queue
+"""
+
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from modules.bulkhead import BulkheadFullError
+from modules.metrics import registry
+from modules.sms_encoding import count_segments
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'broadcasts.db')
+
+# A dispatcher must renew its job lease within this many seconds, or
+# another worker (or the next start) takes the job over
+LEASE_SECONDS = 30.0
+
+DELIVERIES = registry.counter(
+    'fishermate_broadcast_deliveries_total', 'Broadcast delivery attempts by result', ['result']
+)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Twilio 429/5xx, bulkhead rejections and network errors are worth retrying
+
+    Any other HTTP status (invalid number, opted-out recipient, ...) will
+    fail the same way again, and so will anything else: a TypeError or
+    KeyError is a bug, not a transient failure.
+    """
+    status = getattr(error, 'status', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    # requests' connection and timeout errors are OSErrors too
+    return isinstance(error, (OSError, BulkheadFullError))
+
+
+class RateLimiter:
+    """Token bucket for one Twilio account, in message segments per second
+
+    The bucket is a row in the broadcast queue's SQLite file, so every
+    worker on the host draws from the same one and the account rate
+    holds however many workers are sending. Callers reserve tokens in a
+    short transaction and sleep off any deficit outside it, so senders
+    are admitted in arrival order.
+    """
+
+    def __init__(self, queue: 'BroadcastQueue', account: str, rate: float, burst: Optional[float] = None):
+        self.queue = queue
+        self.account = account
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+
+    def acquire(self, tokens: float = 1.0):
+        wait = self.queue.take_tokens(self.account, tokens, self.rate, self.burst)
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold every sender back, e.g. after Twilio answers 429"""
+        self.queue.pause_account(self.account, seconds)
+
+
+class BroadcastQueue:
+    """Broadcast jobs and per-recipient delivery state in a WAL-mode SQLite file
+
+    Every state change is written before the next step, so a crashed
+    broadcast resumes where it stopped. A recipient that was mid-send
+    at the crash is sent again (at-least-once), from the first part
+    not yet confirmed. Finished jobs are kept for `retention` seconds.
+
+    The file also holds each account's rate-limit bucket (RateLimiter).
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, retention: float = 7 * 86400):
+        self.path = path
+        self.retention = retention
+        self._local = threading.local()
+        self._conn().executescript(
+            "CREATE TABLE IF NOT EXISTS broadcast_jobs ("
+            " id TEXT PRIMARY KEY, channel TEXT NOT NULL DEFAULT 'sms', parts TEXT NOT NULL, total INTEGER NOT NULL,"
+            " created REAL NOT NULL, finished REAL, owner TEXT, lease_until REAL NOT NULL DEFAULT 0);"
+            "CREATE TABLE IF NOT EXISTS broadcast_deliveries ("
+            " job_id TEXT NOT NULL, number TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pending',"
+            " parts_sent INTEGER NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt REAL NOT NULL DEFAULT 0, error TEXT,"
+            " PRIMARY KEY (job_id, number)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS broadcast_due ON broadcast_deliveries (job_id, status, next_attempt);"
+            "CREATE INDEX IF NOT EXISTS broadcast_finished ON broadcast_jobs (finished);"
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            " account TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL,"
+            " paused_until REAL NOT NULL DEFAULT 0) WITHOUT ROWID;"
+        )
+        columns = {row[1] for row in self._conn().execute("PRAGMA table_info(broadcast_jobs)")}
+        if 'channel' not in columns:
+            self._conn().execute("ALTER TABLE broadcast_jobs ADD COLUMN channel TEXT NOT NULL DEFAULT 'sms'")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def create_job(self, numbers: Sequence[str], parts: List[str], channel: str = 'sms') -> str:
+        job_id = uuid.uuid4().hex
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO broadcast_jobs (id, channel, parts, total, created) VALUES (?, ?, ?, ?, ?)",
+                (job_id, channel, json.dumps(parts), len(numbers), time.time())
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO broadcast_deliveries (job_id, number) VALUES (?, ?)",
+                ((job_id, number) for number in numbers)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        row = self._conn().execute(
+            "SELECT channel, parts, total, created, finished, owner, lease_until FROM broadcast_jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        channel, parts, total, created, finished, owner, lease_until = row
+        return {'id': job_id, 'channel': channel, 'parts': json.loads(parts), 'total': total, 'created': created,
+                'finished': finished, 'owner': owner, 'lease_until': lease_until}
+
+    def unfinished_jobs(self, channel: str = 'sms') -> List[str]:
+        return [row[0] for row in self._conn().execute(
+            "SELECT id FROM broadcast_jobs WHERE finished IS NULL AND channel = ? ORDER BY created", (channel,)
+        )]
+
+    def acquire_lease(self, job_id: str, owner: str, seconds: float = LEASE_SECONDS) -> bool:
+        """Take or renew the job's lease; only the holder dispatches it"""
+        now = time.time()
+        cursor = self._conn().execute(
+            "UPDATE broadcast_jobs SET owner = ?, lease_until = ?"
+            " WHERE id = ? AND finished IS NULL AND (owner = ? OR lease_until < ?)",
+            (owner, now + seconds, job_id, owner, now)
+        )
+        return cursor.rowcount == 1
+
+    def requeue_inflight(self, job_id: str) -> int:
+        """Put deliveries a dead dispatcher left mid-send back in the queue"""
+        return self._conn().execute(
+            "UPDATE broadcast_deliveries SET status = 'pending' WHERE job_id = ? AND status = 'sending'", (job_id,)
+        ).rowcount
+
+    def claim(self, job_id: str, limit: int) -> List[Tuple[str, int, int]]:
+        """Mark up to `limit` due deliveries as sending: (number, parts_sent, attempts)"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT number, parts_sent, attempts FROM broadcast_deliveries"
+                " WHERE job_id = ? AND status = 'pending' AND next_attempt <= ? LIMIT ?",
+                (job_id, time.time(), limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE broadcast_deliveries SET status = 'sending' WHERE job_id = ? AND number = ?",
+                ((job_id, number) for number, _, _ in rows)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def next_due(self, job_id: str) -> Optional[float]:
+        """When the earliest pending delivery may be tried; None if nothing is pending"""
+        return self._conn().execute(
+            "SELECT MIN(next_attempt) FROM broadcast_deliveries WHERE job_id = ? AND status = 'pending'", (job_id,)
+        ).fetchone()[0]
+
+    def update(self, job_id: str, number: str, status: str, parts_sent: int, attempts: int,
+               next_attempt: float = 0, error: Optional[str] = None):
+        self._conn().execute(
+            "UPDATE broadcast_deliveries SET status = ?, parts_sent = ?, attempts = ?, next_attempt = ?, error = ?"
+            " WHERE job_id = ? AND number = ?",
+            (status, parts_sent, attempts, next_attempt, error, job_id, number)
+        )
+
+    def finish(self, job_id: str):
+        self._conn().execute(
+            "UPDATE broadcast_jobs SET finished = ?, owner = NULL WHERE id = ?", (time.time(), job_id)
+        )
+
+    def counts(self, job_id: str) -> Dict[str, int]:
+        counts = {'pending': 0, 'sending': 0, 'sent': 0, 'failed': 0, 'retrying': 0}
+        for status, count, retried in self._conn().execute(
+            "SELECT status, COUNT(*), SUM(attempts > 0) FROM broadcast_deliveries WHERE job_id = ? GROUP BY status",
+            (job_id,)
+        ):
+            counts[status] = count
+            if status == 'pending':
+                counts['retrying'] = retried or 0
+        return counts
+
+    def prune(self) -> int:
+        """Forget jobs finished before the retention window, with their deliveries"""
+        cutoff = time.time() - self.retention
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM broadcast_deliveries WHERE job_id IN"
+                " (SELECT id FROM broadcast_jobs WHERE finished < ?)", (cutoff,)
+            )
+            pruned = conn.execute("DELETE FROM broadcast_jobs WHERE finished < ?", (cutoff,)).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return pruned
+
+    def take_tokens(self, account: str, tokens: float, rate: float, burst: float) -> float:
+        """Reserve tokens from the account's bucket; returns seconds to wait before sending"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated, paused_until FROM rate_limits WHERE account = ?", (account,)
+            ).fetchone()
+            if row is None:
+                available, paused_until = burst, 0.0
+            else:
+                available, paused_until = min(burst, row[0] + max(0.0, now - row[1]) * rate), row[2]
+            available -= tokens
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits (account, tokens, updated, paused_until) VALUES (?, ?, ?, ?)",
+                (account, available, now, paused_until)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return max(-available / rate, paused_until - now, 0.0)
+
+    def pause_account(self, account: str, seconds: float):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("INSERT OR IGNORE INTO rate_limits (account, tokens, updated) VALUES (?, 0, ?)", (account, now))
+        conn.execute(
+            "UPDATE rate_limits SET paused_until = MAX(paused_until, ?) WHERE account = ?", (now + seconds, account)
+        )
+
+    def numbers(self, job_id: str, status: str) -> List[str]:
+        return [row[0] for row in self._conn().execute(
+            "SELECT number FROM broadcast_deliveries WHERE job_id = ? AND status = ?", (job_id, status)
+        )]
+
+
+class BroadcastEngine:
+    """Sends each job's parts to every recipient through a worker pool
+
+    `send(number, body)` delivers one part and raises on failure. Parts
+    are paced by the account's RateLimiter, shared by every worker
+    on the host, each costing `cost(body)` tokens: SMS segments by default. Retryable failures
+    back off exponentially with jitter, and a 429 also pauses the whole
+    account. After `max_attempts` the recipient is marked failed.
+
+    Each job has one dispatcher thread in the process holding its
+    lease. It claims due deliveries from the queue and hands them to
+    the pool.
+    """
+
+    def __init__(self, send: Callable[[str, str], object], queue: BroadcastQueue, limiter: RateLimiter,
+                 workers: int = 8, max_attempts: int = 5, backoff: float = 2.0, backoff_cap: float = 300.0,
+                 channel: str = 'sms', cost: Callable[[str], float] = count_segments):
+        self.send = send
+        self.queue = queue
+        self.limiter = limiter
+        self.channel = channel
+        self.cost = cost
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_cap = backoff_cap
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._inflight = threading.BoundedSemaphore(workers * 2)
+        self._dispatchers: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        # Jobs interrupted in an earlier process are picked up on first use
+        self._resume_due = True
+        self._next_prune = 0.0
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Threads do not survive a fork; the child resumes its jobs on first use
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._executor = None
+        self._inflight = threading.BoundedSemaphore(self.workers * 2)
+        self._dispatchers = {}
+        self._lock = threading.Lock()
+        self._resume_due = True
+
+    def submit(self, numbers: Sequence[str], parts: List[str]) -> str:
+        """Queue a broadcast of `parts` to every number and start sending"""
+        self.resume_if_due()
+        now = time.time()
+        if now >= self._next_prune:
+            self._next_prune = now + 3600
+            self.queue.prune()
+        job_id = self.queue.create_job(list(dict.fromkeys(numbers)), parts, self.channel)
+        logger.info(f"Broadcast {job_id}: {len(numbers)} recipients, {len(parts)} part(s) each")
+        self._start(job_id)
+        return job_id
+
+    def resume_if_due(self) -> List[str]:
+        """resume() once per process: on first use, and again in a forked child
+
+        Never from a constructor, which may run in a preloading gunicorn
+        master; threads started there would send alongside the workers.
+        """
+        if not self._resume_due:
+            return []
+        self._resume_due = False
+        return self.resume()
+
+    def resume(self) -> List[str]:
+        """Restart unfinished jobs whose dispatcher is gone (crash or restart)"""
+        resumed = []
+        for job_id in self.queue.unfinished_jobs(self.channel):
+            if job_id not in self._dispatchers and self._start(job_id):
+                resumed.append(job_id)
+        if resumed:
+            logger.info(f"Resumed {len(resumed)} broadcast(s)")
+        return resumed
+
+    def _start(self, job_id: str) -> bool:
+        with self._lock:
+            if job_id in self._dispatchers or not self.queue.acquire_lease(job_id, self.owner):
+                return False
+            self.queue.requeue_inflight(job_id)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='broadcast')
+            thread = threading.Thread(target=self._dispatch, args=(job_id,), name=f'broadcast-{job_id[:8]}',
+                                      daemon=True)
+            self._dispatchers[job_id] = thread
+            thread.start()
+            return True
+
+    def _dispatch(self, job_id: str):
+        parts = self.queue.get_job(job_id)['parts']
+        try:
+            while self.queue.acquire_lease(job_id, self.owner):
+                batch = self.queue.claim(job_id, self.workers)
+                for number, parts_sent, attempts in batch:
+                    # Keep the lease alive while the pool is saturated or paused
+                    while not self._inflight.acquire(timeout=LEASE_SECONDS / 3):
+                        self.queue.acquire_lease(job_id, self.owner)
+                    self._executor.submit(self._deliver, job_id, parts, number, parts_sent, attempts)
+                if batch:
+                    continue
+
+                due = self.queue.next_due(job_id)
+                if due is None and self.queue.counts(job_id)['sending'] == 0:
+                    self.queue.finish(job_id)
+                    logger.info(f"Broadcast {job_id} finished: {self.queue.counts(job_id)}")
+                    return
+                # Wait for in-flight sends, or for the next retry to fall due
+                time.sleep(min(max((due or 0) - time.time(), 0.05), 1.0))
+            logger.warning(f"Broadcast {job_id}: lease lost, another worker took over")
+        except Exception as e:
+            logger.error(f"Broadcast dispatcher error: {str(e)}")
+        finally:
+            with self._lock:
+                self._dispatchers.pop(job_id, None)
+
+    def _deliver(self, job_id: str, parts: List[str], number: str, parts_sent: int, attempts: int):
+        try:
+            for index in range(parts_sent, len(parts)):
+                self.limiter.acquire(self.cost(parts[index]))
+                self.send(number, parts[index])
+                parts_sent = index + 1
+            self.queue.update(job_id, number, 'sent', parts_sent, attempts + 1)
+            DELIVERIES.inc('sent')
+        except Exception as e:
+            attempts += 1
+            if is_retryable(e) and attempts < self.max_attempts:
+                delay = min(self.backoff_cap, self.backoff * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+                if getattr(e, 'status', None) == 429:
+                    self.limiter.pause(delay)
+                self.queue.update(job_id, number, 'pending', parts_sent, attempts, time.time() + delay, str(e))
+                DELIVERIES.inc('retried')
+            else:
+                self.queue.update(job_id, number, 'failed', parts_sent, attempts, error=str(e))
+                DELIVERIES.inc('failed')
+                logger.warning(f"Broadcast {job_id}: giving up on {number}: {str(e)}")
+        finally:
+            self._inflight.release()
+
+    def progress(self, job_id: str) -> Optional[Dict]:
+        """Live counts, throughput and ETA for a job"""
+        job = self.queue.get_job(job_id)
+        if job is None:
+            return None
+        counts = self.queue.counts(job_id)
+        done = counts['sent'] + counts['failed']
+        elapsed = (job['finished'] or time.time()) - job['created']
+        rate = done / elapsed if elapsed > 0 else 0.0
+        remaining = job['total'] - done
+        return {
+            'job_id': job_id,
+            'status': 'finished' if job['finished'] else ('sending' if job['lease_until'] > time.time() else 'paused'),
+            'total': job['total'],
+            'channel': job['channel'],
+            'parts': len(job['parts']),
+            'segments': sum(self.cost(part) for part in job['parts']),
+            **counts,
+            'elapsed_seconds': round(elapsed, 1),
+            'per_second': round(rate, 2),
+            'eta_seconds': round(remaining / rate, 1) if rate and remaining else (0 if not remaining else None)
+        }
+
+    def backlog(self) -> float:
+        """Tokens still to send across this channel's unfinished jobs"""
+        total = 0.0
+        for job_id in self.queue.unfinished_jobs(self.channel):
+            job = self.queue.get_job(job_id)
+            counts = self.queue.counts(job_id)
+            total += (counts['pending'] + counts['sending']) * sum(self.cost(part) for part in job['parts'])
+        return total
+
+    def estimate_seconds(self, tokens: float) -> float:
+        """Time to send `tokens` more after the current backlog, at the account rate"""
+        return (self.backlog() + tokens) / self.limiter.rate
+
+    def wait(self, job_id: str, timeout: Optional[float] = None, poll: float = 0.2) -> Dict:
+        """Block until the job finishes (or timeout) and return its progress"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            progress = self.progress(job_id)
+            if progress is None or progress['status'] == 'finished':
+                return progress
+            if deadline is not None and time.monotonic() >= deadline:
+                return progress
+            time.sleep(poll)
+
+    def results(self, job_id: str) -> Dict:
+        """Recipients by outcome, in the shape broadcast_sms has always returned"""
+        job = self.queue.get_job(job_id)
+        return {
+            'job_id': job_id,
+            'success': self.queue.numbers(job_id, 'sent'),
+            'failed': self.queue.numbers(job_id, 'failed'),
+            'total': job['total'] if job else 0
+        }
+
+
+def create_broadcast_engine(send: Callable[[str, str], object], account: str,
+                            channel: str = 'sms') -> BroadcastEngine:
+    """Engine configured from BROADCAST_* environment variables
+
+    SMS is paced in segments per second (BROADCAST_RATE); WhatsApp,
+    which Twilio meters per message, by WHATSAPP_BROADCAST_RATE.
+    """
+    queue = BroadcastQueue(os.getenv('BROADCAST_QUEUE_PATH', DEFAULT_QUEUE_PATH),
+                           retention=float(os.getenv('BROADCAST_RETENTION_DAYS', 7)) * 86400)
+    if channel == 'whatsapp':
+        rate, cost = float(os.getenv('WHATSAPP_BROADCAST_RATE', 20)), (lambda body: 1)
+    else:
+        rate, cost = float(os.getenv('BROADCAST_RATE', 1)), count_segments
+    return BroadcastEngine(
+        send, queue, RateLimiter(queue, f"{account}:{channel}", rate),
+        workers=int(os.getenv('BROADCAST_WORKERS', 8)),
+        max_attempts=int(os.getenv('BROADCAST_MAX_ATTEMPTS', 5)),
+        backoff=float(os.getenv('BROADCAST_BACKOFF', 2.0)),
+        channel=channel,
+        cost=cost
+    )
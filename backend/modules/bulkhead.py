@@ -0,0 +1,190 @@
+"""
+Bulkhead Module for FisherMate.AI
+Isolates upstream dependencies with per-dependency concurrency limits
+"""
+
+import os
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from modules.metrics import UPSTREAM_LATENCY, registry
+
+logger = logging.getLogger(__name__)
+
+
+class BulkheadFullError(Exception):
+    """Raised when a bulkhead cannot admit another call"""
+
+    def __init__(self, name: str, reason: str):
+        super().__init__(f"Bulkhead '{name}' rejected call: {reason}")
+        self.name = name
+        self.reason = reason
+
+
+class Bulkhead:
+    """Concurrency limit, wait queue and wait timeout for one upstream"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0
+
+        # Counters since process start
+        self.accepted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.peak_active = 0
+        self.peak_waiting = 0
+
+    def acquire(self):
+        """Take a slot, waiting at most `timeout` seconds in the queue"""
+        # Fast path: a free slot means no queueing at all
+        if self._slots.acquire(blocking=False):
+            self._on_admitted()
+            return
+
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise BulkheadFullError(self.name, 'queue full')
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+
+        try:
+            admitted = self._slots.acquire(timeout=self.timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+        if not admitted:
+            with self._lock:
+                self.rejected_timeout += 1
+            raise BulkheadFullError(self.name, f'no slot within {self.timeout}s')
+
+        self._on_admitted()
+
+    def release(self):
+        """Return a slot to the bulkhead"""
+        with self._lock:
+            self.active -= 1
+        self._slots.release()
+
+    @contextmanager
+    def slot(self):
+        """Context manager guarding one upstream call, timed per outcome"""
+        self.acquire()
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            yield
+            outcome = 'ok'
+        finally:
+            self.release()
+            UPSTREAM_LATENCY.observe(time.perf_counter() - started, self.name, outcome)
+
+    def call(self, func, *args, **kwargs):
+        """Run func inside the bulkhead"""
+        with self.slot():
+            return func(*args, **kwargs)
+
+    def _on_admitted(self):
+        with self._lock:
+            self.active += 1
+            self.accepted += 1
+            self.peak_active = max(self.peak_active, self.active)
+
+    def get_stats(self) -> Dict:
+        """Get saturation statistics for this bulkhead"""
+        with self._lock:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'timeout': self.timeout,
+                'active': self.active,
+                'waiting': self.waiting,
+                'saturation': self.active / self.max_concurrent if self.max_concurrent else 0,
+                'accepted': self.accepted,
+                'rejected_queue_full': self.rejected_queue_full,
+                'rejected_timeout': self.rejected_timeout,
+                'peak_active': self.peak_active,
+                'peak_waiting': self.peak_waiting
+            }
+
+
+# Default limits per upstream: (max_concurrent, max_queue, timeout seconds).
+# Overridable with BULKHEAD_<NAME>_CONCURRENCY / _QUEUE / _TIMEOUT.
+DEFAULT_LIMITS = {
+    'gemini': (8, 16, 2.0),
+    'googletrans': (8, 32, 1.0),
+    'openweather': (10, 40, 1.0),
+    'gtts': (4, 8, 2.0),
+    'google_stt': (4, 8, 2.0),
+    'twilio': (10, 50, 5.0),
+    'twilio_media': (8, 16, 5.0),
+    # Voice note transcoding; also sizes the transcode process pool
+    'transcode': (2, 8, 10.0)
+}
+
+_bulkheads: Dict[str, Bulkhead] = {}
+_registry_lock = threading.Lock()
+
+
+def _limits_from_env(name: str):
+    concurrency, queue, timeout = DEFAULT_LIMITS.get(name, (4, 8, 1.0))
+    prefix = f"BULKHEAD_{name.upper()}_"
+    return (
+        int(os.getenv(prefix + 'CONCURRENCY', concurrency)),
+        int(os.getenv(prefix + 'QUEUE', queue)),
+        float(os.getenv(prefix + 'TIMEOUT', timeout))
+    )
+
+
+def get_bulkhead(name: str) -> Bulkhead:
+    """Get the process-wide bulkhead for an upstream, creating it on first use"""
+    bulkhead = _bulkheads.get(name)
+    if bulkhead is None:
+        with _registry_lock:
+            bulkhead = _bulkheads.get(name)
+            if bulkhead is None:
+                concurrency, queue, timeout = _limits_from_env(name)
+                bulkhead = Bulkhead(name, concurrency, queue, timeout)
+                _bulkheads[name] = bulkhead
+                logger.info(f"Bulkhead '{name}': concurrency={concurrency} queue={queue} timeout={timeout}s")
+    return bulkhead
+
+
+def bulkhead(name: str):
+    """Shorthand for `with bulkhead('gemini'): ...`"""
+    return get_bulkhead(name).slot()
+
+
+def get_bulkhead_stats(name: Optional[str] = None) -> Dict:
+    """Get saturation statistics for one or all configured bulkheads"""
+    for upstream in DEFAULT_LIMITS:
+        get_bulkhead(upstream)
+    if name is not None:
+        return get_bulkhead(name).get_stats()
+    return {upstream: b.get_stats() for upstream, b in sorted(_bulkheads.items())}
+
+
+def _collect_bulkhead_metrics():
+    stats = get_bulkhead_stats()
+    yield ('fishermate_bulkhead_active', 'gauge', 'Upstream calls holding a bulkhead slot',
+           [({'upstream': name}, s['active']) for name, s in stats.items()])
+    yield ('fishermate_bulkhead_waiting', 'gauge', 'Upstream calls queued for a bulkhead slot',
+           [({'upstream': name}, s['waiting']) for name, s in stats.items()])
+    yield ('fishermate_bulkhead_rejected_total', 'counter', 'Upstream calls shed by a bulkhead',
+           [({'upstream': name, 'reason': reason}, s[f'rejected_{reason}'])
+            for name, s in stats.items() for reason in ('queue_full', 'timeout')])
+
+
+registry.register_collector(_collect_bulkhead_metrics)
@@ -0,0 +1,219 @@
+"""
+Command Parser Module for FisherMate.AI
+One compiled grammar that classifies SMS and WhatsApp messages in a single pass
+"""
+
+import re
+import string
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SMS = 'sms'
+WHATSAPP = 'whatsapp'
+BOTH = (SMS, WHATSAPP)
+
+# Where a phrase may appear: the whole message, its first words (with the
+# rest as parameter), the first word of a button label, or anywhere
+EXACT = 'exact'
+LEAD = 'lead'
+BUTTON = 'button'
+ANY = 'any'
+
+# Tokens break on whitespace and punctuation; '/' is kept for slash commands
+_SEPARATORS = string.whitespace + string.punctuation.replace('/', '') + '।॥'
+_BREAKS = re.escape(_SEPARATORS)
+# Symbols and pictographs; each is a token of its own
+_EMOJI = '\u2600-\u27bf\u2b00-\u2bff\U0001f000-\U0010ffff'
+# Emoji presentation selector and zero-width joiner; buttons may or may not carry them
+_IGNORED = '\ufe0f\u200d'
+
+# An emoji with its selectors, so they never lead a parameter, or a word
+_TOKEN = re.compile(f"([{_EMOJI}])[{_IGNORED}]*|[^{_BREAKS}{_EMOJI}{_IGNORED}][^{_BREAKS}{_EMOJI}]*")
+
+# (phrases, intent, arg, position, channels, priority); lower priority wins
+GRAMMAR = [
+    # SMS language codes, only as the whole message ('hi there' is a greeting)
+    (['en', 'english'], 'language', 'en', EXACT, (SMS,), 0),
+    (['hi', 'hindi'], 'language', 'hi', EXACT, (SMS,), 0),
+    (['ta', 'tamil'], 'language', 'ta', EXACT, (SMS,), 0),
+
+    # SMS letter commands; the rest of the message is the parameter
+    (['w'], 'weather', None, LEAD, (SMS,), 1),
+    (['l'], 'legal', None, LEAD, (SMS,), 1),
+    (['s'], 'safety', None, LEAD, (SMS,), 1),
+    (['e'], 'emergency', None, LEAD, (SMS,), 1),
+    (['h'], 'help', None, LEAD, (SMS,), 1),
+    (['m'], 'menu', None, LEAD, (SMS,), 1),
+    (['a'], 'alerts', None, LEAD, (SMS,), 1),
+
+    # WhatsApp slash commands
+    (['/start'], 'start', None, LEAD, (WHATSAPP,), 1),
+    (['/help'], 'help', None, LEAD, (WHATSAPP,), 1),
+    (['/weather'], 'weather', None, LEAD, (WHATSAPP,), 1),
+    (['/legal'], 'legal', None, LEAD, (WHATSAPP,), 1),
+    (['/safety'], 'safety', None, LEAD, (WHATSAPP,), 1),
+    (['/emergency'], 'emergency', None, LEAD, (WHATSAPP,), 1),
+    (['/alerts'], 'alerts', None, LEAD, (WHATSAPP,), 1),
+
+    # WhatsApp language names, anywhere
+    (['hindi', 'हिंदी', 'हिन्दी'], 'language', 'hi', ANY, (WHATSAPP,), 2),
+    (['tamil', 'தமிழ்'], 'language', 'ta', ANY, (WHATSAPP,), 2),
+    (['english', 'language', 'change language', 'भाषा', 'भाषा बदलें', 'மொழி', 'மொழி மாற்று'],
+     'language', 'en', ANY, (WHATSAPP,), 2),
+
+    # WhatsApp menu words
+    (['menu', 'मेनू', 'மெனு', 'home', 'घर', 'வீடு', 'back', 'वापस', 'பின்னே'], 'menu', None, ANY, (WHATSAPP,), 3),
+
+    # WhatsApp quick-reply buttons, which start with their emoji; the label is not a parameter
+    (['🌦'], 'weather_menu', None, BUTTON, (WHATSAPP,), 4),
+    (['🌤'], 'weather', None, BUTTON, (WHATSAPP,), 4),
+    (['📅'], 'forecast', None, BUTTON, (WHATSAPP,), 4),
+    (['🌊'], 'marine', None, BUTTON, (WHATSAPP,), 4),
+    (['⚠'], 'alerts', None, BUTTON, (WHATSAPP,), 4),
+    (['⚖'], 'legal_menu', None, BUTTON, (WHATSAPP,), 4),
+    (['🚫', '📞'], 'legal', None, BUTTON, (WHATSAPP,), 4),
+    (['📋'], 'license', None, BUTTON, (WHATSAPP,), 4),
+    (['🦺'], 'safety_menu', None, BUTTON, (WHATSAPP,), 4),
+    (['✅', '⚓'], 'safety', None, BUTTON, (WHATSAPP,), 4),
+    (['🆘', '🚨', '🏥'], 'emergency', None, BUTTON, (WHATSAPP,), 4),
+    (['🔙', '🏠'], 'menu', None, BUTTON, (WHATSAPP,), 4),
+
+    # Topic words, anywhere. State names are phrases so 'tamil nadu' is
+    # read as a legal question rather than a switch to Tamil.
+    (['weather', 'mausam', 'vanilai', 'मौसम', 'வானிலை'], 'weather', None, ANY, BOTH, 5),
+    (['law', 'laws', 'legal', 'ban', 'kanoon', 'sattam', 'कानून', 'சட்டம்', 'tamil nadu', 'तमिलनाडु', 'தமிழ்நாடு'],
+     'legal', None, ANY, BOTH, 6),
+    (['safety', 'suraksha', 'padhukaapu', 'सुरक्षा', 'பாதுகாப்பு'], 'safety', None, ANY, BOTH, 7),
+    (['emergency', 'help', 'madad', 'udavi', 'आपातकाल', 'मदद', 'அவசரம்', 'உதவி'], 'emergency', None, ANY, BOTH, 8),
+    (['hello', 'hi', 'start', 'namaste', 'नमस्ते', 'வணக்கம்'], 'greeting', None, ANY, BOTH, 9)
+]
+
+
+def tokenize(message: str) -> List[Tuple[str, int, int]]:
+    """(casefolded token, start, end) per word; each emoji is a token of its own"""
+    return [(match.group(1) or match.group().casefold(), match.start(), match.end())
+            for match in _TOKEN.finditer(message)]
+
+
+class Command:
+    """A classified message: intent, its argument (e.g. language code) and trailing parameter
+
+    Instances are remembered and shared between calls; treat them as read-only.
+    """
+
+    __slots__ = ('intent', 'arg', 'param')
+
+    def __init__(self, intent: Optional[str], arg: Optional[str] = None, param: str = ''):
+        self.intent = intent
+        self.arg = arg
+        self.param = param
+
+    def __repr__(self) -> str:
+        return f"Command({self.intent!r}, {self.arg!r}, {self.param!r})"
+
+
+class _Rule:
+    __slots__ = ('intent', 'arg', 'position', 'channels', 'priority')
+
+    def __init__(self, intent: str, arg: Optional[str], position: str, channels: Iterable[str], priority: int):
+        self.intent = intent
+        self.arg = arg
+        self.position = position
+        self.channels = frozenset(channels)
+        self.priority = priority
+
+
+class _Node:
+    __slots__ = ('children', 'rules')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.rules: List[_Rule] = []
+
+
+class CommandParser:
+    """Trie over the token sequences of every phrase in the grammar
+
+    parse() tokenizes once and walks the trie from each token, taking the
+    longest phrase that applies at that position, then skipping past it.
+    Of all phrases found, the lowest priority wins, so the result matches
+    the order the handlers used to test for language, menu, quick-reply
+    and topic keywords, without rescanning the message for each.
+    """
+
+    def __init__(self, grammar=GRAMMAR, memo_size: int = 4096):
+        self._root = _Node()
+        self.phrases = 0
+        # Webhook bodies repeat (buttons, letter commands), so results are remembered
+        self.memo_size = memo_size
+        self._memo: Dict[Tuple[str, str], Command] = {}
+        for phrases, intent, arg, position, channels, priority in grammar:
+            rule = _Rule(intent, arg, position, channels, priority)
+            for phrase in phrases:
+                node = self._root
+                for token, _, _ in tokenize(phrase):
+                    node = node.children.setdefault(token, _Node())
+                node.rules.append(rule)
+                self.phrases += 1
+
+    def parse(self, message: str, channel: str) -> Command:
+        key = (message, channel)
+        command = self._memo.get(key)
+        if command is None:
+            if len(self._memo) >= self.memo_size:
+                self._memo.clear()
+            command = self._memo[key] = self._parse(message, channel)
+        return command
+
+    def _parse(self, message: str, channel: str) -> Command:
+        tokens = tokenize(message)
+        count = len(tokens)
+        best: Optional[_Rule] = None
+        best_end = 0
+        i = 0
+        while i < count:
+            node = self._root
+            found, found_end = None, i + 1
+            j = i
+            while j < count:
+                node = node.children.get(tokens[j][0])
+                if node is None:
+                    break
+                j += 1
+                for rule in node.rules:
+                    if channel not in rule.channels:
+                        continue
+                    if rule.position != ANY and i != 0:
+                        continue
+                    if rule.position == EXACT and j != count:
+                        continue
+                    # Longest phrase at this position, then the higher-priority rule
+                    if found is None or j > found_end or rule.priority < found.priority:
+                        found, found_end = rule, j
+            if found is not None:
+                if best is None or found.priority < best.priority:
+                    best, best_end = found, found_end
+                i = found_end
+            else:
+                i += 1
+
+        if best is None:
+            if tokens and tokens[0][0].startswith('/'):
+                return Command('unknown_command', param=message[tokens[0][2]:].strip(_SEPARATORS))
+            return Command(None)
+        param = message[tokens[best_end - 1][2]:].strip(_SEPARATORS) if best.position == LEAD else ''
+        return Command(best.intent, best.arg, param)
+
+
+_parser: Optional[CommandParser] = None
+_parser_lock = threading.Lock()
+
+
+def get_command_parser() -> CommandParser:
+    """The grammar compiled once per process, shared by the SMS and WhatsApp handlers"""
+    global _parser
+    if _parser is None:
+        with _parser_lock:
+            if _parser is None:
+                _parser = CommandParser()
+    return _parser
@@ -0,0 +1,127 @@
+"""
+Compact Format Module for FisherMate.AI
+Opt-in MessagePack wire format with short field codes for mobile clients
+"""
+
+import logging
+from datetime import date, datetime
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+MIMETYPE = 'application/msgpack'
+MIMETYPES = (MIMETYPE, 'application/x-msgpack', 'application/vnd.msgpack')
+
+# Bump when FIELD_CODES or STRING_CODES change; clients must decode with the same table
+SCHEMA_VERSION = 1
+
+# Long field name -> short code. Keys not listed are sent unchanged.
+FIELD_CODES = {
+    # Envelope / chat
+    'text': 't', 'type': 'ty', 'data': 'd', 'language': 'lg', 'audio_url': 'au',
+    'metadata': 'md', 'stage_timings_ms': 'st', 'total_ms': 'tm', 'query_type': 'qt',
+    'safety_category': 'sc', 'error': 'er', 'message': 'ms',
+    # Weather
+    'location': 'l', 'name': 'n', 'country': 'co', 'coordinates': 'xy', 'lat': 'la', 'lon': 'lo',
+    'current': 'c', 'temperature': 'T', 'feels_like': 'fl', 'humidity': 'h', 'pressure': 'p',
+    'description': 'ds', 'icon': 'ic', 'wind_speed': 'ws', 'wind_direction': 'wd',
+    'visibility': 'vi', 'sunrise': 'sr', 'sunset': 'ss', 'safety_assessment': 'sa',
+    'level': 'lv', 'issues': 'is', 'recommendations': 'rc', 'timestamp': 'ts',
+    'safety_level': 'sl', 'forecast': 'f', 'daily_summary': 'dy', 'datetime': 'dt',
+    'date': 'da', 'temp_min': 'tn', 'temp_max': 'tx', 'precipitation': 'pr',
+    'marine': 'mr', 'sea_state': 'se', 'code': 'cd', 'wave_height': 'wh', 'tidal_info': 'ti',
+    'next_high_tide': 'hi', 'next_low_tide': 'lt', 'tide_level': 'tl', 'fishing_zones': 'fz',
+    'zone_type': 'zt', 'restrictions': 'rs', 'seasonal_ban': 'sb', 'marine_warnings': 'mw',
+    'issued_at': 'ia',
+    # Legal
+    'state': 's', 'legal_info': 'li', 'last_updated': 'lu', 'data_version': 'dv',
+    'period': 'pd', 'reason': 'rn', 'penalty': 'pn', 'restricted_fishing': 'rf',
+    'method': 'me', 'distance': 'di', 'time': 'tt', 'licensing': 'lc',
+    'motorized_boats': 'mb', 'fishing_license': 'fi', 'validity': 'va', 'documents': 'dc',
+    'safety_requirements': 'sq', 'contact_info': 'ci', 'department': 'dp', 'helpline': 'hl',
+    'website': 'wb', 'email': 'em', 'address': 'ad', 'available_states': 'as'
+}
+
+# Fixed sentences produced by WeatherService.get_safety_recommendations,
+# sent as small integers inside 'recommendations' lists
+STRING_CODES = [
+    'Conditions are favorable for fishing',
+    'Always wear life jackets',
+    'Keep emergency communication devices',
+    'Exercise caution while fishing',
+    'Stay close to shore',
+    'Monitor weather conditions closely',
+    'Secure all equipment due to strong winds',
+    'Use navigation lights and sound signals',
+    'Ensure proper drainage in boat',
+    'Avoid fishing in current conditions',
+    'Return to shore immediately if already at sea',
+    'Wait for weather to improve',
+    'Monitor official weather warnings',
+    'Please check weather conditions before fishing',
+    'Check local weather conditions before fishing'
+]
+
+_FIELD_NAMES = {code: name for name, code in FIELD_CODES.items()}
+_STRING_INDEX = {value: index for index, value in enumerate(STRING_CODES)}
+
+if len(_FIELD_NAMES) != len(FIELD_CODES):
+    raise RuntimeError("compact_format: duplicate field codes")
+
+
+def is_available() -> bool:
+    """Whether the msgpack backend is installed"""
+    return msgpack is not None
+
+
+def _encode(value: Any, key: str = None) -> Any:
+    if isinstance(value, dict):
+        return {FIELD_CODES.get(k, k): _encode(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if key == 'recommendations':
+            return [_STRING_INDEX.get(item, item) for item in value]
+        return [_encode(item) for item in value]
+    if isinstance(value, datetime):
+        # Epoch seconds are 5 bytes on the wire vs ~28 for an ISO string
+        return int(value.timestamp())
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _decode(value: Any, key: str = None) -> Any:
+    if isinstance(value, dict):
+        return {_FIELD_NAMES.get(k, k): _decode(v, _FIELD_NAMES.get(k, k)) for k, v in value.items()}
+    if isinstance(value, list):
+        if key == 'recommendations':
+            return [STRING_CODES[item] if isinstance(item, int) and 0 <= item < len(STRING_CODES) else item
+                    for item in value]
+        return [_decode(item) for item in value]
+    return value
+
+
+def pack(payload: Dict) -> bytes:
+    """Encode an API payload into the compact wire format"""
+    envelope = {'v': SCHEMA_VERSION, 'd': _encode(payload)}
+    return msgpack.packb(envelope, use_bin_type=True, use_single_float=True)
+
+
+def unpack(data: bytes) -> Dict:
+    """Decode a compact payload back to the JSON field names"""
+    envelope = msgpack.unpackb(data, raw=False, strict_map_key=False)
+    if envelope.get('v') != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported compact schema version: {envelope.get('v')}")
+    return _decode(envelope['d'])
+
+
+def wants_compact(accept_mimetypes) -> bool:
+    """Whether a werkzeug MIMEAccept prefers the compact format over JSON"""
+    if msgpack is None:
+        return False
+    best = accept_mimetypes.best_match(('application/json',) + MIMETYPES)
+    return best in MIMETYPES
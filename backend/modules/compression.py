@@ -0,0 +1,170 @@
+"""
+Compression Module for FisherMate.AI
+Content-negotiated response compression for low-bandwidth clients
+"""
+
+import gzip
+import os
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Server preference when the client weights encodings equally
+SUPPORTED_ENCODINGS = [enc for enc, available in (
+    ('br', brotli is not None),
+    ('zstd', zstandard is not None),
+    ('gzip', True)
+) if available]
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/msgpack', 'application/xml', 'application/javascript',
+    'text/html', 'text/plain', 'text/xml', 'text/css', 'text/javascript'
+}
+
+# (dynamic, static) compression levels: cheap for per-request bodies,
+# maximum for bodies compressed once and cached
+LEVELS = {
+    'br': (5, 11),
+    'zstd': (3, 19),
+    'gzip': (6, 9)
+}
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best supported encoding from an Accept-Encoding header"""
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding.strip()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = weights.get(encoding, weights.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data: bytes, encoding: str, static: bool = False) -> bytes:
+    """Compress data; static=True spends more CPU for bodies that get cached"""
+    level = LEVELS[encoding][1 if static else 0]
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=level)
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+class CompressionStats:
+    """Per-route compression CPU cost and byte savings"""
+
+    def __init__(self):
+        self._routes: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, encoding: str, bytes_in: int, bytes_out: int, cpu_seconds: float = 0.0,
+               cached: bool = False):
+        with self._lock:
+            stats = self._routes.setdefault(route, {
+                'responses': 0,
+                'cached_responses': 0,
+                'bytes_in': 0,
+                'bytes_out': 0,
+                'cpu_seconds': 0.0,
+                'encodings': {}
+            })
+            stats['responses'] += 1
+            stats['cached_responses'] += int(cached)
+            stats['bytes_in'] += bytes_in
+            stats['bytes_out'] += bytes_out
+            stats['cpu_seconds'] += cpu_seconds
+            stats['encodings'][encoding] = stats['encodings'].get(encoding, 0) + 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            result = {}
+            for route, stats in self._routes.items():
+                saved = stats['bytes_in'] - stats['bytes_out']
+                result[route] = dict(
+                    stats,
+                    encodings=dict(stats['encodings']),
+                    bytes_saved=saved,
+                    ratio=stats['bytes_out'] / stats['bytes_in'] if stats['bytes_in'] else 1.0
+                )
+            return result
+
+
+class ResponseCompressor:
+    """Flask extension compressing eligible responses after each request"""
+
+    def __init__(self, app=None, min_size: Optional[int] = None):
+        self.min_size = min_size if min_size is not None else int(os.getenv('COMPRESSION_MIN_SIZE', 512))
+        self.stats = CompressionStats()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self.after_request)
+        logger.info(f"Response compression: {', '.join(SUPPORTED_ENCODINGS)} (min {self.min_size} bytes)")
+
+    def after_request(self, response):
+        if (response.direct_passthrough
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+
+        encoding = negotiate(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        started = time.thread_time()
+        compressed = compress(data, encoding)
+        cpu_seconds = time.thread_time() - started
+
+        if len(compressed) >= len(data):
+            self.stats.record(self.route_name(), 'identity', len(data), len(data), cpu_seconds)
+            return response
+
+        self.stats.record(self.route_name(), encoding, len(data), len(compressed), cpu_seconds)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def route_name() -> str:
+        rule = request.url_rule
+        return rule.rule if rule is not None else 'unmatched'
@@ -0,0 +1,206 @@
+"""
+Conversation History Module for FisherMate.AI
+Fixed-capacity ring buffer of conversation turns, with optional archive
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEPTH = int(os.getenv('WHATSAPP_HISTORY_DEPTH', 20))
+
+
+class Turn:
+    """One message in a conversation"""
+
+    __slots__ = ('type', 'message', 'timestamp', 'media_url')
+
+    def __init__(self, type: str, message: str, timestamp: Optional[float] = None, media_url: str = ''):
+        self.type = type
+        self.message = message
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.media_url = media_url
+
+    def as_dict(self) -> Dict:
+        """The dict shape conversation_history entries used to have"""
+        turn = {'type': self.type, 'message': self.message, 'timestamp': datetime.fromtimestamp(self.timestamp)}
+        if self.media_url:
+            turn['media_url'] = self.media_url
+        return turn
+
+    def to_state(self) -> List:
+        return [self.type, self.message, self.timestamp, self.media_url]
+
+    def __sizeof__(self) -> int:
+        return (object.__sizeof__(self) + sys.getsizeof(self.message) + sys.getsizeof(self.media_url)
+                + sys.getsizeof(self.timestamp))
+
+
+class ConversationHistory:
+    """The last `capacity` turns, oldest overwritten first
+
+    Memory per session stays constant however long the user keeps
+    chatting; `total` still counts every turn ever recorded.
+    """
+
+    __slots__ = ('capacity', 'total', '_turns', '_next')
+
+    STATE_TAG = 'history'
+
+    def __init__(self, capacity: int = DEFAULT_DEPTH):
+        self.capacity = max(1, capacity)
+        self.total = 0
+        self._turns: List[Optional[Turn]] = [None] * self.capacity
+        self._next = 0
+
+    def append(self, turn: Turn, archive: Optional['HistoryArchive'] = None, key: str = '') -> Optional[Turn]:
+        """Record a turn; returns the turn it overwrote, spilled to archive if given"""
+        evicted = self._turns[self._next]
+        self._turns[self._next] = turn
+        self._next = (self._next + 1) % self.capacity
+        self.total += 1
+        if evicted is not None and archive is not None:
+            archive.add(key, evicted)
+        return evicted
+
+    def __iter__(self) -> Iterator[Turn]:
+        """Oldest to newest"""
+        for offset in range(self.capacity):
+            turn = self._turns[(self._next + offset) % self.capacity]
+            if turn is not None:
+                yield turn
+
+    def __len__(self) -> int:
+        return min(self.total, self.capacity)
+
+    def recent(self, count: int) -> List[Turn]:
+        """Newest `count` turns, oldest first"""
+        turns = list(self)
+        return turns[-count:] if count else []
+
+    def __sizeof__(self) -> int:
+        return (object.__sizeof__(self) + sys.getsizeof(self._turns)
+                + sum(turn.__sizeof__() for turn in self._turns if turn is not None))
+
+    # Session store codec
+
+    def to_state(self) -> Dict:
+        return {'capacity': self.capacity, 'total': self.total, 'turns': [turn.to_state() for turn in self]}
+
+    @classmethod
+    def from_state(cls, state: Dict, capacity: Optional[int] = None) -> 'ConversationHistory':
+        history = cls(capacity or state.get('capacity', DEFAULT_DEPTH))
+        turns = state.get('turns', [])
+        for turn_state in turns[-history.capacity:]:
+            history.append(Turn(*turn_state))
+        history.total = max(state.get('total', 0), history.total)
+        return history
+
+    def resized(self, capacity: int, archive: Optional['HistoryArchive'] = None,
+                key: str = '') -> 'ConversationHistory':
+        """This history bounded to `capacity`; turns that no longer fit spill to archive if given"""
+        history = type(self)(capacity)
+        turns = list(self)
+        if archive is not None:
+            for turn in turns[:-history.capacity]:
+                archive.add(key, turn)
+        for turn in turns[-history.capacity:]:
+            history.append(turn)
+        history.total = self.total
+        return history
+
+    @classmethod
+    def coerce(cls, value, capacity: int = DEFAULT_DEPTH, archive: Optional['HistoryArchive'] = None,
+               key: str = '') -> 'ConversationHistory':
+        """A history bounded to `capacity` for a stored session
+
+        Accepts one restored at another capacity (WHATSAPP_HISTORY_DEPTH
+        changed since it was saved) and, from older sessions, a plain list
+        of turn dicts.
+        """
+        if isinstance(value, cls):
+            return value if value.capacity == max(1, capacity) else value.resized(capacity, archive, key)
+        history = cls(capacity)
+        for entry in (value or [])[-history.capacity:]:
+            timestamp = entry.get('timestamp')
+            history.append(Turn(
+                entry.get('type', 'user'),
+                entry.get('message', ''),
+                timestamp.timestamp() if isinstance(timestamp, datetime) else timestamp,
+                entry.get('media_url', '')
+            ))
+        history.total = max(len(value or []), history.total)
+        return history
+
+
+class HistoryArchive:
+    """Turns spilled out of ring buffers, kept in SQLite by user
+
+    Turns older than `retention` seconds are deleted, and so are all but
+    the newest `max_turns` of each user, by an hourly prune() from add().
+    """
+
+    def __init__(self, path: str, retention: float = 90 * 86400, max_turns: int = 1000):
+        self.path = path
+        self.retention = retention
+        self.max_turns = max_turns
+        self._next_prune = 0.0
+        self._local = threading.local()
+        self._conn().executescript(
+            "CREATE TABLE IF NOT EXISTS history ("
+            " key TEXT NOT NULL, type TEXT NOT NULL, message TEXT NOT NULL,"
+            " timestamp REAL NOT NULL, media_url TEXT NOT NULL DEFAULT '');"
+            "CREATE INDEX IF NOT EXISTS history_key ON history (key, timestamp);"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def add(self, key: str, turn: Turn):
+        try:
+            self._conn().execute(
+                "INSERT INTO history (key, type, message, timestamp, media_url) VALUES (?, ?, ?, ?, ?)",
+                (key, turn.type, turn.message, turn.timestamp, turn.media_url or '')
+            )
+            now = time.time()
+            if now >= self._next_prune:
+                self._next_prune = now + 3600
+                self.prune()
+        except sqlite3.Error as e:
+            logger.error(f"History archive error: {str(e)}")
+
+    def prune(self) -> int:
+        """Delete turns past the retention window or beyond each user's newest max_turns"""
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM history WHERE timestamp < ?", (time.time() - self.retention,)).rowcount
+        removed += conn.execute(
+            "DELETE FROM history WHERE rowid IN (SELECT rowid FROM ("
+            " SELECT rowid, ROW_NUMBER() OVER (PARTITION BY key ORDER BY timestamp DESC) AS newer FROM history)"
+            " WHERE newer > ?)", (self.max_turns,)
+        ).rowcount
+        if removed:
+            logger.info(f"Pruned {removed} archived conversation turns")
+        return removed
+
+
+def create_history_archive() -> Optional[HistoryArchive]:
+    """Archive selected by WHATSAPP_HISTORY_ARCHIVE (a SQLite path); None when unset"""
+    path = os.getenv('WHATSAPP_HISTORY_ARCHIVE')
+    if not path:
+        return None
+    return HistoryArchive(path, retention=float(os.getenv('WHATSAPP_HISTORY_RETENTION_DAYS', 90)) * 86400,
+                          max_turns=int(os.getenv('WHATSAPP_HISTORY_MAX_TURNS', 1000)))
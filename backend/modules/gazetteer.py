@@ -0,0 +1,258 @@
+"""
+Gazetteer Module for FisherMate.AI
+Resolves coastal place and state names, as users type them, to coordinates and state
+"""
+
+import difflib
+import string
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Coastal towns, harbours and a few inland cities: (lat, lon, state).
+# Harbour towns are placed at the fishing harbour, not the town centre.
+PLACES = {
+    'chennai': (13.12, 80.30, 'Tamil Nadu'),
+    'pulicat': (13.42, 80.32, 'Tamil Nadu'),
+    'mamallapuram': (12.62, 80.19, 'Tamil Nadu'),
+    'cuddalore': (11.72, 79.78, 'Tamil Nadu'),
+    'nagapattinam': (10.77, 79.85, 'Tamil Nadu'),
+    'rameswaram': (9.29, 79.31, 'Tamil Nadu'),
+    'pamban': (9.28, 79.21, 'Tamil Nadu'),
+    'thoothukudi': (8.79, 78.16, 'Tamil Nadu'),
+    'kanyakumari': (8.08, 77.55, 'Tamil Nadu'),
+    'colachel': (8.18, 77.26, 'Tamil Nadu'),
+    'madurai': (9.93, 78.12, 'Tamil Nadu'),
+    'coimbatore': (11.02, 76.96, 'Tamil Nadu'),
+    'tiruchirappalli': (10.79, 78.70, 'Tamil Nadu'),
+    'puducherry': (11.93, 79.84, 'Puducherry'),
+    'karaikal': (10.93, 79.84, 'Puducherry'),
+    'thiruvananthapuram': (8.52, 76.94, 'Kerala'),
+    'vizhinjam': (8.38, 76.99, 'Kerala'),
+    'kollam': (8.94, 76.54, 'Kerala'),
+    'alappuzha': (9.50, 76.34, 'Kerala'),
+    'kochi': (9.96, 76.26, 'Kerala'),
+    'ponnani': (10.77, 75.93, 'Kerala'),
+    'beypore': (11.17, 75.81, 'Kerala'),
+    'kozhikode': (11.25, 75.77, 'Kerala'),
+    'kannur': (11.87, 75.37, 'Kerala'),
+    'mangaluru': (12.85, 74.83, 'Karnataka'),
+    'udupi': (13.34, 74.74, 'Karnataka'),
+    'malpe': (13.35, 74.70, 'Karnataka'),
+    'karwar': (14.80, 74.12, 'Karnataka'),
+    'bengaluru': (12.97, 77.59, 'Karnataka'),
+    'panaji': (15.49, 73.83, 'Goa'),
+    'vasco': (15.40, 73.81, 'Goa'),
+    'margao': (15.27, 73.96, 'Goa'),
+    'malvan': (16.06, 73.47, 'Maharashtra'),
+    'ratnagiri': (16.99, 73.28, 'Maharashtra'),
+    'alibag': (18.64, 72.87, 'Maharashtra'),
+    'mumbai': (18.93, 72.84, 'Maharashtra'),
+    'pune': (18.52, 73.86, 'Maharashtra'),
+    'surat': (21.17, 72.83, 'Gujarat'),
+    'veraval': (20.91, 70.37, 'Gujarat'),
+    'porbandar': (21.64, 69.61, 'Gujarat'),
+    'okha': (22.47, 69.07, 'Gujarat'),
+    'jamnagar': (22.47, 70.06, 'Gujarat'),
+    'ahmedabad': (23.02, 72.57, 'Gujarat'),
+    'nellore': (14.44, 79.99, 'Andhra Pradesh'),
+    'machilipatnam': (16.19, 81.14, 'Andhra Pradesh'),
+    'kakinada': (16.94, 82.25, 'Andhra Pradesh'),
+    'visakhapatnam': (17.69, 83.30, 'Andhra Pradesh'),
+    'vijayawada': (16.51, 80.65, 'Andhra Pradesh'),
+    'gopalpur': (19.26, 84.91, 'Odisha'),
+    'puri': (19.80, 85.83, 'Odisha'),
+    'paradip': (20.26, 86.67, 'Odisha'),
+    'balasore': (21.49, 86.93, 'Odisha'),
+    'bhubaneswar': (20.30, 85.82, 'Odisha'),
+    'digha': (21.63, 87.51, 'West Bengal'),
+    'haldia': (22.06, 88.07, 'West Bengal'),
+    'kakdwip': (21.87, 88.19, 'West Bengal'),
+    'kolkata': (22.57, 88.36, 'West Bengal'),
+    'port blair': (11.67, 92.74, 'Andaman and Nicobar')
+}
+
+# Fishing harbours users can subscribe to alerts by name, most used first
+HARBOURS = (
+    'chennai', 'puducherry', 'cuddalore', 'nagapattinam', 'rameswaram', 'thoothukudi',
+    'kanyakumari', 'vizhinjam', 'kollam', 'kochi', 'kozhikode', 'mangaluru', 'karwar',
+    'vasco', 'ratnagiri', 'mumbai', 'veraval', 'kakinada', 'visakhapatnam', 'puri',
+    'paradip', 'digha', 'port blair'
+)
+
+# Other spellings, old names, harbour names and native-script names
+PLACE_ALIASES = {
+    'madras': 'chennai',
+    'kasimedu': 'chennai',
+    'mahabalipuram': 'mamallapuram',
+    'nagai': 'nagapattinam',
+    'tuticorin': 'thoothukudi',
+    'cape comorin': 'kanyakumari',
+    'kanniyakumari': 'kanyakumari',
+    'trichy': 'tiruchirappalli',
+    'pondicherry': 'puducherry',
+    'pondy': 'puducherry',
+    'trivandrum': 'thiruvananthapuram',
+    'quilon': 'kollam',
+    'neendakara': 'kollam',
+    'alleppey': 'alappuzha',
+    'cochin': 'kochi',
+    'ernakulam': 'kochi',
+    'calicut': 'kozhikode',
+    'cannanore': 'kannur',
+    'mangalore': 'mangaluru',
+    'bangalore': 'bengaluru',
+    'panjim': 'panaji',
+    'vasco da gama': 'vasco',
+    'goa': 'vasco',
+    'madgaon': 'margao',
+    'bombay': 'mumbai',
+    'sassoon dock': 'mumbai',
+    'vizag': 'visakhapatnam',
+    'vishakhapatnam': 'visakhapatnam',
+    'bandar': 'machilipatnam',
+    'paradeep': 'paradip',
+    'calcutta': 'kolkata',
+    'சென்னை': 'chennai',
+    'கடலூர்': 'cuddalore',
+    'நாகப்பட்டினம்': 'nagapattinam',
+    'ராமேஸ்வரம்': 'rameswaram',
+    'தூத்துக்குடி': 'thoothukudi',
+    'கன்னியாகுமரி': 'kanyakumari',
+    'புதுச்சேரி': 'puducherry',
+    'கொச்சி': 'kochi',
+    'மும்பை': 'mumbai',
+    'चेन्नई': 'chennai',
+    'रामेश्वरम': 'rameswaram',
+    'कन्याकुमारी': 'kanyakumari',
+    'पुडुचेरी': 'puducherry',
+    'कोच्चि': 'kochi',
+    'मुंबई': 'mumbai',
+    'विशाखापत्तनम': 'visakhapatnam',
+    'पुरी': 'puri',
+    'कोलकाता': 'kolkata'
+}
+
+STATES = {
+    'tamil nadu': 'Tamil Nadu',
+    'tn': 'Tamil Nadu',
+    'தமிழ்நாடு': 'Tamil Nadu',
+    'तमिलनाडु': 'Tamil Nadu',
+    'puducherry': 'Puducherry',
+    'kerala': 'Kerala',
+    'கேரளா': 'Kerala',
+    'केरल': 'Kerala',
+    'karnataka': 'Karnataka',
+    'goa': 'Goa',
+    'maharashtra': 'Maharashtra',
+    'महाराष्ट्र': 'Maharashtra',
+    'gujarat': 'Gujarat',
+    'गुजरात': 'Gujarat',
+    'andhra pradesh': 'Andhra Pradesh',
+    'ap': 'Andhra Pradesh',
+    'odisha': 'Odisha',
+    'orissa': 'Odisha',
+    'west bengal': 'West Bengal',
+    'wb': 'West Bengal',
+    'andaman': 'Andaman and Nicobar'
+}
+
+# ASCII punctuation only: Tamil and Hindi vowel signs are not alphanumeric
+_PUNCTUATION = str.maketrans(string.punctuation, ' ' * len(string.punctuation))
+
+
+def normalize(name: str) -> str:
+    """Lower-case, punctuation to spaces, whitespace collapsed"""
+    return ' '.join(name.casefold().translate(_PUNCTUATION).split())
+
+
+class Place:
+    """One gazetteer entry"""
+
+    __slots__ = ('name', 'lat', 'lon', 'state', 'harbour')
+
+    def __init__(self, name: str, lat: float, lon: float, state: str, harbour: bool = False):
+        self.name = name
+        self.lat = lat
+        self.lon = lon
+        self.state = state
+        self.harbour = harbour
+
+    @property
+    def title(self) -> str:
+        return self.name.title()
+
+    def as_dict(self) -> Dict:
+        return {'name': self.name, 'lat': self.lat, 'lon': self.lon, 'state': self.state}
+
+
+class Gazetteer:
+    """Hash index over normalized names and aliases, with a fuzzy fallback for typos"""
+
+    def __init__(self, places: Dict[str, Tuple[float, float, str]] = PLACES,
+                 aliases: Dict[str, str] = PLACE_ALIASES, states: Dict[str, str] = STATES,
+                 harbours: Iterable[str] = HARBOURS, cutoff: float = 0.8):
+        self.cutoff = cutoff
+        harbours = [normalize(name) for name in harbours]
+        self._places: Dict[str, Place] = {}
+        for name, (lat, lon, state) in places.items():
+            key = normalize(name)
+            self._places[key] = Place(name, lat, lon, state, key in harbours)
+        for alias, name in aliases.items():
+            self._places[normalize(alias)] = self._places[normalize(name)]
+        self._harbour_list = [self._places[key] for key in harbours]
+        self._harbours = {key: place for key, place in self._places.items() if place.harbour}
+        self._states = {normalize(alias): state for alias, state in states.items()}
+        self._fuzzy: Dict[Tuple[int, str], Optional[str]] = {}
+
+    def _match(self, key: str, index: Dict) -> Optional[str]:
+        """Exact key, else the closest key above the cutoff (remembered)"""
+        if key in index:
+            return key
+        # Fuzzy matches are remembered per index, bounded against junk input
+        memo_key = (id(index), key)
+        if memo_key not in self._fuzzy:
+            if len(self._fuzzy) >= 4096:
+                self._fuzzy.clear()
+            matches = difflib.get_close_matches(key, index, n=1, cutoff=self.cutoff)
+            self._fuzzy[memo_key] = matches[0] if matches else None
+        return self._fuzzy[memo_key]
+
+    def find(self, query: str) -> Optional[Place]:
+        """Place for a user-typed name, or None"""
+        key = self._match(normalize(query), self._places)
+        return self._places[key] if key else None
+
+    def find_harbour(self, query: str) -> Optional[Place]:
+        """Harbour for a user-typed name, or None; a town without one does not match"""
+        key = self._match(normalize(query), self._harbours)
+        return self._harbours[key] if key else None
+
+    def harbours(self) -> List[Place]:
+        """Harbour entries, in HARBOURS order"""
+        return list(self._harbour_list)
+
+    def find_state(self, query: str) -> Optional[str]:
+        """State for a state name, or for a place in it; None if unknown"""
+        key = normalize(query)
+        state_key = self._match(key, self._states)
+        if state_key:
+            return self._states[state_key]
+        place = self.find(key)
+        return place.state if place else None
+
+    def __len__(self) -> int:
+        return len(self._places)
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """The process-wide gazetteer over the built-in tables"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer()
+    return _gazetteer
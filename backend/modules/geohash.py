@@ -0,0 +1,106 @@
+"""
+Geohash Module for FisherMate.AI
+Geohash tiles: nested lat/lon cells whose hashes share a prefix
+"""
+
+import math
+from typing import List, Tuple
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_DECODE = {ch: i for i, ch in enumerate(_BASE32)}
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def encode(lat: float, lon: float, precision: int = 9) -> str:
+    """Geohash of a point; precision 4 is ~39x20 km, 5 ~5 km, 9 ~5 m"""
+    lat_lo, lat_hi, lon_lo, lon_hi = -90.0, 90.0, -180.0, 180.0
+    chars = []
+    value = 0
+    bits = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                value = (value << 1) | 1
+                lon_lo = mid
+            else:
+                value <<= 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                value = (value << 1) | 1
+                lat_lo = mid
+            else:
+                value <<= 1
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            value = 0
+            bits = 0
+    return ''.join(chars)
+
+
+def bbox(geohash: str) -> Tuple[float, float, float, float]:
+    """(lat_min, lat_max, lon_min, lon_max) of a tile"""
+    lat_lo, lat_hi, lon_lo, lon_hi = -90.0, 90.0, -180.0, 180.0
+    even = True
+    for ch in geohash:
+        value = _DECODE[ch]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                lon_lo, lon_hi = (mid, lon_hi) if bit else (lon_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return lat_lo, lat_hi, lon_lo, lon_hi
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """(height, width) of a tile in degrees"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def cover(lat: float, lon: float, radius_km: float, max_tiles: int = 32) -> List[str]:
+    """Tiles covering the box around a circle, at the finest precision within max_tiles"""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+
+    precision = 1
+    for candidate in range(9, 0, -1):
+        height, width = cell_size(candidate)
+        if (math.ceil(2 * dlat / height) + 1) * (math.ceil(2 * dlon / width) + 1) <= max_tiles:
+            precision = candidate
+            break
+
+    height, width = cell_size(precision)
+    tiles = set()
+    row = max(lat - dlat, -90.0)
+    while True:
+        col = lon - dlon
+        while True:
+            tiles.add(encode(min(row, 89.999999), (col + 180.0) % 360.0 - 180.0, precision))
+            if col >= lon + dlon:
+                break
+            col = min(col + width, lon + dlon)
+        if row >= min(lat + dlat, 90.0):
+            break
+        row = min(row + height, lat + dlat, 90.0)
+    return sorted(tiles)
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
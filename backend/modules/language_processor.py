@@ -9,6 +9,7 @@ from langdetect import detect
 import json
 import os
 import logging
+from modules.bulkhead import bulkhead, BulkheadFullError
 
 logger = logging.getLogger(__name__)
 
@@ -126,9 +127,13 @@ class LanguageProcessor:
                 return text
             
             # Use Google Translate for translation
-            result = self.translator.translate(text, src=source_lang, dest=target_lang)
+            with bulkhead('googletrans'):
+                result = self.translator.translate(text, src=source_lang, dest=target_lang)
             return result.text
             
+        except BulkheadFullError as e:
+            logger.warning(f"Translation skipped: {str(e)}")
+            return text
         except Exception as e:
             logger.error(f"Translation error: {str(e)}")
             # Fallback to original text if translation fails
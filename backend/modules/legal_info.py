@@ -5,28 +5,74 @@ Handles fishing laws, regulations, and seasonal ban information
 
 import json
 import os
+import time
+import hashlib
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# When the built-in fallback data last changed; update with get_default_legal_data().
+# Fixed, like the data file's mtime, so every worker serves the same body and ETag.
+DEFAULT_DATA_UPDATED_AT = datetime(2025, 7, 17)
+
 class LegalInfoService:
     def __init__(self):
         self.legal_data_file = os.path.join(os.path.dirname(__file__), '..', 'data', 'legal_info.json')
+        
+        # How often (seconds) to stat the data file for changes
+        self.check_interval = int(os.getenv('LEGAL_DATA_CHECK_INTERVAL', 30))
+        self._file_signature = None
+        self._last_check = time.monotonic()
+        
         self.legal_data = self.load_legal_data()
     
     def load_legal_data(self) -> Dict:
         """Load legal information from JSON file"""
         try:
             if os.path.exists(self.legal_data_file):
-                with open(self.legal_data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                stat = os.stat(self.legal_data_file)
+                with open(self.legal_data_file, 'rb') as f:
+                    raw = f.read()
+                data = json.loads(raw.decode('utf-8'))
+                
+                self._file_signature = (stat.st_mtime_ns, stat.st_size)
+                self.data_version = hashlib.sha1(raw).hexdigest()[:16]
+                self.data_updated_at = datetime.fromtimestamp(stat.st_mtime)
+                return data
             else:
-                return self.get_default_legal_data()
+                return self._use_default_legal_data()
         except Exception as e:
             logger.error(f"Error loading legal data: {str(e)}")
-            return self.get_default_legal_data()
+            return self._use_default_legal_data()
+    
+    def _use_default_legal_data(self) -> Dict:
+        data = self.get_default_legal_data()
+        raw = json.dumps(data, sort_keys=True).encode('utf-8')
+        self.data_version = hashlib.sha1(raw).hexdigest()[:16]
+        self.data_updated_at = DEFAULT_DATA_UPDATED_AT
+        return data
+    
+    def reload_if_changed(self) -> bool:
+        """Reload the data file if it changed on disk; checks at most every check_interval seconds"""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        
+        try:
+            stat = os.stat(self.legal_data_file)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+        
+        if signature == self._file_signature:
+            return False
+        
+        logger.info("Legal data file changed, reloading")
+        self.legal_data = self.load_legal_data()
+        return True
     
     def get_default_legal_data(self) -> Dict:
         """Return default legal information for Indian states"""
@@ -340,7 +386,8 @@ class LegalInfoService:
                 'state': state,
                 'legal_info': state_info,
                 'language': language,
-                'last_updated': datetime.now().isoformat()
+                'last_updated': self.data_updated_at.isoformat(),
+                'data_version': self.data_version
             }
             
         except Exception as e:
@@ -582,14 +629,28 @@ class LegalInfoService:
     
     def check_current_ban_status(self, period_str: str) -> str:
         """Check if current date falls within ban period"""
+        status = self.get_ban_status(period_str)
+        if status is None:
+            return ""
+        
+        state, days = status
+        if state == 'active':
+            return f"🔴 ACTIVE BAN - {days} days remaining"
+        elif state == 'upcoming':
+            return f"🟡 Ban starts in {days} days"
+        else:
+            return f"🟢 No active ban"
+    
+    def get_ban_status(self, period_str: str) -> Optional[Tuple[str, int]]:
+        """('active', days left), ('upcoming', days until start) or ('none', 0); None if unparseable"""
         try:
             if not period_str or '-' not in period_str:
-                return ""
+                return None
             
             # Parse period string (e.g., "April 15 - June 14")
             parts = period_str.split(' - ')
             if len(parts) != 2:
-                return ""
+                return None
             
             start_str, end_str = parts
             current_year = datetime.now().year
@@ -608,17 +669,15 @@ class LegalInfoService:
             current_date = datetime.now()
             
             if start_date <= current_date <= end_date:
-                days_left = (end_date - current_date).days
-                return f"🔴 ACTIVE BAN - {days_left} days remaining"
+                return 'active', (end_date - current_date).days
             elif current_date < start_date:
-                days_until = (start_date - current_date).days
-                return f"🟡 Ban starts in {days_until} days"
+                return 'upcoming', (start_date - current_date).days
             else:
-                return f"🟢 No active ban"
+                return 'none', 0
                 
         except Exception as e:
             logger.error(f"Ban status check error: {str(e)}")
-            return ""
+            return None
     
     def get_faq_response(self, question: str, language: str) -> str:
         """Get FAQ response for common legal questions"""
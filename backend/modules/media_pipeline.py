@@ -0,0 +1,225 @@
+"""
+Media Pipeline Module for FisherMate.AI
+Downloads, transcodes and transcribes WhatsApp voice notes in bounded stages
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from modules.bulkhead import BulkheadFullError, bulkhead, get_bulkhead
+from modules.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# What speech recognition wants: 16 kHz mono 16-bit PCM
+SAMPLE_RATE = 16000
+
+# Where Twilio serves inbound message media
+TWILIO_MEDIA_HOSTS = ('api.twilio.com',)
+
+STAGE_LATENCY = registry.histogram(
+    'fishermate_media_stage_seconds', 'Voice note pipeline stage latency', ['stage'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+VOICE_NOTES = registry.counter(
+    'fishermate_voice_notes_total', 'WhatsApp voice notes by outcome', ['result']
+)
+
+
+class MediaRejected(Exception):
+    """A voice note the pipeline will not (or cannot now) transcribe
+
+    `reason` is one of too_large, too_long, busy or failed.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def is_twilio_media_url(url: str, hosts: Iterable[str] = TWILIO_MEDIA_HOSTS, account_sid: Optional[str] = None) -> bool:
+    """Whether a MediaUrl points at Twilio's media API (of this account, if given)
+
+    Only such URLs are fetched, and with the account credentials; anything
+    else in a webhook form could send them, or our requests, anywhere.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme != 'https' or parsed.hostname not in hosts or parsed.port not in (None, 443):
+        return False
+    if parsed.username or parsed.password:
+        return False
+    return account_sid is None or parsed.path.startswith(f"/2010-04-01/Accounts/{account_sid}/")
+
+
+def download(url: str, dest: str, max_bytes: int, auth: Optional[Tuple[str, str]] = None,
+             hosts: Iterable[str] = TWILIO_MEDIA_HOSTS, timeout: float = 10.0, chunk_size: int = 64 * 1024) -> int:
+    """Stream Twilio media to `dest` without holding it in memory; returns its size"""
+    if not is_twilio_media_url(url, hosts, auth[0] if auth else None):
+        logger.warning(f"Voice note URL not on Twilio's media host refused: {url[:100]}")
+        raise MediaRejected('failed')
+
+    # Twilio media URLs redirect to storage; requests drops the auth on the way
+    with requests.get(url, auth=auth, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        if int(response.headers.get('Content-Length') or 0) > max_bytes:
+            raise MediaRejected('too_large')
+        size = 0
+        with open(dest, 'wb') as f:
+            for block in response.iter_content(chunk_size):
+                size += len(block)
+                if size > max_bytes:
+                    raise MediaRejected('too_large')
+                f.write(block)
+    return size
+
+
+def transcode(source: str, dest: str, max_seconds: float) -> float:
+    """Decode a voice note (OGG/Opus, AMR, MP3, ...) to 16 kHz mono WAV; returns its length in seconds
+
+    Runs in a pool process. Only a little past the limit is decoded, so
+    an over-long note costs no more than an acceptable one.
+    """
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(source, duration=max_seconds + 1)
+    if len(audio) > max_seconds * 1000:
+        raise MediaRejected('too_long')
+    audio.set_frame_rate(SAMPLE_RATE).set_channels(1).set_sample_width(2).export(dest, format='wav')
+    return len(audio) / 1000.0
+
+
+class MediaPipeline:
+    """Voice note to transcript, every stage bounded
+
+    - download: streamed to a temporary file, at most `max_bytes`, behind
+      the 'twilio_media' bulkhead; only from Twilio's media host unless
+      another `fetch(url, dest, max_bytes)` is given
+    - transcode: in a process pool sized to the 'transcode' bulkhead, so
+      a burst waits in that bulkhead's bounded queue, or is shed, rather
+      than piling up in the pool
+    - speech to text: VoiceHandler.speech_to_text, behind 'google_stt'
+
+    Temporary files are removed whatever the outcome.
+    """
+
+    def __init__(self, voice_handler, auth: Optional[Tuple[str, str]] = None, max_bytes: int = 16 * 1024 * 1024,
+                 max_seconds: float = 120, transcode_timeout: float = 30, workdir: Optional[str] = None,
+                 hosts: Iterable[str] = TWILIO_MEDIA_HOSTS, fetch: Optional[Callable[[str, str, int], int]] = None):
+        self.voice_handler = voice_handler
+        self.auth = auth
+        self.hosts = frozenset(hosts)
+        self.fetch = fetch or self.download
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.transcode_timeout = transcode_timeout
+        self.workdir = workdir
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def download(self, url: str, dest: str, max_bytes: int) -> int:
+        return download(url, dest, max_bytes, self.auth, self.hosts)
+
+    def _after_fork(self):
+        # A pool inherited across a fork is unusable; the child builds its own
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=get_bulkhead('transcode').max_concurrent)
+        return self._executor
+
+    def _recycle(self, pool: ProcessPoolExecutor):
+        """Retire a pool with a transcode past its timeout, killing its processes
+
+        A running call cannot be cancelled, so ending its process is the
+        only way to stop it. Other transcodes still running in that pool
+        fail with it; the next note gets a fresh pool.
+        """
+        with self._lock:
+            if self._executor is pool:
+                self._executor = None
+        # shutdown() forgets the processes, so take them first
+        processes = list((getattr(pool, '_processes', None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    def transcribe(self, media_url: str, language: str = 'en') -> str:
+        """Transcript of a voice note ('' if no speech was recognised); raises MediaRejected"""
+        workdir = tempfile.mkdtemp(prefix='voice-', dir=self.workdir)
+        try:
+            source = os.path.join(workdir, 'note')
+            wav = os.path.join(workdir, 'note.wav')
+
+            started = time.perf_counter()
+            with bulkhead('twilio_media'):
+                self.fetch(media_url, source, self.max_bytes)
+            STAGE_LATENCY.observe(time.perf_counter() - started, 'download')
+
+            started = time.perf_counter()
+            with bulkhead('transcode'):
+                pool = self._pool()
+                future = pool.submit(transcode, source, wav, self.max_seconds)
+                try:
+                    future.result(timeout=self.transcode_timeout)
+                except FutureTimeout:
+                    logger.warning(f"Voice note transcode took over {self.transcode_timeout}s; recycling the pool")
+                    self._recycle(pool)
+                    raise MediaRejected('failed')
+            STAGE_LATENCY.observe(time.perf_counter() - started, 'transcode')
+
+            started = time.perf_counter()
+            with open(wav, 'rb') as f:
+                text = self.voice_handler.speech_to_text(f, language)
+            STAGE_LATENCY.observe(time.perf_counter() - started, 'stt')
+
+            VOICE_NOTES.inc('transcribed' if text else 'unheard')
+            return text
+
+        except MediaRejected as e:
+            VOICE_NOTES.inc(e.reason)
+            raise
+        except BulkheadFullError as e:
+            logger.warning(f"Voice note shed: {str(e)}")
+            VOICE_NOTES.inc('busy')
+            raise MediaRejected('busy')
+        except Exception as e:
+            logger.error(f"Voice note error: {str(e)}")
+            VOICE_NOTES.inc('failed')
+            raise MediaRejected('failed')
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def get_stats(self) -> Dict:
+        return {
+            'max_bytes': self.max_bytes,
+            'max_seconds': self.max_seconds,
+            'download': get_bulkhead('twilio_media').get_stats(),
+            'transcode': get_bulkhead('transcode').get_stats()
+        }
+
+
+def create_media_pipeline(voice_handler) -> MediaPipeline:
+    """Pipeline configured from VOICE_NOTE_* environment variables"""
+    account_sid, auth_token = os.getenv('TWILIO_ACCOUNT_SID'), os.getenv('TWILIO_AUTH_TOKEN')
+    return MediaPipeline(
+        voice_handler,
+        auth=(account_sid, auth_token) if account_sid and auth_token else None,
+        hosts=os.getenv('TWILIO_MEDIA_HOSTS', ','.join(TWILIO_MEDIA_HOSTS)).split(','),
+        max_bytes=int(os.getenv('VOICE_NOTE_MAX_BYTES', 16 * 1024 * 1024)),
+        max_seconds=float(os.getenv('VOICE_NOTE_MAX_SECONDS', 120)),
+        transcode_timeout=float(os.getenv('VOICE_NOTE_TRANSCODE_TIMEOUT', 30))
+    )
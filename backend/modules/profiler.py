@@ -0,0 +1,110 @@
+"""
+Profiler Module for FisherMate.AI
+On-demand sampling profiler producing route-tagged collapsed stacks
+"""
+
+import os
+import sys
+import threading
+import time
+import logging
+from collections import Counter
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_PROFILE_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', 60))
+OTHER_ROUTE = '(no route)'
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is requested while another one is running"""
+
+
+def view_routes(app) -> Dict:
+    """Map each view function's code object to its URL rule"""
+    routes = {}
+    for rule in app.url_map.iter_rules():
+        view = app.view_functions.get(rule.endpoint)
+        code = getattr(view, '__code__', None)
+        if code is not None:
+            routes.setdefault(code, rule.rule)
+    return routes
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})"
+
+
+class SamplingProfiler:
+    """Samples every thread's stack from a single caller; no hooks when idle
+
+    Nothing is installed on the request path: routes are recovered at
+    sample time by spotting a view function's frame on the stack, so the
+    profiler costs nothing until profile() is called.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._extra_routes: Dict = {}
+        self._running = threading.Lock()
+
+    def tag(self, func, route: str):
+        """Attribute stacks through func to route, for work run off the request thread"""
+        self._extra_routes[func.__code__] = route
+
+    @property
+    def busy(self) -> bool:
+        return self._running.locked()
+
+    def profile(self, seconds: float, interval: float = 0.005, route: Optional[str] = None,
+                all_threads: bool = False) -> Counter:
+        """Sample for `seconds` and return {collapsed stack: samples}
+
+        Each stack is rooted at the route it belongs to. Threads not
+        serving a request are skipped unless all_threads is set.
+        """
+        seconds = min(max(seconds, 0.0), MAX_PROFILE_SECONDS)
+        interval = max(interval, 0.001)
+        if not self._running.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running")
+
+        try:
+            routes = view_routes(self.app) if self.app is not None else {}
+            routes.update(self._extra_routes)
+            own_thread = threading.get_ident()
+            stacks = Counter()
+            deadline = time.monotonic() + seconds
+            samples = 0
+
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_thread:
+                        continue
+                    labels = []
+                    tag = None
+                    while frame is not None:
+                        code = frame.f_code
+                        if tag is None:
+                            tag = routes.get(code)
+                        labels.append(_frame_label(code))
+                        frame = frame.f_back
+                    tag = tag or OTHER_ROUTE
+                    if route is not None and tag != route:
+                        continue
+                    if tag == OTHER_ROUTE and not all_threads:
+                        continue
+                    labels.append(tag)
+                    stacks[';'.join(reversed(labels))] += 1
+                samples += 1
+                time.sleep(interval)
+
+            logger.info(f"Profiled {samples} samples over {seconds}s ({len(stacks)} unique stacks)")
+            return stacks
+        finally:
+            self._running.release()
+
+
+def to_collapsed(stacks: Counter) -> str:
+    """Render stacks in the collapsed format read by flamegraph.pl and speedscope"""
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
@@ -0,0 +1,128 @@
+"""
+Response Cache Module for FisherMate.AI
+Holds pre-serialized, pre-compressed API responses for slowly changing data
+"""
+
+import hashlib
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from modules.compression import compress
+from modules.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse:
+    """Serialized body of one response plus its compressed variants and ETags"""
+
+    __slots__ = ('version', 'body', 'digest', '_variants', '_lock')
+
+    def __init__(self, version: str, body: bytes):
+        self.version = version
+        self.body = body
+        self.digest = hashlib.sha1(body).hexdigest()[:20]
+        self._variants: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        """Strong ETag; each representation gets its own"""
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def variant(self, encoding: Optional[str]) -> Tuple[bytes, float]:
+        """Body in the given encoding and the CPU seconds spent producing it now
+
+        Each encoding is compressed once, at the highest level, then reused.
+        """
+        if encoding is None:
+            return self.body, 0.0
+        cached = self._variants.get(encoding)
+        if cached is not None:
+            return cached, 0.0
+        with self._lock:
+            cached = self._variants.get(encoding)
+            if cached is not None:
+                return cached, 0.0
+            started = time.thread_time()
+            compressed = compress(self.body, encoding, static=True)
+            self._variants[encoding] = compressed
+            return compressed, time.thread_time() - started
+
+    def matches(self, if_none_match: Optional[str], encoding: Optional[str] = None) -> bool:
+        """Check an If-None-Match header against the representation in `encoding`
+
+        Only that representation's ETag counts: the 304 carries it, so a
+        cache holding another encoding must not be told it is current.
+        """
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        etag = self.etag(encoding)
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            if tag == etag:
+                return True
+        return False
+
+
+class PrecomputedResponseCache:
+    """LRU of serialized responses, rebuilt only when the data version changes"""
+
+    def __init__(self, serializer: Callable[[Any], bytes], max_entries: int = 512, name: str = 'response'):
+        self.name = name
+        self.serializer = serializer
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, CachedResponse]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, version: str, builder: Callable[[], Dict]) -> Optional[CachedResponse]:
+        """Get the cached response for key, building it if missing or stale
+
+        Returns None when the builder produced an error payload; those are
+        served uncached so transient failures are not pinned.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                record_cache_lookup(self.name, True)
+                return entry
+            self.misses += 1
+        record_cache_lookup(self.name, False)
+
+        payload = builder()
+        if 'error' in payload:
+            return None
+
+        entry = CachedResponse(version, self.serializer(payload))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        """Drop all cached responses"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total if total else 0
+            }
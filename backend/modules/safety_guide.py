@@ -5,15 +5,26 @@ Provides safety protocols and emergency guidance for fisherfolk
 
 import json
 import os
+import hashlib
 from datetime import datetime
 from typing import Dict, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# When the built-in safety content last changed; update with load_safety_data().
+# A fixed date keeps the response body, and so its ETag, identical across
+# workers and restarts.
+SAFETY_DATA_UPDATED_AT = datetime(2025, 7, 17)
+
 class SafetyGuideService:
     def __init__(self):
         self.safety_data = self.load_safety_data()
+        
+        # Safety content only changes with a deploy, so version it once at load
+        raw = json.dumps(self.safety_data, sort_keys=True).encode('utf-8')
+        self.data_version = hashlib.sha1(raw).hexdigest()[:16]
+        self.data_updated_at = SAFETY_DATA_UPDATED_AT
     
     def load_safety_data(self) -> Dict:
         """Load safety information and protocols"""
@@ -262,7 +273,8 @@ class SafetyGuideService:
                     'category': category,
                     'info': self.safety_data[category],
                     'language': language,
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': self.data_updated_at.isoformat(),
+                    'data_version': self.data_version
                 }
             else:
                 return {
@@ -0,0 +1,98 @@
+"""
+Serialization Module for FisherMate.AI
+Fast JSON encoding for API responses, with the same output as Flask's default encoder
+"""
+
+import json
+import uuid
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List
+
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on deployment
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+# Placeholder text for fragments when the backend cannot embed raw JSON itself
+_FRAGMENT_TOKEN = f"__fm_fragment_{uuid.uuid4().hex}_"
+
+
+class Fragment:
+    """Already-serialized JSON embedded as-is into a larger document"""
+
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data.encode('utf-8') if isinstance(data, str) else bytes(data)
+
+
+def _default(obj: Any, fragments: List[bytes]) -> Any:
+    if isinstance(obj, Fragment):
+        if orjson is not None and hasattr(orjson, 'Fragment'):
+            return orjson.Fragment(obj.data)
+        fragments.append(obj.data)
+        return f"{_FRAGMENT_TOKEN}{len(fragments) - 1}"
+    if isinstance(obj, (datetime, date)):
+        # RFC 822, as Flask's DefaultJSONProvider writes them; clients parse this format
+        return http_date(obj)
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes
+
+    Same values and key order as Flask's DefaultJSONProvider (sorted keys,
+    RFC 822 dates), only without escaping non-ASCII text.
+    """
+    fragments: List[bytes] = []
+
+    def default(value):
+        return _default(value, fragments)
+
+    if orjson is not None:
+        data = orjson.dumps(obj, default=default,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+    else:
+        data = json.dumps(obj, default=default, ensure_ascii=False, sort_keys=True,
+                          separators=(',', ':')).encode('utf-8')
+
+    # Splice in fragments the backend could not embed natively
+    for index, fragment in enumerate(fragments):
+        data = data.replace(f'"{_FRAGMENT_TOKEN}{index}"'.encode('utf-8'), fragment, 1)
+    return data
+
+
+def loads(data: Any) -> Any:
+    """Parse JSON from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by dumps/loads, so jsonify uses the fast path"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
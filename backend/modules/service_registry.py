@@ -0,0 +1,112 @@
+"""
+Service Registry Module for FisherMate.AI
+Imports and constructs services on first use, with optional preloading
+"""
+
+import importlib
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _ServiceSpec:
+    __slots__ = ('name', 'module', 'attr', 'factory', 'instance', 'import_ms', 'construct_ms', 'lock')
+
+    def __init__(self, name: str, module: str, attr: Optional[str], factory: Optional[Callable[[Any], Any]]):
+        self.name = name
+        self.module = module
+        self.attr = attr
+        self.factory = factory
+        self.instance = None
+        self.import_ms = None
+        self.construct_ms = None
+        self.lock = threading.Lock()
+
+
+class ServiceRegistry:
+    """Named services built lazily from a module path
+
+    Nothing is imported until a service is first used, so app import
+    stays cheap. preload() builds everything up front, which under
+    `gunicorn --preload` happens once in the master; forked workers then
+    share the loaded modules and models copy-on-write.
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, _ServiceSpec] = {}
+
+    def register(self, name: str, module: str, attr: Optional[str] = None,
+                 factory: Optional[Callable[[Any], Any]] = None):
+        """Register a service: `attr` of `module` is called with no arguments,
+        or `factory(module)` builds it when given"""
+        self._specs[name] = _ServiceSpec(name, module, attr, factory)
+
+    def get(self, name: str) -> Any:
+        """Get a service instance, importing and constructing it on first use"""
+        spec = self._specs[name]
+        if spec.instance is not None:
+            return spec.instance
+        with spec.lock:
+            if spec.instance is None:
+                started = time.perf_counter()
+                module = importlib.import_module(spec.module)
+                imported = time.perf_counter()
+                instance = spec.factory(module) if spec.factory else getattr(module, spec.attr)()
+                spec.import_ms = round((imported - started) * 1000, 1)
+                spec.construct_ms = round((time.perf_counter() - imported) * 1000, 1)
+                spec.instance = instance
+                logger.info(f"Loaded service '{name}': import {spec.import_ms}ms, construct {spec.construct_ms}ms")
+        return spec.instance
+
+    def loaded(self, name: str) -> Optional[Any]:
+        """The service instance if it has been built, else None; never builds it"""
+        return self._specs[name].instance
+
+    def proxy(self, name: str) -> 'LazyService':
+        """Module-level stand-in that builds the service on first attribute access"""
+        return LazyService(self, name)
+
+    def preload(self, names: Optional[Iterable[str]] = None) -> Dict:
+        """Build services now rather than on first request"""
+        started = time.perf_counter()
+        for name in names or list(self._specs):
+            self.get(name)
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Preloaded {len(self._specs)} services in {total_ms}ms")
+        return self.get_startup_report()
+
+    def get_startup_report(self) -> Dict:
+        """Per-service import and construction time; None until loaded"""
+        return {
+            name: {
+                'loaded': spec.instance is not None,
+                'import_ms': spec.import_ms,
+                'construct_ms': spec.construct_ms
+            }
+            for name, spec in self._specs.items()
+        }
+
+
+class LazyService:
+    """Forwards attribute access to the registry's instance"""
+
+    __slots__ = ('_registry', '_name')
+
+    def __init__(self, registry: ServiceRegistry, name: str):
+        object.__setattr__(self, '_registry', registry)
+        object.__setattr__(self, '_name', name)
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._registry.get(self._name), attr)
+
+    def __setattr__(self, attr: str, value: Any):
+        setattr(self._registry.get(self._name), attr, value)
+
+    def __delattr__(self, attr: str):
+        delattr(self._registry.get(self._name), attr)
+
+    def __repr__(self) -> str:
+        return f"<LazyService '{self._name}'>"
@@ -0,0 +1,515 @@
+"""
+Session Store Module for FisherMate.AI
+Pluggable SMS/WhatsApp session storage shared across worker processes
+"""
+
+import json
+import os
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from modules.timing_wheel import TimingWheel
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'sessions.db')
+
+# Seconds between background expiry passes, and the timing wheel resolution
+EXPIRY_TICK = float(os.getenv('SESSION_EXPIRY_TICK', 60))
+
+
+# '$tag' -> class with to_state() / from_state(state), see register_session_type
+_SESSION_TYPES: Dict[str, type] = {}
+
+
+def register_session_type(cls: type):
+    """Let instances of cls be stored in sessions, tagged by cls.STATE_TAG"""
+    _SESSION_TYPES['$' + cls.STATE_TAG] = cls
+
+
+def _encode_default(value):
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    tag = getattr(type(value), 'STATE_TAG', None)
+    if tag is not None and '$' + tag in _SESSION_TYPES:
+        return {'$' + tag: value.to_state()}
+    raise TypeError(f"Cannot store {type(value).__name__} in a session")
+
+
+def _decode_hook(value: Dict):
+    if len(value) == 1:
+        (tag, state), = value.items()
+        if tag == '$dt':
+            return datetime.fromisoformat(state)
+        cls = _SESSION_TYPES.get(tag)
+        if cls is not None:
+            return cls.from_state(state)
+    return value
+
+
+def encode_session(session: Dict) -> str:
+    """Serialize a session; datetimes survive the round trip"""
+    return json.dumps(session, default=_encode_default, ensure_ascii=False, separators=(',', ':'))
+
+
+def decode_session(data) -> Dict:
+    return json.loads(data, object_hook=_decode_hook)
+
+
+def _deep_sizeof(obj, seen=None) -> int:
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+class SessionStore(ABC):
+    """Interface: sessions are dicts keyed by phone number, expiring `ttl`
+    seconds after they were last saved"""
+
+    backend = 'base'
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict]:
+        """The live session for key, or None"""
+
+    @abstractmethod
+    def save(self, key: str, session: Dict):
+        """Store the session and restart its ttl"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Forget the session, if any"""
+
+    @abstractmethod
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        """(key, session) for every live session"""
+
+    @abstractmethod
+    def expire(self) -> int:
+        """Drop expired sessions; returns how many were removed"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of stored sessions"""
+
+    def values(self) -> Iterator[Dict]:
+        for _, session in self.items():
+            yield session
+
+    def get_stats(self) -> Dict:
+        return {'backend': self.backend, 'sessions': len(self), 'ttl': self.ttl}
+
+
+class SharedSessionStore(SessionStore):
+    """A store every worker reads and writes; each save gets a new version token"""
+
+    @abstractmethod
+    def save(self, key: str, session: Dict) -> str:
+        """Store the session and restart its ttl; returns its new version"""
+
+    @abstractmethod
+    def version(self, key: str) -> Optional[str]:
+        """Version of the live session, or None; cheaper than get()"""
+
+    @abstractmethod
+    def get_versioned(self, key: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """The live session and its version, or (None, None)"""
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self.get_versioned(key)[0]
+
+
+def new_version() -> str:
+    return secrets.token_hex(8)
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU; sessions are returned by reference
+
+    Deadlines live in a timing wheel, so saving a session is O(1) and
+    expire() only touches the sessions that actually expired. Each
+    session's size is measured when it is saved and kept in a running
+    total, so get_stats() does not walk the store.
+    """
+
+    backend = 'memory'
+
+    def __init__(self, ttl: float, max_entries: int = 100000, tick: float = EXPIRY_TICK):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        # key -> (expires_at, session, size in bytes when saved)
+        self._entries: 'OrderedDict[str, Tuple[float, Dict, int]]' = OrderedDict()
+        self._expiry = TimingWheel(min(tick, ttl), ttl, time.time())
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                self._remove(key)
+                self._expiry.cancel(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def save(self, key: str, session: Dict):
+        expires_at = time.time() + self.ttl
+        size = _deep_sizeof(session)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (expires_at, session, size)
+            self.total_bytes += size
+            self._expiry.schedule(key, expires_at)
+            while len(self._entries) > self.max_entries:
+                evicted_key = next(iter(self._entries))
+                self._remove(evicted_key)
+                self._expiry.cancel(evicted_key)
+                self.evicted += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(key)
+            self._expiry.cancel(key)
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        now = time.time()
+        with self._lock:
+            snapshot = list(self._entries.items())
+        for key, (expires_at, session, _) in snapshot:
+            if expires_at > now:
+                yield key, session
+
+    def expire(self) -> int:
+        with self._lock:
+            expired = self._expiry.advance(time.time())
+            for key in expired:
+                self._remove(key)
+            self.expired += len(expired)
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict:
+        return dict(super().get_stats(), max_entries=self.max_entries, evicted=self.evicted,
+                    expired=self.expired, memory_bytes=sys.getsizeof(self._entries) + self.total_bytes)
+
+
+class SQLiteSessionStore(SharedSessionStore):
+    """Sessions in a WAL-mode SQLite file shared by every worker on the host"""
+
+    backend = 'sqlite'
+
+    def __init__(self, ttl: float, namespace: str, path: str = DEFAULT_SQLITE_PATH):
+        super().__init__(ttl)
+        self.namespace = namespace
+        self.path = path
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, data TEXT NOT NULL, expires_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_expiry ON sessions (namespace, expires_at)")
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+        if 'version' not in columns:
+            conn.execute("ALTER TABLE sessions ADD COLUMN version TEXT NOT NULL DEFAULT ''")
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread, and never one inherited across a fork
+        # (the store may be built in a preloading gunicorn master)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_versioned(self, key: str) -> Tuple[Optional[Dict], Optional[str]]:
+        row = self._conn().execute(
+            "SELECT data, version FROM sessions WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (self.namespace, key, time.time())
+        ).fetchone()
+        return (decode_session(row[0]), row[1]) if row else (None, None)
+
+    def version(self, key: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT version FROM sessions WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (self.namespace, key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def save(self, key: str, session: Dict) -> str:
+        version = new_version()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO sessions (namespace, key, data, expires_at, version) VALUES (?, ?, ?, ?, ?)",
+            (self.namespace, key, encode_session(session), time.time() + self.ttl, version)
+        )
+        return version
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM sessions WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        cursor = self._conn().execute(
+            "SELECT key, data FROM sessions WHERE namespace = ? AND expires_at > ?",
+            (self.namespace, time.time())
+        )
+        for key, data in cursor:
+            yield key, decode_session(data)
+
+    def expire(self) -> int:
+        # Range delete on the (namespace, expires_at) index: O(expired)
+        cursor = self._conn().execute(
+            "DELETE FROM sessions WHERE namespace = ? AND expires_at <= ?", (self.namespace, time.time())
+        )
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM sessions WHERE namespace = ? AND expires_at > ?",
+            (self.namespace, time.time())
+        ).fetchone()[0]
+
+    def get_stats(self) -> Dict:
+        file_bytes = sum(os.path.getsize(self.path + suffix) for suffix in ('', '-wal')
+                         if os.path.exists(self.path + suffix))
+        return dict(super().get_stats(), path=self.path, file_bytes=file_bytes)
+
+
+class RedisSessionStore(SharedSessionStore):
+    """Sessions in Redis or any Redis-compatible server; expiry is native
+
+    A sorted set of key -> deadline sits beside the sessions, so the
+    session count is one ZCOUNT rather than a SCAN of the keyspace.
+    Each value starts with its 16-character version, which GETRANGE
+    reads without transferring the session.
+    """
+
+    backend = 'redis'
+
+    def __init__(self, ttl: float, namespace: str, url: str = 'redis://localhost:6379/0'):
+        super().__init__(ttl)
+        if redis is None:
+            raise RuntimeError("redis is not installed; pip install redis")
+        self.prefix = f"fishermate:session:{namespace}:"
+        self.index = f"fishermate:sessions:{namespace}"
+        self.client = redis.Redis.from_url(url)
+
+    @staticmethod
+    def _split(data: bytes) -> Tuple[Dict, str]:
+        if data[:1] == b'{':
+            # Saved before sessions carried a version
+            return decode_session(data), ''
+        return decode_session(data[16:]), data[:16].decode()
+
+    def get_versioned(self, key: str) -> Tuple[Optional[Dict], Optional[str]]:
+        data = self.client.get(self.prefix + key)
+        return self._split(data) if data else (None, None)
+
+    def version(self, key: str) -> Optional[str]:
+        head = self.client.getrange(self.prefix + key, 0, 15)
+        if not head:
+            return None
+        return '' if head[:1] == b'{' else head.decode()
+
+    def save(self, key: str, session: Dict) -> str:
+        version = new_version()
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, version + encode_session(session), ex=int(self.ttl))
+        pipe.zadd(self.index, {key: time.time() + int(self.ttl)})
+        pipe.execute()
+        return version
+
+    def delete(self, key: str):
+        pipe = self.client.pipeline()
+        pipe.delete(self.prefix + key)
+        pipe.zrem(self.index, key)
+        pipe.execute()
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        for redis_key in self.client.scan_iter(match=self.prefix + '*', count=1000):
+            data = self.client.get(redis_key)
+            if data:
+                yield redis_key.decode()[len(self.prefix):], self._split(data)[0]
+
+    def expire(self) -> int:
+        # Redis already dropped the sessions; trim their index entries
+        return self.client.zremrangebyscore(self.index, '-inf', time.time())
+
+    def __len__(self) -> int:
+        return self.client.zcount(self.index, time.time(), '+inf')
+
+
+class TieredSessionStore(SessionStore):
+    """Small in-process LRU in front of a shared store
+
+    Writes go through to the shared store. A local copy is only served
+    while its version is still the shared one, so a session saved by
+    another worker (a language switch, say) is never read stale and then
+    written back over. The check reads the version alone, which skips
+    transferring and decoding the session on a hit.
+    """
+
+    def __init__(self, shared: SharedSessionStore, local_ttl: float = 2.0, max_entries: int = 10000):
+        super().__init__(shared.ttl)
+        self.shared = shared
+        # key -> (version, session)
+        self.local = MemorySessionStore(local_ttl, max_entries)
+        self.backend = f"{shared.backend}+lru"
+        self.local_hits = 0
+        self.local_misses = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        cached = self.local.get(key)
+        if cached is not None and self.shared.version(key) == cached[0]:
+            self.local_hits += 1
+            return cached[1]
+        self.local_misses += 1
+        session, version = self.shared.get_versioned(key)
+        if session is None:
+            self.local.delete(key)
+        else:
+            self.local.save(key, (version, session))
+        return session
+
+    def save(self, key: str, session: Dict):
+        version = self.shared.save(key, session)
+        self.local.save(key, (version, session))
+
+    def delete(self, key: str):
+        self.local.delete(key)
+        self.shared.delete(key)
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        return self.shared.items()
+
+    def expire(self) -> int:
+        self.local.expire()
+        return self.shared.expire()
+
+    def __len__(self) -> int:
+        return len(self.shared)
+
+    def get_stats(self) -> Dict:
+        total = self.local_hits + self.local_misses
+        return dict(
+            self.shared.get_stats(),
+            backend=self.backend,
+            memory_bytes=self.local.get_stats()['memory_bytes'],
+            local_hit_ratio=self.local_hits / total if total else 0
+        )
+
+
+class ExpiryTicker:
+    """Background thread expiring every registered store each tick
+
+    Nothing runs until start(), which app.start_background_work() calls
+    in each serving worker. A forked child only forgets the parent's
+    thread; it is not restarted there, so the preload master's helpers
+    and transcode pool workers stay thread-free.
+    """
+
+    def __init__(self, interval: float = EXPIRY_TICK):
+        self.interval = interval
+        self.stores: List[SessionStore] = []
+        self._thread: Optional[threading.Thread] = None
+        self._started = False
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def register(self, store: SessionStore):
+        with self._lock:
+            self.stores.append(store)
+            if self._started and self._thread is None:
+                self._start()
+
+    def start(self):
+        """Expire registered stores from now on in this process"""
+        with self._lock:
+            self._started = True
+            if self.stores and self._thread is None:
+                self._start()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name='session-expiry', daemon=True)
+        self._thread.start()
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._started = False
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            for store in list(self.stores):
+                try:
+                    expired = store.expire()
+                    if expired:
+                        logger.info(f"Expired {expired} idle {store.backend} sessions")
+                except Exception as e:
+                    logger.error(f"Session expiry error: {str(e)}")
+
+
+expiry_ticker = ExpiryTicker()
+
+
+def create_session_store(namespace: str, ttl: float) -> SessionStore:
+    """Build the store selected by SESSION_STORE (memory, sqlite or redis)"""
+    backend = os.getenv('SESSION_STORE', 'memory').lower()
+    max_entries = int(os.getenv('SESSION_CACHE_SIZE', 100000))
+
+    if backend == 'sqlite':
+        shared = SQLiteSessionStore(ttl, namespace, os.getenv('SESSION_STORE_PATH', DEFAULT_SQLITE_PATH))
+    elif backend == 'redis':
+        shared = RedisSessionStore(ttl, namespace, os.getenv('SESSION_REDIS_URL', 'redis://localhost:6379/0'))
+    else:
+        if backend != 'memory':
+            logger.warning(f"Unknown SESSION_STORE '{backend}', using memory")
+        store = MemorySessionStore(ttl, max_entries)
+        expiry_ticker.register(store)
+        return store
+
+    local_ttl = float(os.getenv('SESSION_LOCAL_TTL', 2))
+    logger.info(f"Session store '{namespace}': {backend} with {local_ttl}s local cache")
+    store = TieredSessionStore(shared, local_ttl, min(max_entries, 10000))
+    expiry_ticker.register(store)
+    return store
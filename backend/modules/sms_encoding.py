@@ -0,0 +1,216 @@
+"""
+SMS Encoding Module for FisherMate.AI
+GSM-7/UCS-2 detection, segment accounting and segment-aware message splitting
+"""
+
+import os
+import unicodedata
+from typing import Dict, List
+
+# GSM 03.38 default alphabet (1 septet each) and its extension table
+# (2 septets each: escape + character)
+GSM7_BASIC = frozenset(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM7_EXTENDED = frozenset("^{}\\[~]|€\f")
+
+GSM7 = 'GSM-7'
+UCS2 = 'UCS-2'
+
+# (single-segment limit, per-segment limit once concatenated) in septets
+# for GSM-7 and UTF-16 code units for UCS-2; the rest of a concatenated
+# segment carries the reassembly header
+SEGMENT_LIMITS = {GSM7: (160, 153), UCS2: (70, 67)}
+
+# Twilio accepts 1600 characters per message and advises staying within
+# 10 segments; longer texts are sent as several numbered messages
+MAX_SEGMENTS_PER_MESSAGE = int(os.getenv('SMS_MAX_SEGMENTS', 10))
+
+# What to do with text that would otherwise go out as UCS-2:
+# off, transliterate (to GSM-7 when that covers every character) or
+# strip (transliterate, else at least drop emoji)
+GSM_FALLBACK = os.getenv('SMS_GSM_FALLBACK', 'transliterate').lower()
+
+_PUNCTUATION = {
+    '\u2018': "'", '\u2019': "'", '\u201a': "'", '\u201b': "'", '\u2032': "'",
+    '\u201c': '"', '\u201d': '"', '\u201e': '"', '\u2033': '"',
+    '\u2013': '-', '\u2014': '-', '\u2212': '-', '\u2010': '-', '\u2011': '-',
+    '\u2026': '...', '\u2022': '*', '\u00b7': '.', '\u00a0': ' ', '\u2009': ' ', '\u202f': ' ',
+    '\u00b0': ' deg', '\u20b9': 'Rs', '\u00d7': 'x', '\u2192': '->', '\t': ' ',
+    '\u0964': '.'
+}
+
+# Emoji that carry meaning in our alerts; any other emoji is dropped
+_EMOJI_TEXT = {
+    '\U0001f6a8': '!!', '\u26a0': '!', '\u274c': 'X', '\u2705': 'OK', '\u2714': 'OK',
+    '\U0001f198': 'SOS', '\U0001f4de': 'Tel', '\u260e': 'Tel'
+}
+
+# Invisible emoji modifiers: variation selectors and zero-width joiner
+_EMOJI_JOINERS = frozenset('\ufe0e\ufe0f\u200d')
+
+
+def is_gsm7(text: str) -> bool:
+    return all(ch in GSM7_BASIC or ch in GSM7_EXTENDED for ch in text)
+
+
+def detect_encoding(text: str) -> str:
+    return GSM7 if is_gsm7(text) else UCS2
+
+
+def char_units(ch: str, encoding: str) -> int:
+    """Septets (GSM-7) or UTF-16 code units (UCS-2) one character costs"""
+    if encoding == GSM7:
+        return 2 if ch in GSM7_EXTENDED else 1
+    return 2 if ord(ch) > 0xFFFF else 1
+
+
+def count_units(text: str, encoding: str = None) -> int:
+    encoding = encoding or detect_encoding(text)
+    return sum(char_units(ch, encoding) for ch in text)
+
+
+def segments_for(units: int, encoding: str) -> int:
+    single, multi = SEGMENT_LIMITS[encoding]
+    if units <= single:
+        return 1
+    return -(-units // multi)
+
+
+def count_segments(text: str) -> int:
+    """Billed segments for text sent as one (concatenated) SMS"""
+    encoding = detect_encoding(text)
+    return segments_for(count_units(text, encoding), encoding)
+
+
+def _is_emoji(ch: str) -> bool:
+    code = ord(ch)
+    return (ch in _EMOJI_JOINERS or code >= 0x1F000
+            or 0x2600 <= code <= 0x27BF or 0x2B00 <= code <= 0x2BFF)
+
+
+def _tidy(text: str) -> str:
+    """Drop the gaps removed emoji leave at line starts and between words"""
+    lines = [' '.join(line.split()) for line in text.split('\n')]
+    return '\n'.join(lines).strip()
+
+
+def strip_emoji(text: str) -> str:
+    stripped = ''.join(ch for ch in text if not _is_emoji(ch))
+    return _tidy(stripped) if stripped != text else text
+
+
+def to_gsm7(text: str) -> str:
+    """Best-effort GSM-7 rendering: ASCII punctuation, unaccented letters, emoji as text
+
+    Characters with no GSM-7 equivalent (Tamil, Devanagari, ...) are kept,
+    so check the result with is_gsm7().
+    """
+    out = []
+    changed = False
+    for ch in text:
+        if ch in GSM7_BASIC or ch in GSM7_EXTENDED:
+            out.append(ch)
+            continue
+        changed = True
+        if ch in _PUNCTUATION:
+            out.append(_PUNCTUATION[ch])
+        elif _is_emoji(ch):
+            out.append(_EMOJI_TEXT.get(ch, ''))
+        else:
+            base = ''.join(c for c in unicodedata.normalize('NFKD', ch) if not unicodedata.combining(c))
+            out.append(base if base and is_gsm7(base) else ch)
+    return _tidy(''.join(out)) if changed else text
+
+
+def prepare_text(text: str, fallback: str = GSM_FALLBACK) -> str:
+    """Apply the GSM-7 fallback policy to outbound text"""
+    if fallback == 'off' or is_gsm7(text):
+        return text
+    candidate = to_gsm7(text)
+    if is_gsm7(candidate):
+        return candidate
+    return strip_emoji(text) if fallback == 'strip' else text
+
+
+class SmsPlan:
+    """How a text will go out: encoding, messages and billed segments"""
+
+    __slots__ = ('text', 'encoding', 'parts', 'segments')
+
+    def __init__(self, text: str, encoding: str, parts: List[str], segments: List[int]):
+        self.text = text
+        self.encoding = encoding
+        self.parts = parts
+        self.segments = segments
+
+    @property
+    def total_segments(self) -> int:
+        return sum(self.segments)
+
+    def as_dict(self) -> Dict:
+        return {
+            'encoding': self.encoding,
+            'characters': len(self.text),
+            'messages': len(self.parts),
+            'segments': self.total_segments,
+            'segments_per_message': self.segments
+        }
+
+
+def _split_point(text: str, start: int, capacity: int, encoding: str) -> int:
+    """End index of the longest prefix of text[start:] within capacity, at a word break if possible"""
+    used = 0
+    end = start
+    while end < len(text):
+        cost = char_units(text[end], encoding)
+        if used + cost > capacity:
+            break
+        used += cost
+        end += 1
+    if end >= len(text):
+        return end
+    # Prefer a line break, then a space, in the back half of the part
+    floor = start + (end - start) // 2
+    cut = text.rfind('\n', floor, end + 1)
+    if cut <= start:
+        cut = text.rfind(' ', floor, end + 1)
+    return cut if cut > start else end
+
+
+def plan_sms(text: str, fallback: str = GSM_FALLBACK, max_segments: int = MAX_SEGMENTS_PER_MESSAGE) -> SmsPlan:
+    """Encode and split text into as few billed segments as possible
+
+    A text that fits in `max_segments` goes out as one concatenated SMS,
+    which the handset reassembles in order, so no "(1/3)" markers are
+    needed. Longer texts are cut into messages of exactly `max_segments`
+    full segments, at the last line break or space, with a numbered
+    suffix whose length is counted.
+    """
+    text = prepare_text(text, fallback)
+    encoding = detect_encoding(text)
+    units = count_units(text, encoding)
+    multi = SEGMENT_LIMITS[encoding][1]
+    if segments_for(units, encoding) <= max_segments:
+        return SmsPlan(text, encoding, [text], [segments_for(units, encoding)])
+
+    capacity = max_segments * multi
+    # Size the suffix for the estimated part count, then re-split once if it grew a digit
+    total = -(-units // capacity)
+    for _ in range(2):
+        suffix_units = len(f" ({total}/{total})")
+        parts = []
+        start = 0
+        while start < len(text):
+            end = _split_point(text, start, capacity - suffix_units, encoding)
+            parts.append(text[start:end].strip())
+            start = end
+            while start < len(text) and text[start] in ' \n':
+                start += 1
+        if len(str(len(parts))) <= len(str(total)):
+            break
+        total = len(parts)
+
+    parts = [f"{part} ({i+1}/{len(parts)})" for i, part in enumerate(parts)]
+    return SmsPlan(text, encoding, parts, [segments_for(count_units(p, encoding), encoding) for p in parts])
@@ -5,16 +5,29 @@ Handles SMS integration via Twilio API for low-bandwidth users
 
 import os
 import logging
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import date, datetime
 from typing import Dict, Any, Optional
 from twilio.rest import Client
 from twilio.twiml.messaging_response import MessagingResponse
 from flask import request
+from modules.bulkhead import bulkhead
+from modules.session_store import create_session_store
+from modules.usage_stats import ChannelUsage
+from modules.sms_encoding import SmsPlan, plan_sms
+from modules.subscriptions import get_subscription_registry
+from modules.broadcast import BroadcastEngine, DEFAULT_QUEUE_PATH, create_broadcast_engine
+from modules.gazetteer import get_gazetteer
+from modules.command_parser import get_command_parser
+from modules.response_cache import PrecomputedResponseCache
+from modules.weather_service import WeatherService
+from modules.legal_info import LegalInfoService
 
 logger = logging.getLogger(__name__)
 
 class SMSHandler:
-    def __init__(self):
+    def __init__(self, weather_service: Optional[WeatherService] = None,
+                 legal_info_service: Optional[LegalInfoService] = None):
         self.account_sid = os.getenv('TWILIO_ACCOUNT_SID')
         self.auth_token = os.getenv('TWILIO_AUTH_TOKEN')
         self.sms_number = os.getenv('TWILIO_SMS_NUMBER')
@@ -22,59 +35,147 @@ class SMSHandler:
         # Initialize Twilio client
         if self.account_sid and self.auth_token:
             self.client = Client(self.account_sid, self.auth_token)
+            # Point at a local Twilio stand-in for load tests
+            if os.getenv('TWILIO_API_BASE_URL'):
+                self.client.api.base_url = os.getenv('TWILIO_API_BASE_URL')
         else:
             self.client = None
             logger.warning("Twilio credentials not found. SMS functionality will be limited.")
         
-        # User session management (simplified for SMS)
-        self.user_sessions = {}
+        # User sessions, shared across workers when SESSION_STORE is set
+        self.session_ttl_hours = int(os.getenv('SMS_SESSION_TTL_HOURS', 168))
+        self.user_sessions = create_session_store('sms', ttl=self.session_ttl_hours * 3600)
         
-        # SMS command shortcuts
-        self.sms_commands = {
-            'W': 'weather',
-            'L': 'legal',
-            'S': 'safety',
-            'E': 'emergency',
-            'H': 'help',
-            'M': 'menu',
-            'EN': 'english',
-            'HI': 'hindi',
-            'TA': 'tamil'
-        }
+        # Usage counters, updated per message so stats never scan sessions
+        self.usage = ChannelUsage('sms', active_window=86400, retention_window=self.session_ttl_hours * 3600)
+        
+        # Broadcasts; any interrupted by a crash or restart are picked up by
+        # resume_broadcasts() in a serving worker, not here (the handler may
+        # be built in a preloading gunicorn master)
+        self._broadcasts: Optional[BroadcastEngine] = None
+        self.broadcast_queue_path = os.getenv('BROADCAST_QUEUE_PATH', DEFAULT_QUEUE_PATH)
+        
+        # Weather alert subscriptions, shared with WhatsApp
+        self.subscriptions = get_subscription_registry()
+        
+        # Data behind 'W <city>' and 'L <state>'; the app passes its shared services
+        self.weather_service = weather_service or WeatherService()
+        self.legal_info_service = legal_info_service or LegalInfoService()
+        self.gazetteer = get_gazetteer()
+        # Rendered replies per (place or state, language), rebuilt when the data changes
+        self.reply_cache = PrecomputedResponseCache(lambda payload: payload['text'].encode('utf-8'),
+                                                    max_entries=1024, name='sms_reply')
+        # Twilio waits 15s for the webhook; an uncached weather fetch gets this long
+        self.reply_budget = float(os.getenv('SMS_REPLY_BUDGET', 5))
+        self._lookups = ThreadPoolExecutor(max_workers=4, thread_name_prefix='sms-lookup')
+        
+        # Commands, language codes and keywords, shared with WhatsApp
+        self.parser = get_command_parser()
         
         # Quick response templates for SMS (character-limited)
         self.quick_responses = {
             'en': {
                 'welcome': "FisherMate SMS\nW-Weather L-Legal S-Safety E-Emergency H-Help\nSend city name for weather.",
-                'help': "Commands:\nW-Weather L-Legal S-Safety E-Emergency\nEN-English HI-Hindi TA-Tamil\nSend location for weather.",
+                'help': "Commands:\nW-Weather L-Legal S-Safety E-Emergency A-Alerts\nEN-English HI-Hindi TA-Tamil\nSend location for weather.",
                 'menu': "Menu:\nW-Weather L-Legal S-Safety E-Emergency H-Help\nOr send your question.",
                 'weather_help': "Weather: Send 'W Chennai' or 'W Mumbai'\nOr share location for local weather.",
                 'legal_help': "Legal: Send 'L Tamil Nadu' or 'L Kerala'\nFor fishing laws in your state.",
                 'safety_help': "Safety: Send 'S checklist' or 'S emergency'\nFor safety guidelines.",
-                'emergency': "EMERGENCY: Coast Guard 1554\nEmergency: 112\nMarine Police: 100\nVHF Ch 16: MAYDAY"
+                'emergency': "EMERGENCY: Coast Guard 1554\nEmergency: 112\nMarine Police: 100\nVHF Ch 16: MAYDAY",
+                'alerts_help': "Alerts: Send 'A Chennai' with your home port for weather alerts.\n'A STOP' to stop.",
+                'subscribed': "Weather alerts on for {port}.\n'A STOP' to stop.",
+                'unsubscribed': "Weather alerts stopped.",
+                'unknown_port': "Port not found. Try: {ports}",
+                'weather': "{city} Weather:\n{temperature}°C, {description}\n💨 {wind_speed} km/h\n💧 {humidity}% humidity\n{verdict}",
+                'verdict_safe': "✅ Good for fishing",
+                'verdict_caution': "⚠️ Fish with caution",
+                'verdict_dangerous': "❌ Do not go fishing",
+                'weather_pending': "Fetching weather for {city}. Send 'W {city}' again in a minute.",
+                'weather_unavailable': "Weather for {city} unavailable now. Coast Guard: 1554",
+                'unknown_place': "Place not found. Try: 'W Chennai' or 'W Kochi'",
+                'legal': "{state} Fishing Rules:\n🚫 Ban: {period}\n{ban_status}\n📋 License: {license}\n💰 Fine: {penalty}\n📞 Helpline: {helpline}",
+                'ban_active': "🔴 Ban ON, {days} days left",
+                'ban_upcoming': "🟡 Ban starts in {days} days",
+                'ban_none': "🟢 No ban now",
+                'unknown_state': "State not found. Try: 'L Tamil Nadu' or 'L Kerala'",
+                'legal_unavailable': "No fishing rules on file for {state}. Ask the local fisheries office."
             },
             'hi': {
                 'welcome': "फिशरमेट SMS\nW-मौसम L-कानून S-सुरक्षा E-आपातकाल H-मदद\nमौसम के लिए शहर का नाम भेजें।",
-                'help': "कमांड:\nW-मौसम L-कानून S-सुरक्षा E-आपातकाल\nEN-English HI-Hindi TA-Tamil\nमौसम के लिए स्थान भेजें।",
+                'help': "कमांड:\nW-मौसम L-कानून S-सुरक्षा E-आपातकाल A-अलर्ट\nEN-English HI-Hindi TA-Tamil\nमौसम के लिए स्थान भेजें।",
                 'menu': "मेनू:\nW-मौसम L-कानून S-सुरक्षा E-आपातकाल H-मदद\nया अपना प्रश्न भेजें।",
                 'weather_help': "मौसम: 'W Chennai' या 'W Mumbai' भेजें\nया स्थानीय मौसम के लिए स्थान साझा करें।",
                 'legal_help': "कानून: 'L Tamil Nadu' या 'L Kerala' भेजें\nअपने राज्य के मछली पकड़ने के नियमों के लिए।",
                 'safety_help': "सुरक्षा: 'S checklist' या 'S emergency' भेजें\nसुरक्षा दिशा-निर्देशों के लिए।",
-                'emergency': "आपातकाल: कोस्ट गार्ड 1554\nआपातकाल: 112\nसमुद्री पुलिस: 100\nVHF Ch 16: MAYDAY"
+                'emergency': "आपातकाल: कोस्ट गार्ड 1554\nआपातकाल: 112\nसमुद्री पुलिस: 100\nVHF Ch 16: MAYDAY",
+                'alerts_help': "अलर्ट: मौसम चेतावनी के लिए अपने बंदरगाह के साथ 'A Chennai' भेजें।\nबंद करने के लिए 'A STOP'।",
+                'subscribed': "{port} के लिए मौसम अलर्ट चालू।\nबंद करने के लिए 'A STOP'।",
+                'unsubscribed': "मौसम अलर्ट बंद।",
+                'unknown_port': "बंदरगाह नहीं मिला। आज़माएं: {ports}",
+                'weather': "{city} मौसम:\n{temperature}°C, {description}\n💨 {wind_speed} km/h\n💧 {humidity}% नमी\n{verdict}",
+                'verdict_safe': "✅ मछली पकड़ने के लिए अच्छा",
+                'verdict_caution': "⚠️ सावधानी से मछली पकड़ें",
+                'verdict_dangerous': "❌ मछली पकड़ने न जाएं",
+                'weather_pending': "{city} का मौसम लाया जा रहा है। एक मिनट में फिर 'W {city}' भेजें।",
+                'weather_unavailable': "{city} का मौसम अभी उपलब्ध नहीं। कोस्ट गार्ड: 1554",
+                'unknown_place': "स्थान नहीं मिला। आज़माएं: 'W Chennai' या 'W Kochi'",
+                'legal': "{state} मछली पकड़ने के नियम:\n🚫 प्रतिबंध: {period}\n{ban_status}\n📋 लाइसेंस: {license}\n💰 जुर्माना: {penalty}\n📞 हेल्पलाइन: {helpline}",
+                'ban_active': "🔴 प्रतिबंध जारी, {days} दिन शेष",
+                'ban_upcoming': "🟡 प्रतिबंध {days} दिन में शुरू",
+                'ban_none': "🟢 अभी कोई प्रतिबंध नहीं",
+                'unknown_state': "राज्य नहीं मिला। आज़माएं: 'L Tamil Nadu' या 'L Kerala'",
+                'legal_unavailable': "{state} के मछली पकड़ने के नियम उपलब्ध नहीं। स्थानीय मत्स्य कार्यालय से पूछें।"
             },
             'ta': {
                 'welcome': "ஃபிஷர்மேட் SMS\nW-வானிலை L-சட்டம் S-பாதுகாப்பு E-அவசரம் H-உதவி\nவானிலைக்கு நகரத்தின் பெயரை அனுப்பவும்।",
-                'help': "கட்டளைகள்:\nW-வானிலை L-சட்டம் S-பாதுகாப்பு E-அவசரம்\nEN-English HI-Hindi TA-Tamil\nவானிலைக்கு இடத்தை அனுப்பவும்।",
+                'help': "கட்டளைகள்:\nW-வானிலை L-சட்டம் S-பாதுகாப்பு E-அவசரம் A-எச்சரிக்கை\nEN-English HI-Hindi TA-Tamil\nவானிலைக்கு இடத்தை அனுப்பவும்।",
                 'menu': "மெனு:\nW-வானிலை L-சட்டம் S-பாதுகாப்பு E-அவசரம் H-உதவி\nஅல்லது உங்கள் கேள்வியை அனுப்பவும்।",
                 'weather_help': "வானிலை: 'W Chennai' அல்லது 'W Mumbai' அனுப்பவும்\nஅல்லது உள்ளூர் வானிலைக்கு இடத்தை பகிர்ந்து கொள்ளுங்கள்.",
                 'legal_help': "சட்டம்: 'L Tamil Nadu' அல்லது 'L Kerala' அனுப்பவும்\nஉங்கள் மாநிலத்தில் மீன்பிடி சட்டங்களுக்கு.",
                 'safety_help': "பாதுகாப்பு: 'S checklist' அல்லது 'S emergency' அனுப்பவும்\nபாதுகாப்பு வழிகாட்டுதல்களுக்கு.",
-                'emergency': "அவசரம்: கடலோர காவல்படை 1554\nஅவசரம்: 112\nகடல் காவல்துறை: 100\nVHF Ch 16: MAYDAY"
+                'emergency': "அவசரம்: கடலோர காவல்படை 1554\nஅவசரம்: 112\nகடல் காவல்துறை: 100\nVHF Ch 16: MAYDAY",
+                'alerts_help': "எச்சரிக்கை: வானிலை எச்சரிக்கைக்கு உங்கள் துறைமுகத்துடன் 'A Chennai' அனுப்பவும்.\nநிறுத்த 'A STOP'.",
+                'subscribed': "{port} வானிலை எச்சரிக்கை இயக்கப்பட்டது.\nநிறுத்த 'A STOP'.",
+                'unsubscribed': "வானிலை எச்சரிக்கை நிறுத்தப்பட்டது.",
+                'unknown_port': "துறைமுகம் கிடைக்கவில்லை. முயற்சிக்கவும்: {ports}",
+                'weather': "{city} வானிலை:\n{temperature}°C, {description}\n💨 {wind_speed} km/h\n💧 {humidity}% ஈரப்பதம்\n{verdict}",
+                'verdict_safe': "✅ மீன்பிடிக்க நல்லது",
+                'verdict_caution': "⚠️ கவனத்துடன் மீன்பிடிக்கவும்",
+                'verdict_dangerous': "❌ மீன்பிடிக்க செல்ல வேண்டாம்",
+                'weather_pending': "{city} வானிலை பெறப்படுகிறது. ஒரு நிமிடத்தில் மீண்டும் 'W {city}' அனுப்பவும்.",
+                'weather_unavailable': "{city} வானிலை இப்போது கிடைக்கவில்லை. கடலோர காவல்படை: 1554",
+                'unknown_place': "இடம் கிடைக்கவில்லை. முயற்சிக்கவும்: 'W Chennai' அல்லது 'W Kochi'",
+                'legal': "{state} மீன்பிடி விதிகள்:\n🚫 தடை: {period}\n{ban_status}\n📋 உரிமம்: {license}\n💰 அபராதம்: {penalty}\n📞 உதவி எண்: {helpline}",
+                'ban_active': "🔴 தடை அமலில், {days} நாட்கள் மீதம்",
+                'ban_upcoming': "🟡 தடை {days} நாட்களில் தொடங்கும்",
+                'ban_none': "🟢 இப்போது தடை இல்லை",
+                'unknown_state': "மாநிலம் கிடைக்கவில்லை. முயற்சிக்கவும்: 'L Tamil Nadu' அல்லது 'L Kerala'",
+                'legal_unavailable': "{state} மீன்பிடி விதிகள் இல்லை. உள்ளூர் மீன்வளத் துறையை அணுகவும்."
+            }
+        }
+    
+        # Weather alert templates per language and safety level
+        self.alert_templates = {
+            'en': {
+                'dangerous': "🚨 WEATHER ALERT\n{description}\n💨 Wind: {wind_speed} km/h\n❌ DO NOT FISH\nCoast Guard: 1554",
+                'caution': "⚠️ WEATHER CAUTION\n{description}\n💨 Wind: {wind_speed} km/h\n⚠️ STAY ALERT\nCoast Guard: 1554",
+                'safe': "🌤️ WEATHER UPDATE\n{description}\n💨 Wind: {wind_speed} km/h\n✅ Safe conditions"
+            },
+            'hi': {
+                'dangerous': "🚨 मौसम चेतावनी\n{description}\n💨 हवा: {wind_speed} km/h\n❌ मछली पकड़ने न जाएं\nकोस्ट गार्ड: 1554",
+                'caution': "⚠️ मौसम सावधानी\n{description}\n💨 हवा: {wind_speed} km/h\n⚠️ सतर्क रहें\nकोस्ट गार्ड: 1554",
+                'safe': "🌤️ मौसम अपडेट\n{description}\n💨 हवा: {wind_speed} km/h\n✅ सुरक्षित स्थिति"
+            },
+            'ta': {
+                'dangerous': "🚨 வானிலை எச்சரிக்கை\n{description}\n💨 காற்று: {wind_speed} km/h\n❌ மீன்பிடிக்க செல்ல வேண்டாம்\nகடலோர காவல்படை: 1554",
+                'caution': "⚠️ வானிலை முன்னெச்சரிக்கை\n{description}\n💨 காற்று: {wind_speed} km/h\n⚠️ கவனமாக இருங்கள்\nகடலோர காவல்படை: 1554",
+                'safe': "🌤️ வானிலை நிலவரம்\n{description}\n💨 காற்று: {wind_speed} km/h\n✅ பாதுகாப்பான நிலை"
             }
         }
     
     def handle_message(self, request) -> Any:
         """Handle incoming SMS messages"""
+        self.resume_broadcasts()
         try:
             # Get message data
             from_number = request.form.get('From', '')
@@ -88,6 +189,9 @@ class SMSHandler:
             
             # Process message
             response_text = self.process_sms_message(message_body, user_session)
+            self.user_sessions.save(from_number, user_session)
+            self.usage.record(from_number, {'language': user_session['language']},
+                              new_user=user_session['message_count'] == 1)
             
             # Send response
             return self.send_sms_response(response_text)
@@ -97,9 +201,10 @@ class SMSHandler:
             return self.send_error_response()
     
     def get_user_session(self, phone_number: str) -> Dict:
-        """Get or create user session for SMS"""
-        if phone_number not in self.user_sessions:
-            self.user_sessions[phone_number] = {
+        """Get or create user session for SMS; the caller saves it back"""
+        user_session = self.user_sessions.get(phone_number)
+        if user_session is None:
+            user_session = {
                 'phone': phone_number,
                 'language': 'en',
                 'last_activity': datetime.now(),
@@ -107,53 +212,41 @@ class SMSHandler:
             }
         
         # Update last activity and message count
-        self.user_sessions[phone_number]['last_activity'] = datetime.now()
-        self.user_sessions[phone_number]['message_count'] += 1
+        user_session['last_activity'] = datetime.now()
+        user_session['message_count'] += 1
         
-        return self.user_sessions[phone_number]
+        return user_session
     
     def process_sms_message(self, message: str, user_session: Dict) -> str:
         """Process SMS message and generate response"""
         try:
-            message_upper = message.upper().strip()
-            language = user_session['language']
+            command = self.parser.parse(message, 'sms')
             
             # Handle language change
-            if message_upper in ['EN', 'ENGLISH']:
-                user_session['language'] = 'en'
-                return self.quick_responses['en']['welcome']
-            elif message_upper in ['HI', 'HINDI']:
-                user_session['language'] = 'hi'
-                return self.quick_responses['hi']['welcome']
-            elif message_upper in ['TA', 'TAMIL']:
-                user_session['language'] = 'ta'
-                return self.quick_responses['ta']['welcome']
-            
-            # Handle command shortcuts
-            if message_upper in self.sms_commands:
-                command = self.sms_commands[message_upper]
-                return self.handle_sms_command(command, user_session)
-            
-            # Handle commands with parameters
-            if len(message_upper) > 2 and message_upper[1] == ' ':
-                command = message_upper[0]
-                param = message[2:].strip()
-                
-                if command == 'W':
-                    return self.get_weather_sms(param, user_session)
-                elif command == 'L':
-                    return self.get_legal_sms(param, user_session)
-                elif command == 'S':
-                    return self.get_safety_sms(param, user_session)
-            
-            # Handle full text queries
-            return self.handle_text_query(message, user_session)
+            if command.intent == 'language':
+                user_session['language'] = command.arg
+                self.subscriptions.set_language('sms', user_session['phone'], command.arg)
+                return self.quick_responses[command.arg]['welcome']
+            
+            # Handle commands with parameters ('W Chennai')
+            if command.param:
+                if command.intent == 'weather':
+                    return self.get_weather_sms(command.param, user_session)
+                elif command.intent == 'legal':
+                    return self.get_legal_sms(command.param, user_session)
+                elif command.intent == 'safety':
+                    return self.get_safety_sms(command.param, user_session)
+                elif command.intent == 'alerts':
+                    return self.handle_alerts_sms(command.param, user_session)
+            
+            # Handle command shortcuts and keywords in free text
+            return self.handle_sms_command(command.intent, user_session)
             
         except Exception as e:
             logger.error(f"SMS processing error: {str(e)}")
             return self.get_error_message(user_session['language'])
     
-    def handle_sms_command(self, command: str, user_session: Dict) -> str:
+    def handle_sms_command(self, command: Optional[str], user_session: Dict) -> str:
         """Handle SMS commands"""
         language = user_session['language']
         responses = self.quick_responses[language]
@@ -170,45 +263,124 @@ class SMSHandler:
             return responses['safety_help']
         elif command == 'emergency':
             return responses['emergency']
+        elif command == 'alerts':
+            return responses['alerts_help']
+        elif command == 'greeting':
+            return responses['welcome']
         else:
             return responses['help']
     
+    def handle_alerts_sms(self, param: str, user_session: Dict) -> str:
+        """Subscribe to weather alerts for a home port ('A Chennai'), or stop them ('A STOP')"""
+        language = user_session['language']
+        responses = self.quick_responses[language]
+        
+        if param.upper() in ('STOP', 'OFF'):
+            self.subscriptions.unsubscribe('sms', user_session['phone'])
+            return responses['unsubscribed']
+        
+        subscription = self.subscriptions.subscribe_port('sms', user_session['phone'], param, language)
+        if subscription is None:
+            return responses['unknown_port'].format(ports=', '.join(p.title for p in self.gazetteer.harbours()[:6]))
+        return responses['subscribed'].format(port=subscription.port.title())
+    
     def get_weather_sms(self, location: str, user_session: Dict) -> str:
-        """Get weather information for SMS"""
+        """Current weather for a place ('W Chennai'), from the shared weather cache"""
         try:
             language = user_session['language']
-            
-            # This would integrate with the weather service
-            # For now, return a mock response
-            if language == 'hi':
-                return f"{location} मौसम:\n25°C, हल्की हवा\n💨 15 km/h\n💧 60% नमी\n✅ मछली पकड़ने के लिए अच्छा\n\nविस्तार: W {location} detail"
-            elif language == 'ta':
-                return f"{location} வானிலை:\n25°C, லேசான காற்று\n💨 15 km/h\n💧 60% ஈரப்பதம்\n✅ மீன்பிடிக்க நல்லது\n\nविவரம்: W {location} detail"
-            else:
-                return f"{location} Weather:\n25°C, Light wind\n💨 15 km/h\n💧 60% humidity\n✅ Good for fishing\n\nDetails: W {location} detail"
+            responses = self.quick_responses[language]
+            
+            place = self.gazetteer.find(location)
+            if place is None:
+                return responses['unknown_place']
+            
+            # Cached readings return at once; an upstream fetch is cut off at the
+            # reply budget but carries on, so a retry a minute later is a cache hit
+            lookup = self._lookups.submit(self.weather_service.get_current_weather, place.lat, place.lon)
+            try:
+                weather = lookup.result(timeout=self.reply_budget)
+            except FutureTimeoutError:
+                logger.warning(f"Weather for {place.name} not ready within {self.reply_budget}s")
+                return responses['weather_pending'].format(city=place.title)
+            
+            level = weather.get('safety_assessment', {}).get('level')
+            if level not in ('safe', 'caution', 'dangerous'):
+                # Fallback data; not cached
+                return responses['weather_unavailable'].format(city=place.title)
+            
+            entry = self.reply_cache.get(
+                ('weather', place.name, language),
+                weather['timestamp'].isoformat(),
+                lambda: {'text': self.format_weather_sms(place.title, weather, language)}
+            )
+            return entry.body.decode('utf-8')
                 
         except Exception as e:
             logger.error(f"Weather SMS error: {str(e)}")
             return self.get_error_message(user_session['language'])
     
+    def format_weather_sms(self, city: str, weather: Dict, language: str) -> str:
+        """Format a weather reading for SMS"""
+        responses = self.quick_responses[language]
+        current = weather['current']
+        return responses['weather'].format(
+            city=city,
+            temperature=round(current['temperature']),
+            description=current['description'].capitalize(),
+            wind_speed=round(current['wind_speed']),
+            humidity=current['humidity'],
+            verdict=responses[f"verdict_{weather['safety_assessment']['level']}"]
+        )
+    
     def get_legal_sms(self, state: str, user_session: Dict) -> str:
-        """Get legal information for SMS"""
+        """Fishing rules for a state, or the state a place is in ('L Kerala', 'L Kochi')"""
         try:
             language = user_session['language']
             
-            # This would integrate with the legal service
-            # For now, return a mock response
-            if language == 'hi':
-                return f"{state} मछली पकड़ने के नियम:\n🚫 प्रतिबंध: अप्रैल 15 - जून 14\n📋 लाइसेंस: आवश्यक\n💰 जुर्माना: ₹5000-25000\n📞 हेल्पलाइन: 1800-xxx-xxxx"
-            elif language == 'ta':
-                return f"{state} மீன்பிடி விதிகள்:\n🚫 தடை: ஏப்ரல் 15 - ஜून் 14\n📋 உரிமம்: தேவை\n💰 அபராधம்: ₹5000-25000\n📞 உதவி எண்: 1800-xxx-xxxx"
-            else:
-                return f"{state} Fishing Rules:\n🚫 Ban: April 15 - June 14\n📋 License: Required\n💰 Fine: ₹5000-25000\n📞 Helpline: 1800-xxx-xxxx"
+            state_name = self.gazetteer.find_state(state)
+            if state_name is None:
+                return self.quick_responses[language]['unknown_state']
+            
+            # The ban countdown changes daily, so the day is part of the version
+            self.legal_info_service.reload_if_changed()
+            entry = self.reply_cache.get(
+                ('legal', state_name, language),
+                f"{self.legal_info_service.data_version}:{date.today().isoformat()}",
+                lambda: self.build_legal_sms(state_name, language)
+            )
+            if entry is None:
+                return self.quick_responses[language]['legal_unavailable'].format(state=state_name)
+            return entry.body.decode('utf-8')
                 
         except Exception as e:
             logger.error(f"Legal SMS error: {str(e)}")
             return self.get_error_message(user_session['language'])
     
+    def build_legal_sms(self, state: str, language: str) -> Dict:
+        """Fishing rules for SMS, or the legal service's error payload"""
+        legal_info = self.legal_info_service.get_legal_info(state, language)
+        if 'error' in legal_info:
+            return legal_info
+        
+        info = legal_info['legal_info']
+        if 'seasonal_ban' not in info:
+            # Served the general section: no state rules on file
+            return {'error': 'State information not available'}
+        
+        responses = self.quick_responses[language]
+        ban = info.get('seasonal_ban', {})
+        status = self.legal_info_service.get_ban_status(ban.get('period', ''))
+        
+        text = responses['legal'].format(
+            state=state,
+            period=ban.get('period', '-'),
+            ban_status=responses[f"ban_{status[0]}"].format(days=status[1]) if status else '',
+            license=info.get('licensing', {}).get('fishing_license', '-'),
+            penalty=ban.get('penalty', '-'),
+            helpline=info.get('contact_info', {}).get('helpline', '-')
+        )
+        return {'text': text.replace('\n\n', '\n')}
+    
     def get_safety_sms(self, topic: str, user_session: Dict) -> str:
         """Get safety information for SMS"""
         try:
@@ -233,30 +405,6 @@ class SMSHandler:
             logger.error(f"Safety SMS error: {str(e)}")
             return self.get_error_message(user_session['language'])
     
-    def handle_text_query(self, message: str, user_session: Dict) -> str:
-        """Handle free text queries"""
-        try:
-            language = user_session['language']
-            message_lower = message.lower()
-            
-            # Basic keyword matching
-            if any(word in message_lower for word in ['weather', 'mausam', 'vanilai']):
-                return self.quick_responses[language]['weather_help']
-            elif any(word in message_lower for word in ['law', 'legal', 'ban', 'kanoon', 'sattam']):
-                return self.quick_responses[language]['legal_help']
-            elif any(word in message_lower for word in ['safety', 'suraksha', 'padhukaapu']):
-                return self.quick_responses[language]['safety_help']
-            elif any(word in message_lower for word in ['emergency', 'help', 'madad', 'udavi']):
-                return self.quick_responses[language]['emergency']
-            elif any(word in message_lower for word in ['hello', 'hi', 'start', 'namaste']):
-                return self.quick_responses[language]['welcome']
-            else:
-                return self.quick_responses[language]['help']
-                
-        except Exception as e:
-            logger.error(f"Text query error: {str(e)}")
-            return self.get_error_message(user_session['language'])
-    
     def get_error_message(self, language: str) -> str:
         """Get error message for SMS"""
         if language == 'hi':
@@ -271,17 +419,9 @@ class SMSHandler:
         try:
             response = MessagingResponse()
             
-            # Split long messages into multiple SMS
-            max_length = 160
-            if len(message) > max_length:
-                # Split message into chunks
-                chunks = self.split_message(message, max_length)
-                for i, chunk in enumerate(chunks):
-                    if i < len(chunks) - 1:
-                        chunk += f" ({i+1}/{len(chunks)})"
-                    response.message(chunk)
-            else:
-                response.message(message)
+            plan = self.plan_message(message)
+            for part in plan.parts:
+                response.message(part)
             
             return str(response)
             
@@ -289,31 +429,29 @@ class SMSHandler:
             logger.error(f"SMS response error: {str(e)}")
             return str(MessagingResponse())
     
-    def split_message(self, message: str, max_length: int) -> list:
-        """Split long message into SMS-sized chunks"""
-        chunks = []
-        words = message.split()
-        current_chunk = ""
-        
-        for word in words:
-            if len(current_chunk) + len(word) + 1 <= max_length:
-                current_chunk += word + " "
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = word + " "
-        
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-        
-        return chunks
-    
     def send_error_response(self) -> Any:
         """Send error response"""
         response = MessagingResponse()
         response.message("Error. Send H for help.")
         return str(response)
     
+    def plan_message(self, message: str) -> SmsPlan:
+        """Encoding, parts and billed segments an outbound message will use"""
+        plan = plan_sms(message)
+        if plan.total_segments > 1:
+            logger.info(f"SMS plan: {plan.encoding}, {len(plan.parts)} message(s), {plan.total_segments} segment(s)")
+        return plan
+    
+    def send_sms_part(self, to_number: str, body: str) -> str:
+        """Send one SMS part; raises on failure (TwilioRestException carries .status)"""
+        with bulkhead('twilio'):
+            message_obj = self.client.messages.create(
+                body=body,
+                from_=self.sms_number,
+                to=to_number
+            )
+        return message_obj.sid
+    
     def send_sms_message(self, to_number: str, message: str) -> bool:
         """Send SMS message programmatically"""
         try:
@@ -321,27 +459,9 @@ class SMSHandler:
                 logger.error("Twilio client not initialized")
                 return False
             
-            # Split long messages
-            max_length = 160
-            if len(message) > max_length:
-                chunks = self.split_message(message, max_length)
-                for i, chunk in enumerate(chunks):
-                    if len(chunks) > 1:
-                        chunk += f" ({i+1}/{len(chunks)})"
-                    
-                    message_obj = self.client.messages.create(
-                        body=chunk,
-                        from_=self.sms_number,
-                        to=to_number
-                    )
-                    logger.info(f"SMS chunk {i+1} sent: {message_obj.sid}")
-            else:
-                message_obj = self.client.messages.create(
-                    body=message,
-                    from_=self.sms_number,
-                    to=to_number
-                )
-                logger.info(f"SMS sent: {message_obj.sid}")
+            for i, part in enumerate(self.plan_message(message).parts):
+                sid = self.send_sms_part(to_number, part)
+                logger.info(f"SMS part {i+1} sent: {sid}")
             
             return True
             
@@ -349,22 +469,42 @@ class SMSHandler:
             logger.error(f"SMS sending error: {str(e)}")
             return False
     
-    def broadcast_sms(self, numbers: list, message: str) -> Dict:
-        """Broadcast SMS to multiple numbers"""
+    def resume_broadcasts(self):
+        """Pick up broadcasts interrupted by a crash or restart; once per process"""
         try:
-            results = {
-                'success': [],
-                'failed': [],
-                'total': len(numbers)
-            }
+            if self.client and (self._broadcasts is not None or os.path.exists(self.broadcast_queue_path)):
+                self.broadcasts.resume_if_due()
+        except Exception as e:
+            logger.error(f"Broadcast resume error: {str(e)}")
+    
+    @property
+    def broadcasts(self) -> BroadcastEngine:
+        """Broadcast engine, built on first use"""
+        if self._broadcasts is None:
+            self._broadcasts = create_broadcast_engine(self.send_sms_part, self.account_sid or 'default')
+        return self._broadcasts
+    
+    def broadcast_sms(self, numbers: list, message: str, wait: bool = True) -> Dict:
+        """Broadcast SMS to multiple numbers
+        
+        The broadcast is queued persistently and sent by a rate-limited
+        worker pool. With wait=False this returns the job's progress
+        at once; poll get_broadcast_progress(job_id) for updates.
+        """
+        try:
+            if not self.client:
+                logger.error("Twilio client not initialized")
+                return {'success': [], 'failed': numbers, 'total': len(numbers)}
             
-            for number in numbers:
-                if self.send_sms_message(number, message):
-                    results['success'].append(number)
-                else:
-                    results['failed'].append(number)
+            plan = self.plan_message(message)
+            logger.info(f"SMS broadcast: {len(numbers)} recipients x {plan.total_segments} segment(s) "
+                        f"({plan.encoding})")
+            job_id = self.broadcasts.submit(numbers, plan.parts)
+            if not wait:
+                return self.broadcasts.progress(job_id)
             
-            return results
+            self.broadcasts.wait(job_id)
+            return self.broadcasts.results(job_id)
             
         except Exception as e:
             logger.error(f"SMS broadcast error: {str(e)}")
@@ -375,13 +515,17 @@ class SMSHandler:
                 'error': str(e)
             }
     
-    def send_weather_alert(self, numbers: list, weather_data: Dict) -> Dict:
+    def get_broadcast_progress(self, job_id: str) -> Optional[Dict]:
+        """Live progress of a broadcast job"""
+        return self.broadcasts.progress(job_id)
+    
+    def send_weather_alert(self, numbers: list, weather_data: Dict, wait: bool = True, language: str = 'en') -> Dict:
         """Send weather alert SMS"""
         try:
             # Format weather alert message
-            alert_message = self.format_weather_alert(weather_data)
+            alert_message = self.format_weather_alert(weather_data, language)
             
-            return self.broadcast_sms(numbers, alert_message)
+            return self.broadcast_sms(numbers, alert_message, wait=wait)
             
         except Exception as e:
             logger.error(f"Weather alert SMS error: {str(e)}")
@@ -392,19 +536,18 @@ class SMSHandler:
                 'error': str(e)
             }
     
-    def format_weather_alert(self, weather_data: Dict) -> str:
+    def format_weather_alert(self, weather_data: Dict, language: str = 'en') -> str:
         """Format weather alert for SMS"""
         try:
             alert_level = weather_data.get('safety_level', 'unknown')
-            wind_speed = weather_data.get('wind_speed', 0)
-            description = weather_data.get('description', 'Weather update')
-            
-            if alert_level == 'dangerous':
-                return f"🚨 WEATHER ALERT\n{description}\n💨 Wind: {wind_speed} km/h\n❌ DO NOT FISH\nCoast Guard: 1554"
-            elif alert_level == 'caution':
-                return f"⚠️ WEATHER CAUTION\n{description}\n💨 Wind: {wind_speed} km/h\n⚠️ STAY ALERT\nCoast Guard: 1554"
-            else:
-                return f"🌤️ WEATHER UPDATE\n{description}\n💨 Wind: {wind_speed} km/h\n✅ Safe conditions"
+            if alert_level not in ('dangerous', 'caution'):
+                alert_level = 'safe'
+            template = self.alert_templates.get(language, self.alert_templates['en'])[alert_level]
+            
+            return template.format(
+                description=weather_data.get('description', 'Weather update'),
+                wind_speed=weather_data.get('wind_speed', 0)
+            )
                 
         except Exception as e:
             logger.error(f"Weather alert formatting error: {str(e)}")
@@ -413,31 +556,22 @@ class SMSHandler:
     def get_sms_stats(self) -> Dict:
         """Get SMS usage statistics"""
         try:
+            usage = self.usage.get_stats()
             stats = {
                 'total_users': len(self.user_sessions),
-                'active_users': 0,
-                'languages': {},
-                'total_messages': 0,
+                # Distinct senders in the last 24 hours (HyperLogLog estimate)
+                'active_users': usage['active_users'],
+                'languages': usage['users'].get('language', {}),
+                # Messages handled by this worker since it started, and the
+                # distinct senders among them (HyperLogLog estimate)
+                'total_messages': usage['messages'],
                 'average_messages_per_user': 0
             }
             
-            total_messages = 0
-            
-            for session in self.user_sessions.values():
-                # Count active users (activity within last 24 hours)
-                if (datetime.now() - session['last_activity']).total_seconds() < 86400:
-                    stats['active_users'] += 1
-                
-                # Language distribution
-                lang = session['language']
-                stats['languages'][lang] = stats['languages'].get(lang, 0) + 1
-                
-                # Message count
-                total_messages += session['message_count']
-            
-            stats['total_messages'] = total_messages
-            if len(self.user_sessions) > 0:
-                stats['average_messages_per_user'] = total_messages / len(self.user_sessions)
+            if usage['senders'] > 0:
+                stats['average_messages_per_user'] = round(usage['messages'] / usage['senders'], 2)
+            stats['session_store'] = self.user_sessions.get_stats()
+            stats['reply_cache'] = self.reply_cache.get_stats()
             
             return stats
             
@@ -449,23 +583,17 @@ class SMSHandler:
                 'active_users': 0
             }
     
-    def cleanup_old_sessions(self, max_age_hours: int = 168):  # 1 week
-        """Clean up old SMS sessions"""
+    def cleanup_old_sessions(self) -> int:
+        """Expire idle SMS sessions now; this also runs on the session store's background tick"""
         try:
-            current_time = datetime.now()
-            sessions_to_remove = []
+            expired = self.user_sessions.expire()
+            if expired:
+                logger.info(f"Cleaned up {expired} old SMS sessions")
+            return expired
             
-            for phone, session in self.user_sessions.items():
-                age_hours = (current_time - session['last_activity']).total_seconds() / 3600
-                if age_hours > max_age_hours:
-                    sessions_to_remove.append(phone)
-            
-            for phone in sessions_to_remove:
-                del self.user_sessions[phone]
-                logger.info(f"Cleaned up old SMS session for {phone}")
-                
         except Exception as e:
             logger.error(f"SMS session cleanup error: {str(e)}")
+            return 0
     
     def get_command_help(self, language: str = 'en') -> str:
         """Get command help for SMS"""
@@ -0,0 +1,177 @@
+"""
+Subscriptions Module for FisherMate.AI
+Weather alert subscriptions for SMS/WhatsApp users, indexed by geohash tile
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from modules import geohash
+from modules.gazetteer import Place, get_gazetteer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUBSCRIPTIONS_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'subscriptions.db')
+
+# Geohash precision of an alert tile: 4 is ~20x39 km, 5 is ~5x5 km
+TILE_PRECISION = int(os.getenv('ALERT_TILE_PRECISION', 4))
+
+def find_port(name: str) -> Optional[Place]:
+    """Harbour for user input, through the shared gazetteer; None if not a harbour"""
+    return get_gazetteer().find_harbour(name)
+
+
+def tile_of(lat: float, lon: float) -> str:
+    """Alert tile containing a point"""
+    return geohash.encode(lat, lon, TILE_PRECISION)
+
+
+class Subscription:
+    """One user's alert subscription"""
+
+    __slots__ = ('channel', 'address', 'language', 'lat', 'lon', 'port')
+
+    def __init__(self, channel: str, address: str, language: str, lat: float, lon: float, port: Optional[str]):
+        self.channel = channel
+        self.address = address
+        self.language = language
+        self.lat = lat
+        self.lon = lon
+        self.port = port
+
+    def as_dict(self) -> Dict:
+        return {'channel': self.channel, 'address': self.address, 'language': self.language,
+                'lat': self.lat, 'lon': self.lon, 'port': self.port, 'tile': tile_of(self.lat, self.lon)}
+
+
+# Grouped recipients: (channel, language) -> addresses
+Recipients = Dict[Tuple[str, str], List[str]]
+
+
+class SubscriptionRegistry:
+    """Subscriptions in a WAL-mode SQLite file, indexed by full-precision geohash
+
+    Every tile is a geohash prefix, so the subscribers of a tile are one
+    range scan of the index: O(log n + matches), whatever the tile size.
+    """
+
+    _COLUMNS = "channel, address, language, lat, lon, port"
+
+    def __init__(self, path: str = DEFAULT_SUBSCRIPTIONS_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(
+            "CREATE TABLE IF NOT EXISTS subscriptions ("
+            " channel TEXT NOT NULL, address TEXT NOT NULL, language TEXT NOT NULL,"
+            " lat REAL NOT NULL, lon REAL NOT NULL, geohash TEXT NOT NULL, port TEXT,"
+            " updated REAL NOT NULL, PRIMARY KEY (channel, address)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS subscriptions_geohash ON subscriptions (geohash);"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def subscribe(self, channel: str, address: str, lat: float, lon: float, language: str = 'en',
+                  port: Optional[str] = None) -> Subscription:
+        """Subscribe, or move an existing subscription to new coordinates"""
+        self._conn().execute(
+            "INSERT OR REPLACE INTO subscriptions (channel, address, language, lat, lon, geohash, port, updated)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (channel, address, language, lat, lon, geohash.encode(lat, lon), port, time.time())
+        )
+        return Subscription(channel, address, language, lat, lon, port)
+
+    def subscribe_port(self, channel: str, address: str, port: str, language: str = 'en') -> Optional[Subscription]:
+        place = find_port(port)
+        if place is None:
+            return None
+        return self.subscribe(channel, address, place.lat, place.lon, language, place.name)
+
+    def update_location(self, channel: str, address: str, lat: float, lon: float) -> bool:
+        """Move a subscription to the user's last-known position; False if not subscribed"""
+        return self._conn().execute(
+            "UPDATE subscriptions SET lat = ?, lon = ?, geohash = ?, port = NULL, updated = ?"
+            " WHERE channel = ? AND address = ?",
+            (lat, lon, geohash.encode(lat, lon), time.time(), channel, address)
+        ).rowcount == 1
+
+    def set_language(self, channel: str, address: str, language: str):
+        self._conn().execute(
+            "UPDATE subscriptions SET language = ? WHERE channel = ? AND address = ?", (language, channel, address)
+        )
+
+    def unsubscribe(self, channel: str, address: str) -> bool:
+        return self._conn().execute(
+            "DELETE FROM subscriptions WHERE channel = ? AND address = ?", (channel, address)
+        ).rowcount == 1
+
+    def get(self, channel: str, address: str) -> Optional[Subscription]:
+        row = self._conn().execute(
+            f"SELECT {self._COLUMNS} FROM subscriptions WHERE channel = ? AND address = ?", (channel, address)
+        ).fetchone()
+        return Subscription(*row) if row else None
+
+    def in_tiles(self, tiles: Iterable[str]) -> List[Subscription]:
+        """Subscriptions inside any of the tiles (geohash prefixes)"""
+        conn = self._conn()
+        found = []
+        for tile in sorted(set(tiles)):
+            # '~' sorts after every geohash character, closing the prefix range
+            found.extend(Subscription(*row) for row in conn.execute(
+                f"SELECT {self._COLUMNS} FROM subscriptions WHERE geohash >= ? AND geohash < ?", (tile, tile + '~')
+            ))
+        return found
+
+    def tiles(self) -> List[str]:
+        """Distinct alert tiles that have at least one subscriber"""
+        return [row[0] for row in self._conn().execute(
+            "SELECT DISTINCT substr(geohash, 1, ?) FROM subscriptions ORDER BY 1", (TILE_PRECISION,)
+        )]
+
+    def near(self, lat: float, lon: float, radius_km: float) -> List[Subscription]:
+        """Subscriptions within radius_km of a point"""
+        return [s for s in self.in_tiles(geohash.cover(lat, lon, radius_km))
+                if geohash.distance_km(lat, lon, s.lat, s.lon) <= radius_km]
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM subscriptions").fetchone()[0]
+
+    def get_stats(self) -> Dict:
+        stats = {'subscriptions': len(self), 'tile_precision': TILE_PRECISION}
+        for channel, count in self._conn().execute("SELECT channel, COUNT(*) FROM subscriptions GROUP BY channel"):
+            stats[channel] = count
+        return stats
+
+
+def group_recipients(subscriptions: Iterable[Subscription]) -> Recipients:
+    """Group by (channel, language), so each alert is rendered once per group"""
+    groups = defaultdict(list)
+    for subscription in subscriptions:
+        groups[(subscription.channel, subscription.language)].append(subscription.address)
+    return dict(groups)
+
+
+_registry: Optional[SubscriptionRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_subscription_registry() -> SubscriptionRegistry:
+    """The process-wide registry, at SUBSCRIPTIONS_PATH"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = SubscriptionRegistry(os.getenv('SUBSCRIPTIONS_PATH', DEFAULT_SUBSCRIPTIONS_PATH))
+    return _registry
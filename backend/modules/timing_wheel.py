@@ -0,0 +1,73 @@
+"""
+Timing Wheel Module for FisherMate.AI
+Hashed timing wheel: O(1) schedule/cancel, expiry in O(expired)
+"""
+
+import math
+import threading
+from typing import Dict, Hashable, List, Set, Tuple
+
+
+class TimingWheel:
+    """Deadlines bucketed by tick; advancing visits only the elapsed buckets
+
+    Size the wheel to cover the longest timeout (`span` seconds). Then
+    every key found in a bucket when the wheel reaches it has expired,
+    so advance() does work proportional to what expires. A key whose
+    deadline is further out than the span stays in its bucket and is
+    checked again when the wheel comes round.
+    """
+
+    def __init__(self, tick: float, span: float, now: float):
+        self.tick = tick
+        self.slots = max(1, math.ceil(span / tick) + 1)
+        self._buckets: List[Set[Hashable]] = [set() for _ in range(self.slots)]
+        # key -> (deadline, bucket index)
+        self._deadlines: Dict[Hashable, Tuple[float, int]] = {}
+        self._current = self._tick_of(now)
+        self._lock = threading.Lock()
+
+    def _tick_of(self, timestamp: float) -> int:
+        return int(timestamp // self.tick)
+
+    def schedule(self, key: Hashable, deadline: float):
+        """Set or move the deadline for key"""
+        with self._lock:
+            previous = self._deadlines.get(key)
+            if previous is not None:
+                self._buckets[previous[1]].discard(key)
+            # Never file a key behind the cursor, or it would wait a full turn
+            index = max(self._tick_of(deadline), self._current) % self.slots
+            self._deadlines[key] = (deadline, index)
+            self._buckets[index].add(key)
+
+    def cancel(self, key: Hashable):
+        with self._lock:
+            previous = self._deadlines.pop(key, None)
+            if previous is not None:
+                self._buckets[previous[1]].discard(key)
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Move the cursor to now and return the keys whose deadline passed"""
+        expired = []
+        with self._lock:
+            target = self._tick_of(now)
+            # After a long pause one full turn visits every bucket
+            steps = min(target - self._current, self.slots - 1)
+            for offset in range(steps + 1):
+                bucket = self._buckets[(self._current + offset) % self.slots]
+                if not bucket:
+                    continue
+                due = [key for key in bucket if self._deadlines[key][0] <= now]
+                for key in due:
+                    bucket.discard(key)
+                    del self._deadlines[key]
+                expired.extend(due)
+            self._current = target
+        return expired
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadlines
@@ -0,0 +1,168 @@
+"""
+Usage Stats Module for FisherMate.AI
+Incrementally maintained SMS/WhatsApp usage counters and active-user sketches
+"""
+
+import hashlib
+import math
+import threading
+import time
+import logging
+from typing import Dict, List, Optional
+
+from modules.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+def hash_key(key: str) -> int:
+    """Stable 64-bit hash, identical in every worker"""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """Distinct-count sketch in 2**p bytes; standard error ~1.04/sqrt(2**p)"""
+
+    __slots__ = ('p', 'm', 'registers')
+
+    def __init__(self, p: int = 10):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add_hash(self, hashed: int):
+        index = hashed >> (64 - self.p)
+        rest = hashed & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add(self, key: str):
+        self.add_hash(hash_key(key))
+
+    def clear(self):
+        self.registers = bytearray(self.m)
+
+    def count(self) -> int:
+        return _estimate(self.registers, self.m)
+
+
+def _estimate(registers, m: int) -> int:
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / sum(2.0 ** -r for r in registers)
+    zeros = registers.count(0)
+    if estimate <= 2.5 * m and zeros:
+        # Small-range correction: linear counting
+        estimate = m * math.log(m / zeros)
+    return int(round(estimate))
+
+
+class SlidingWindowHLL:
+    """Distinct keys seen in the last `window` seconds, in `buckets` steps
+
+    Each bucket is a HyperLogLog for one slice of the window; counting
+    merges the live buckets, so the cost depends on the sketch size
+    and never on the number of users.
+    """
+
+    def __init__(self, window: float, buckets: int = 24, p: int = 10):
+        self.window = window
+        self.span = window / buckets
+        self._slices = [HyperLogLog(p) for _ in range(buckets)]
+        self._epochs = [-1] * buckets
+        self._lock = threading.Lock()
+
+    def add_hash(self, hashed: int, now: Optional[float] = None):
+        epoch = int((time.time() if now is None else now) // self.span)
+        slot = epoch % len(self._slices)
+        if self._epochs[slot] != epoch:
+            with self._lock:
+                if self._epochs[slot] != epoch:
+                    self._slices[slot].clear()
+                    self._epochs[slot] = epoch
+        self._slices[slot].add_hash(hashed)
+
+    def count(self, now: Optional[float] = None) -> int:
+        oldest = int((time.time() if now is None else now) // self.span) - len(self._slices) + 1
+        live = [s.registers for s, epoch in zip(self._slices, self._epochs) if epoch >= oldest]
+        if not live:
+            return 0
+        merged = bytes(map(max, *live)) if len(live) > 1 else live[0]
+        return _estimate(merged, self._slices[0].m)
+
+
+class ChannelUsage:
+    """Per-channel counters updated as messages arrive; reads are O(1) in users
+
+    - messages / new_users: plain counters
+    - senders: distinct senders since the worker started, the same scope
+      as messages, so messages / senders is a true average
+    - active_users: distinct senders in the last `active_window` seconds
+    - users[dimension][value]: distinct senders per language, menu, ...
+      over `retention_window`, which matches the session TTL so it
+      approximates the distribution over live sessions
+
+    Counts are per worker process.
+    """
+
+    def __init__(self, channel: str, active_window: float, retention_window: float):
+        self.channel = channel
+        self.active_window = active_window
+        self.retention_window = retention_window
+        self.messages = 0
+        self.new_users = 0
+        self.senders = HyperLogLog(12)
+        self.active_users = SlidingWindowHLL(active_window)
+        self.users: Dict[str, Dict[str, SlidingWindowHLL]] = {}
+        self._lock = threading.Lock()
+        _channels.append(self)
+
+    def record(self, key: str, labels: Optional[Dict[str, str]] = None, new_user: bool = False):
+        """Count one inbound message from key (a phone number)"""
+        hashed = hash_key(key)
+        now = time.time()
+        with self._lock:
+            self.messages += 1
+            self.new_users += int(new_user)
+        self.senders.add_hash(hashed)
+        self.active_users.add_hash(hashed, now)
+        for dimension, value in (labels or {}).items():
+            values = self.users.setdefault(dimension, {})
+            sketch = values.get(value)
+            if sketch is None:
+                with self._lock:
+                    sketch = values.setdefault(value, SlidingWindowHLL(self.retention_window, buckets=7))
+            sketch.add_hash(hashed, now)
+
+    def get_stats(self) -> Dict:
+        return {
+            'messages': self.messages,
+            'new_users': self.new_users,
+            'senders': self.senders.count(),
+            'active_users': self.active_users.count(),
+            'users': {
+                dimension: {value: sketch.count() for value, sketch in list(values.items())}
+                for dimension, values in list(self.users.items())
+            }
+        }
+
+
+_channels: List[ChannelUsage] = []
+
+
+def _collect_usage_metrics():
+    stats = [(usage.channel, usage.get_stats()) for usage in list(_channels)]
+    yield ('fishermate_channel_messages_total', 'counter', 'Inbound SMS/WhatsApp messages',
+           [({'channel': channel}, s['messages']) for channel, s in stats])
+    yield ('fishermate_channel_new_users_total', 'counter', 'First-time SMS/WhatsApp users',
+           [({'channel': channel}, s['new_users']) for channel, s in stats])
+    yield ('fishermate_channel_active_users', 'gauge', 'Distinct users in the active window (estimate)',
+           [({'channel': channel}, s['active_users']) for channel, s in stats])
+    yield ('fishermate_channel_users', 'gauge', 'Distinct users per dimension value (estimate)',
+           [({'channel': channel, 'dimension': dimension, 'value': value}, count)
+            for channel, s in stats
+            for dimension, values in s['users'].items()
+            for value, count in values.items()])
+
+
+registry.register_collector(_collect_usage_metrics)
@@ -14,6 +14,8 @@ from pydub import AudioSegment
 import tempfile
 import uuid
 from datetime import datetime
+from modules.bulkhead import bulkhead, BulkheadFullError
+from modules.audio_cache import AudioCache, content_key
 
 logger = logging.getLogger(__name__)
 
@@ -59,6 +61,10 @@ class VoiceHandler:
         self.audio_dir = os.path.join(os.path.dirname(__file__), '..', 'audio')
         os.makedirs(self.audio_dir, exist_ok=True)
         
+        # Synthesized speech is reused across requests: the same safety
+        # checklist or emergency message is only sent to gTTS once
+        self.audio_cache = AudioCache(self.audio_dir, max_bytes=int(os.getenv('TTS_CACHE_MAX_MB', 256)) * 1024 * 1024)
+        
         # Initialize VOSK for offline recognition (if available)
         self.vosk_models = {}
         self.init_vosk_models()
@@ -89,30 +95,44 @@ class VoiceHandler:
             logger.error(f"VOSK initialization error: {str(e)}")
     
     def text_to_speech(self, text: str, language: str = 'en', slow: bool = False) -> str:
-        """Convert text to speech and return audio file path"""
+        """Convert text to speech and return audio file path
+        
+        The file is named by a hash of what it says, so repeated texts get
+        the same URL and are synthesized once.
+        """
         try:
             # Map language code to gTTS supported language
             gtts_lang = self.gtts_languages.get(language, 'en')
             
-            # Create TTS object
-            tts = gTTS(text=text, lang=gtts_lang, slow=slow)
-            
-            # Generate unique filename
-            filename = f"tts_{uuid.uuid4().hex}_{language}.mp3"
-            filepath = os.path.join(self.audio_dir, filename)
-            
-            # Save audio file
-            tts.save(filepath)
-            
-            logger.info(f"Generated TTS audio: {filepath}")
+            filename = self.audio_cache.get(
+                f"tts_{content_key(text, gtts_lang, slow)}_{gtts_lang}.mp3",
+                lambda path: self.synthesize(text, gtts_lang, slow, path)
+            )
+            if filename is None:
+                # A concurrent synthesis of the same text just failed
+                return ""
             
             # Return relative path for web serving
             return f"/audio/{filename}"
             
+        except BulkheadFullError as e:
+            # Skip the English fallback as well - it would hit the same upstream
+            logger.warning(f"TTS shed: {str(e)}")
+            return ""
         except Exception as e:
             logger.error(f"TTS error: {str(e)}")
             return self.generate_fallback_audio(text, language)
     
+    def synthesize(self, text: str, gtts_lang: str, slow: bool, filepath: str):
+        """Write gTTS speech for text to filepath"""
+        tts = gTTS(text=text, lang=gtts_lang, slow=slow)
+        
+        # Save audio file (gTTS performs the network request here)
+        with bulkhead('gtts'):
+            tts.save(filepath)
+        
+        logger.info(f"Generated TTS audio: {filepath}")
+    
     def speech_to_text(self, audio_data: Any, language: str = 'en') -> str:
         """Convert speech to text"""
         try:
@@ -194,11 +214,15 @@ class VoiceHandler:
                 audio = self.recognizer.record(source)
             
             # Recognize speech
-            text = self.recognizer.recognize_google(audio, language=sr_language)
+            with bulkhead('google_stt'):
+                text = self.recognizer.recognize_google(audio, language=sr_language)
             
             logger.info(f"Recognized text: {text}")
             return text
             
+        except BulkheadFullError as e:
+            logger.warning(f"Speech recognition shed: {str(e)}")
+            return ""
         except sr.UnknownValueError:
             logger.warning("Could not understand audio")
             return ""
@@ -212,13 +236,9 @@ class VoiceHandler:
     def generate_fallback_audio(self, text: str, language: str) -> str:
         """Generate fallback audio when TTS fails"""
         try:
-            # Try with English if original language failed
+            # Try with English if original language failed; cached like any other speech
             if language != 'en':
-                tts = gTTS(text=text, lang='en')
-                filename = f"fallback_{uuid.uuid4().hex}.mp3"
-                filepath = os.path.join(self.audio_dir, filename)
-                tts.save(filepath)
-                return f"/audio/{filename}"
+                return self.text_to_speech(text, 'en')
             else:
                 # Return empty string if fallback also fails
                 return ""
@@ -445,6 +465,7 @@ class VoiceHandler:
                         stats['newest_file'] = file_time
             
             stats['languages_used'] = list(stats['languages_used'])
+            stats['cache'] = self.audio_cache.get_stats()
             
             return stats
             
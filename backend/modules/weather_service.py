@@ -6,9 +6,14 @@ Handles weather data from OpenWeatherMap and IMD APIs
 import requests
 import json
 import os
+import copy
+import time
+import threading
 from datetime import datetime, timedelta
 import logging
 from typing import Dict, List, Optional
+from modules.bulkhead import bulkhead, BulkheadFullError
+from modules.metrics import record_cache_lookup
 
 logger = logging.getLogger(__name__)
 
@@ -34,9 +39,73 @@ class WeatherService:
             'cyclone', 'storm', 'heavy rain', 'high tide', 'tsunami',
             'depression', 'low pressure', 'rough sea', 'very rough sea'
         ]
+        
+        # Short-lived cache of current conditions, keyed by ~1 km grid cell.
+        # Concurrent lookups for the same cell share a single upstream call.
+        self.cache_ttl = int(os.getenv('WEATHER_CACHE_TTL', 300))
+        self._current_cache = {}
+        self._inflight = {}
+        self._cache_lock = threading.Lock()
+        
+        # Called as fn(lat, lon, weather_info) after each fresh fetch
+        self._safety_listeners = []
+    
+    def clear_cache(self):
+        """Drop all cached current conditions"""
+        with self._cache_lock:
+            self._current_cache = {}
+    
+    def add_safety_listener(self, listener):
+        """Be told about every freshly fetched reading, e.g. to raise alerts"""
+        self._safety_listeners.append(listener)
     
     def get_current_weather(self, lat: float, lon: float) -> Dict:
         """Get current weather conditions for given coordinates"""
+        key = (round(lat, 2), round(lon, 2))
+        
+        while True:
+            with self._cache_lock:
+                cached = self._current_cache.get(key)
+                if cached and cached[0] > time.monotonic():
+                    record_cache_lookup('weather', True)
+                    return copy.copy(cached[1])
+                
+                inflight = self._inflight.get(key)
+                if inflight is None:
+                    inflight = self._inflight[key] = threading.Event()
+                    record_cache_lookup('weather', False)
+                    break
+            
+            # Another request is already fetching this cell
+            inflight.wait()
+            with self._cache_lock:
+                cached = self._current_cache.get(key)
+            if not cached:
+                # The other fetch failed; don't pile on, serve the fallback
+                return self.get_fallback_weather()
+        
+        try:
+            weather_info = self._fetch_current_weather(lat, lon)
+            if weather_info is not None:
+                with self._cache_lock:
+                    now = time.monotonic()
+                    if len(self._current_cache) >= 4096:
+                        self._current_cache = {k: v for k, v in self._current_cache.items() if v[0] > now}
+                    self._current_cache[key] = (now + self.cache_ttl, weather_info)
+                for listener in self._safety_listeners:
+                    try:
+                        listener(lat, lon, weather_info)
+                    except Exception as e:
+                        logger.error(f"Safety listener error: {str(e)}")
+                return copy.copy(weather_info)
+            return self.get_fallback_weather()
+        finally:
+            with self._cache_lock:
+                self._inflight.pop(key, None)
+            inflight.set()
+    
+    def _fetch_current_weather(self, lat: float, lon: float) -> Optional[Dict]:
+        """Fetch current conditions from OpenWeatherMap; None on failure"""
         try:
             # Get current weather
             current_url = f"{self.openweather_base_url}/weather"
@@ -47,7 +116,8 @@ class WeatherService:
                 'units': 'metric'
             }
             
-            response = requests.get(current_url, params=params, timeout=10)
+            with bulkhead('openweather'):
+                response = requests.get(current_url, params=params, timeout=10)
             response.raise_for_status()
             
             data = response.json()
@@ -78,12 +148,15 @@ class WeatherService:
             
             return weather_info
             
+        except BulkheadFullError as e:
+            logger.warning(f"OpenWeatherMap call shed: {str(e)}")
+            return None
         except requests.RequestException as e:
             logger.error(f"OpenWeatherMap API error: {str(e)}")
-            return self.get_fallback_weather()
+            return None
         except Exception as e:
             logger.error(f"Weather processing error: {str(e)}")
-            return self.get_fallback_weather()
+            return None
     
     def get_forecast(self, lat: float, lon: float, days: int = 7) -> Dict:
         """Get weather forecast for given coordinates"""
@@ -98,7 +171,8 @@ class WeatherService:
                 'cnt': days * 8  # 8 forecasts per day (3-hour intervals)
             }
             
-            response = requests.get(forecast_url, params=params, timeout=10)
+            with bulkhead('openweather'):
+                response = requests.get(forecast_url, params=params, timeout=10)
             response.raise_for_status()
             
             data = response.json()
@@ -145,6 +219,9 @@ class WeatherService:
             
             return forecast_info
             
+        except BulkheadFullError as e:
+            logger.warning(f"Forecast call shed: {str(e)}")
+            return self.get_fallback_forecast()
         except requests.RequestException as e:
             logger.error(f"Forecast API error: {str(e)}")
             return self.get_fallback_forecast()
@@ -0,0 +1,348 @@
+"""
+Webhook Queue Module for FisherMate.AI
+Acknowledges Twilio webhooks at once and processes them from a local queue, in order per sender
+"""
+
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from modules.broadcast import is_retryable
+from modules.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INBOX_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'inbox.db')
+
+# A claimed message is handed to another worker (or the next start) when
+# its lease runs out; the lease is renewed every third of this while the
+# message is processed, so only a dead or stuck process loses it
+LEASE_SECONDS = 60.0
+
+WEBHOOKS = registry.counter(
+    'fishermate_webhook_queue_total', 'Queued webhooks by channel and result', ['channel', 'result']
+)
+QUEUE_DELAY = registry.histogram(
+    'fishermate_webhook_queue_delay_seconds', 'Time from webhook ack to processing start', ['channel'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+
+
+class Inbox:
+    """Inbound webhooks in a WAL-mode SQLite file, keyed by Twilio MessageSid
+
+    The unique MessageSid drops Twilio's retries of a webhook, whichever
+    worker process they reach. Rows are kept for `retention` seconds
+    after processing so late retries are still recognised. A computed
+    reply is stored with its message, so sending it again never
+    computes it (and updates the session) a second time.
+    """
+
+    def __init__(self, path: str = DEFAULT_INBOX_PATH, retention: float = 86400):
+        self.path = path
+        self.retention = retention
+        self._local = threading.local()
+        self._conn().executescript(
+            "CREATE TABLE IF NOT EXISTS inbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, sid TEXT NOT NULL UNIQUE, channel TEXT NOT NULL,"
+            " sender TEXT NOT NULL, form TEXT NOT NULL, received REAL NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending', owner TEXT, lease_until REAL NOT NULL DEFAULT 0,"
+            " finished REAL, error TEXT, reply TEXT, attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt REAL NOT NULL DEFAULT 0);"
+            "CREATE INDEX IF NOT EXISTS inbox_due ON inbox (channel, status, id);"
+            "CREATE INDEX IF NOT EXISTS inbox_sender ON inbox (sender, status);"
+        )
+        columns = {row[1] for row in self._conn().execute("PRAGMA table_info(inbox)")}
+        for column, definition in (('reply', 'TEXT'), ('attempts', 'INTEGER NOT NULL DEFAULT 0'),
+                                   ('next_attempt', 'REAL NOT NULL DEFAULT 0')):
+            if column not in columns:
+                self._conn().execute(f"ALTER TABLE inbox ADD COLUMN {column} {definition}")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def add(self, channel: str, sid: str, sender: str, form: Dict[str, str]) -> bool:
+        """Queue a webhook; False if this MessageSid was seen before"""
+        return self._conn().execute(
+            "INSERT OR IGNORE INTO inbox (sid, channel, sender, form, received) VALUES (?, ?, ?, ?, ?)",
+            (sid, channel, sender, json.dumps(form), time.time())
+        ).rowcount == 1
+
+    def claim(self, channel: str, owner: str,
+              seconds: float = LEASE_SECONDS) -> Optional[Tuple[int, Dict, float, Optional[Dict], int]]:
+        """Lease the oldest due message whose sender has none in flight or waiting to be retried
+
+        Returns (id, form, received, reply, attempts); reply is None until
+        one has been stored with checkpoint().
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Messages of a worker that died mid-way go back to the queue
+            conn.execute(
+                "UPDATE inbox SET status = 'pending', owner = NULL"
+                " WHERE channel = ? AND status = 'processing' AND lease_until < ?", (channel, now)
+            )
+            # The oldest eligible message is also the oldest of its sender; a
+            # sender whose reply waits for a retry gets nothing else before it
+            row = conn.execute(
+                "SELECT id, form, received, reply, attempts FROM inbox"
+                " WHERE channel = ? AND status = 'pending' AND next_attempt <= ?"
+                " AND sender NOT IN (SELECT sender FROM inbox WHERE channel = ?"
+                " AND (status = 'processing' OR (status = 'pending' AND next_attempt > ?)))"
+                " ORDER BY id LIMIT 1", (channel, now, channel, now)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE inbox SET status = 'processing', owner = ?, lease_until = ? WHERE id = ?",
+                    (owner, now + seconds, row[0])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), row[2], json.loads(row[3]) if row[3] else None, row[4]
+
+    def renew(self, message_id: int, owner: str, seconds: float = LEASE_SECONDS) -> bool:
+        """Extend a lease; False if the message is no longer the owner's"""
+        return self._conn().execute(
+            "UPDATE inbox SET lease_until = ? WHERE id = ? AND owner = ? AND status = 'processing'",
+            (time.time() + seconds, message_id, owner)
+        ).rowcount == 1
+
+    def checkpoint(self, message_id: int, owner: str, reply: Dict) -> bool:
+        """Store the computed reply; False if the lease was lost"""
+        return self._conn().execute(
+            "UPDATE inbox SET reply = ? WHERE id = ? AND owner = ? AND status = 'processing'",
+            (json.dumps(reply), message_id, owner)
+        ).rowcount == 1
+
+    def retry(self, message_id: int, owner: str, delay: float, error: str) -> bool:
+        """Release the message to be sent again after `delay` seconds; False if the lease was lost"""
+        return self._conn().execute(
+            "UPDATE inbox SET status = 'pending', owner = NULL, attempts = attempts + 1, next_attempt = ?, error = ?"
+            " WHERE id = ? AND owner = ? AND status = 'processing'",
+            (time.time() + delay, error, message_id, owner)
+        ).rowcount == 1
+
+    def finish(self, message_id: int, owner: str, error: Optional[str] = None) -> bool:
+        """Record the outcome; False if the lease was lost and another worker has the message"""
+        return self._conn().execute(
+            "UPDATE inbox SET status = ?, owner = NULL, finished = ?, error = ?"
+            " WHERE id = ? AND owner = ? AND status = 'processing'",
+            ('failed' if error else 'done', time.time(), error, message_id, owner)
+        ).rowcount == 1
+
+    def prune(self) -> int:
+        """Forget processed messages older than the retention window"""
+        return self._conn().execute(
+            "DELETE FROM inbox WHERE finished IS NOT NULL AND finished < ?", (time.time() - self.retention,)
+        ).rowcount
+
+    def counts(self, channel: str) -> Dict[str, int]:
+        counts = {'pending': 0, 'processing': 0, 'done': 0, 'failed': 0}
+        for status, count in self._conn().execute(
+            "SELECT status, COUNT(*) FROM inbox WHERE channel = ? GROUP BY status", (channel,)
+        ):
+            counts[status] = count
+        return counts
+
+    def oldest_pending(self, channel: str) -> Optional[float]:
+        return self._conn().execute(
+            "SELECT MIN(received) FROM inbox WHERE channel = ? AND status = 'pending'", (channel,)
+        ).fetchone()[0]
+
+
+class WebhookQueue:
+    """Worker threads that answer one channel's inbox: `prepare(form)`, then `send(form, reply)`
+
+    The webhook is acknowledged as soon as submit() has queued it. Each
+    worker claims the oldest message whose sender has nothing in flight,
+    so one sender's messages are handled strictly in order while
+    different senders proceed in parallel. Workers in other processes
+    share the inbox. A heartbeat thread renews the leases of messages
+    in progress, however slow; a message whose worker died is processed
+    again once its lease expires (at-least-once).
+
+    prepare() computes the reply and has side effects (the sender's
+    session), so it runs once: its result is stored before send() is
+    called. A send that fails with a transient error (see is_retryable)
+    is retried with exponential backoff, reusing the stored reply, and
+    holds back the sender's later messages meanwhile. Only a permanent
+    error, an error in prepare(), or `max_attempts` failed sends mark a
+    message failed.
+
+    Threads start on first submit() or start(), never in the constructor,
+    which may run in a preloading gunicorn master.
+    """
+
+    def __init__(self, prepare: Callable[[Dict[str, str]], Dict], send: Callable[[Dict[str, str], Dict], object],
+                 inbox: Inbox, channel: str, workers: int = 4, lease: float = LEASE_SECONDS, poll: float = 0.5,
+                 max_attempts: int = 5, backoff: float = 2.0, backoff_cap: float = 300.0):
+        self.prepare = prepare
+        self.send = send
+        self.inbox = inbox
+        self.channel = channel
+        self.workers = workers
+        self.lease = lease
+        self.poll = poll
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_cap = backoff_cap
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._threads: List[threading.Thread] = []
+        # Leases held by this process: message id -> owner (one per worker thread)
+        self._held: Dict[int, str] = {}
+        self._wake = threading.Condition()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._next_prune = 0.0
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Threads do not survive a fork; the child starts its own on first use
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._threads = []
+        self._held = {}
+        self._wake = threading.Condition()
+        self._lock = threading.Lock()
+
+    def submit(self, sid: str, sender: str, form: Dict[str, str]) -> bool:
+        """Queue a webhook for the workers; False for a duplicate (Twilio retry)"""
+        if not self.inbox.add(self.channel, sid, sender, form):
+            WEBHOOKS.inc(self.channel, 'duplicate')
+            logger.info(f"Duplicate {self.channel} webhook {sid} ignored")
+            return False
+        WEBHOOKS.inc(self.channel, 'queued')
+        self.start()
+        with self._wake:
+            self._wake.notify()
+        return True
+
+    def start(self):
+        """Start the workers; they also pick up messages left by a crash or restart"""
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._work, args=(f"{self.owner}/{i}",), name=f'{self.channel}-webhook-{i}',
+                                 daemon=True)
+                for i in range(self.workers)
+            ]
+            self._threads.append(threading.Thread(target=self._heartbeat, name=f'{self.channel}-webhook-lease',
+                                                  daemon=True))
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._wake:
+            self._wake.notify_all()
+
+    def _work(self, owner: str):
+        while not self._stop.is_set():
+            try:
+                if self._work_once(owner) is None:
+                    self._idle()
+            except Exception as e:
+                logger.error(f"Webhook queue error: {str(e)}")
+                self._stop.wait(self.poll)
+
+    def _work_once(self, owner: str) -> Optional[str]:
+        """Claim and handle one message; its result, or None if nothing was due"""
+        claimed = self.inbox.claim(self.channel, owner, self.lease)
+        if claimed is None:
+            return None
+        message_id, form, received, reply, attempts = claimed
+        if attempts == 0:
+            QUEUE_DELAY.observe(time.time() - received, self.channel)
+        with self._lock:
+            self._held[message_id] = owner
+        try:
+            result = self._handle(message_id, owner, form, reply, attempts)
+        finally:
+            with self._lock:
+                self._held.pop(message_id, None)
+        if result == 'lease_lost':
+            # Another worker took it over and may answer it again
+            logger.warning(f"Queued {self.channel} webhook {message_id}: lease lost while processing")
+        WEBHOOKS.inc(self.channel, result)
+        return result
+
+    def _handle(self, message_id: int, owner: str, form: Dict[str, str], reply: Optional[Dict],
+                attempts: int) -> str:
+        if reply is None:
+            try:
+                reply = self.prepare(form)
+            except Exception as e:
+                logger.error(f"Queued {self.channel} webhook error: {str(e)}")
+                return 'failed' if self.inbox.finish(message_id, owner, str(e)) else 'lease_lost'
+            if not self.inbox.checkpoint(message_id, owner, reply):
+                return 'lease_lost'
+        try:
+            self.send(form, reply)
+        except Exception as e:
+            attempts += 1
+            if is_retryable(e) and attempts < self.max_attempts:
+                delay = min(self.backoff_cap, self.backoff * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+                logger.warning(f"Queued {self.channel} reply {message_id} not sent, retrying in {delay:.0f}s: {str(e)}")
+                return 'retry' if self.inbox.retry(message_id, owner, delay, str(e)) else 'lease_lost'
+            logger.error(f"Queued {self.channel} reply {message_id} not sent: {str(e)}")
+            return 'failed' if self.inbox.finish(message_id, owner, str(e)) else 'lease_lost'
+        return 'processed' if self.inbox.finish(message_id, owner) else 'lease_lost'
+
+    def _heartbeat(self):
+        # Renew the leases of messages in progress until they finish
+        while not self._stop.wait(self.lease / 3):
+            with self._lock:
+                held = list(self._held.items())
+            for message_id, owner in held:
+                try:
+                    if not self.inbox.renew(message_id, owner, self.lease):
+                        logger.warning(f"Queued {self.channel} webhook {message_id}: lease lost")
+                except Exception as e:
+                    logger.error(f"Webhook queue lease renewal error: {str(e)}")
+
+    def _idle(self):
+        # Other processes' messages are only seen by polling
+        now = time.time()
+        if now >= self._next_prune:
+            self._next_prune = now + 3600
+            self.inbox.prune()
+        with self._wake:
+            self._wake.wait(self.poll)
+
+    def get_stats(self) -> Dict:
+        oldest = self.inbox.oldest_pending(self.channel)
+        return {
+            'workers': max(len(self._threads) - 1, 0),
+            **self.inbox.counts(self.channel),
+            'oldest_pending_seconds': round(time.time() - oldest, 1) if oldest else 0
+        }
+
+
+def create_webhook_queue(prepare: Callable[[Dict[str, str]], Dict], send: Callable[[Dict[str, str], Dict], object],
+                         channel: str) -> WebhookQueue:
+    """Queue configured from WEBHOOK_QUEUE_* environment variables"""
+    inbox = Inbox(os.getenv('WEBHOOK_QUEUE_PATH', DEFAULT_INBOX_PATH),
+                  retention=float(os.getenv('WEBHOOK_QUEUE_RETENTION_HOURS', 24)) * 3600)
+    return WebhookQueue(prepare, send, inbox, channel, workers=int(os.getenv('WEBHOOK_QUEUE_WORKERS', 4)),
+                        max_attempts=int(os.getenv('WEBHOOK_QUEUE_MAX_ATTEMPTS', 5)),
+                        backoff=float(os.getenv('WEBHOOK_QUEUE_BACKOFF', 2.0)))
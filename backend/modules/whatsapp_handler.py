@@ -7,15 +7,27 @@ import os
 import json
 import logging
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional, Tuple
 from twilio.rest import Client
+from twilio.request_validator import RequestValidator
 from twilio.twiml.messaging_response import MessagingResponse
 from flask import request, jsonify
+from modules.bulkhead import bulkhead
+from modules.session_store import create_session_store, register_session_type
+from modules.usage_stats import ChannelUsage
+from modules.subscriptions import get_subscription_registry
+from modules.command_parser import get_command_parser
+from modules.broadcast import BroadcastEngine, DEFAULT_QUEUE_PATH, create_broadcast_engine
+from modules.webhook_queue import WebhookQueue, create_webhook_queue
+from modules.media_pipeline import MediaRejected, create_media_pipeline
+from modules.conversation_history import (
+    ConversationHistory, Turn, DEFAULT_DEPTH as HISTORY_DEPTH, create_history_archive
+)
 
 logger = logging.getLogger(__name__)
 
 class WhatsAppHandler:
-    def __init__(self):
+    def __init__(self, voice_handler=None, chat: Optional[Callable[[Dict], Dict]] = None):
         self.account_sid = os.getenv('TWILIO_ACCOUNT_SID')
         self.auth_token = os.getenv('TWILIO_AUTH_TOKEN')
         self.whatsapp_number = os.getenv('TWILIO_WHATSAPP_NUMBER', 'whatsapp:+14155238886')
@@ -23,12 +35,132 @@ class WhatsAppHandler:
         # Initialize Twilio client
         if self.account_sid and self.auth_token:
             self.client = Client(self.account_sid, self.auth_token)
+            # Point at a local Twilio stand-in for load tests
+            if os.getenv('TWILIO_API_BASE_URL'):
+                self.client.api.base_url = os.getenv('TWILIO_API_BASE_URL')
+            # Webhooks must carry Twilio's signature
+            self.validator = RequestValidator(self.auth_token)
         else:
             self.client = None
+            self.validator = None
             logger.warning("Twilio credentials not found. WhatsApp functionality will be limited.")
         
-        # User session management
-        self.user_sessions = {}
+        # User sessions, shared across workers when SESSION_STORE is set
+        self.session_ttl_hours = int(os.getenv('WHATSAPP_SESSION_TTL_HOURS', 24))
+        self.user_sessions = create_session_store('whatsapp', ttl=self.session_ttl_hours * 3600)
+        
+        # Bounded per-session history; older turns optionally spill to an archive
+        register_session_type(ConversationHistory)
+        self.history_depth = HISTORY_DEPTH
+        self.history_archive = create_history_archive()
+        
+        # Weather alert subscriptions, shared with SMS
+        self.subscriptions = get_subscription_registry()
+        
+        # Commands, language names, menu words and quick-reply emoji, shared with SMS
+        self.parser = get_command_parser()
+        
+        # Voice notes are transcribed and answered by the chat pipeline;
+        # answers optionally come back as audio too. Their media is fetched
+        # with the Twilio credentials, only for signed webhooks.
+        self.media = create_media_pipeline(voice_handler) if voice_handler and chat and self.client else None
+        self.chat = chat
+        # Also the address Twilio signs webhooks for when behind a proxy
+        self.public_base_url = os.getenv('PUBLIC_BASE_URL', '').rstrip('/')
+        self.voice_reply = os.getenv('WHATSAPP_VOICE_REPLY', 'false').lower() == 'true' and bool(self.public_base_url)
+        
+        # Broadcasts; any interrupted by a crash or restart are picked up by
+        # resume_broadcasts() in a serving worker, not here (the handler may
+        # be built in a preloading gunicorn master)
+        self._broadcasts: Optional[BroadcastEngine] = None
+        self.broadcast_queue_path = os.getenv('BROADCAST_QUEUE_PATH', DEFAULT_QUEUE_PATH)
+        
+        # Optionally ack webhooks at once and reply from a queue, so slow
+        # lookups never run into Twilio's webhook timeout
+        self.async_webhook = os.getenv('WHATSAPP_ASYNC_WEBHOOK', 'false').lower() == 'true'
+        if self.async_webhook and not self.client:
+            logger.warning("WHATSAPP_ASYNC_WEBHOOK needs Twilio credentials to reply; answering inline")
+            self.async_webhook = False
+        # Its workers start with start_webhook_queue() or the first queued message
+        self._webhooks: Optional[WebhookQueue] = None
+        
+        # Usage counters, updated per message so stats never scan sessions
+        self.usage = ChannelUsage('whatsapp', active_window=3600, retention_window=self.session_ttl_hours * 3600)
+        
+        # Weather alert templates per language and safety level
+        self.alert_templates = {
+            'en': {
+                'dangerous': "🚨 *WEATHER ALERT*\n\n{description}\n💨 Wind: {wind_speed} km/h\n\n❌ *DO NOT GO FISHING*\nReturn to harbour if at sea.\n📞 Coast Guard: 1554",
+                'caution': "⚠️ *WEATHER CAUTION*\n\n{description}\n💨 Wind: {wind_speed} km/h\n\n⚠️ *Stay alert* and keep close to shore.\n📞 Coast Guard: 1554",
+                'safe': "🌤️ *WEATHER UPDATE*\n\n{description}\n💨 Wind: {wind_speed} km/h\n\n✅ Safe conditions"
+            },
+            'hi': {
+                'dangerous': "🚨 *मौसम चेतावनी*\n\n{description}\n💨 हवा: {wind_speed} km/h\n\n❌ *मछली पकड़ने न जाएं*\nसमुद्र में हैं तो बंदरगाह लौटें।\n📞 कोस्ट गार्ड: 1554",
+                'caution': "⚠️ *मौसम सावधानी*\n\n{description}\n💨 हवा: {wind_speed} km/h\n\n⚠️ *सतर्क रहें* और किनारे के पास रहें।\n📞 कोस्ट गार्ड: 1554",
+                'safe': "🌤️ *मौसम अपडेट*\n\n{description}\n💨 हवा: {wind_speed} km/h\n\n✅ सुरक्षित स्थिति"
+            },
+            'ta': {
+                'dangerous': "🚨 *வானிலை எச்சரிக்கை*\n\n{description}\n💨 காற்று: {wind_speed} km/h\n\n❌ *மீன்பிடிக்க செல்ல வேண்டாம்*\nகடலில் இருந்தால் துறைமுகம் திரும்பவும்.\n📞 கடலோர காவல்படை: 1554",
+                'caution': "⚠️ *வானிலை முன்னெச்சரிக்கை*\n\n{description}\n💨 காற்று: {wind_speed} km/h\n\n⚠️ *கவனமாக இருங்கள்*, கரைக்கு அருகில் இருங்கள்.\n📞 கடலோர காவல்படை: 1554",
+                'safe': "🌤️ *வானிலை நிலவரம்*\n\n{description}\n💨 காற்று: {wind_speed} km/h\n\n✅ பாதுகாப்பான நிலை"
+            }
+        }
+        
+        # Weather alert subscription replies
+        self.alert_messages = {
+            'en': {
+                'help': "🔔 *Weather Alerts*\n\n📍 Share your location to get alerts for where you fish, or send */alerts <home port>* (e.g. /alerts Chennai).\n\nSend */alerts stop* to stop.",
+                'subscribed_location': "🔔 Weather alerts on for this location. Share a new location any time to move them.\n\nSend */alerts stop* to stop.",
+                'subscribed_port': "🔔 Weather alerts on for {port}.\n\nSend */alerts stop* to stop.",
+                'unsubscribed': "🔕 Weather alerts stopped.",
+                'unknown_port': "Port not found. Try /alerts Chennai, /alerts Kochi or share your location 📍"
+            },
+            'hi': {
+                'help': "🔔 *मौसम अलर्ट*\n\n📍 जहां आप मछली पकड़ते हैं वहां के अलर्ट के लिए अपना स्थान साझा करें, या */alerts <बंदरगाह>* भेजें (जैसे /alerts Chennai)।\n\nबंद करने के लिए */alerts stop* भेजें।",
+                'subscribed_location': "🔔 इस स्थान के लिए मौसम अलर्ट चालू। बदलने के लिए कभी भी नया स्थान साझा करें।\n\nबंद करने के लिए */alerts stop* भेजें।",
+                'subscribed_port': "🔔 {port} के लिए मौसम अलर्ट चालू।\n\nबंद करने के लिए */alerts stop* भेजें।",
+                'unsubscribed': "🔕 मौसम अलर्ट बंद।",
+                'unknown_port': "बंदरगाह नहीं मिला। /alerts Chennai, /alerts Kochi आज़माएं या अपना स्थान साझा करें 📍"
+            },
+            'ta': {
+                'help': "🔔 *வானிலை எச்சரிக்கை*\n\n📍 நீங்கள் மீன்பிடிக்கும் இடத்திற்கான எச்சரிக்கைகளுக்கு உங்கள் இருப்பிடத்தை பகிரவும், அல்லது */alerts <துறைமுகம்>* அனுப்பவும் (எ.கா. /alerts Chennai).\n\nநிறுத்த */alerts stop* அனுப்பவும்.",
+                'subscribed_location': "🔔 இந்த இடத்திற்கு வானிலை எச்சரிக்கை இயக்கப்பட்டது. மாற்ற எப்போது வேண்டுமானாலும் புதிய இருப்பிடத்தை பகிரவும்.\n\nநிறுத்த */alerts stop* அனுப்பவும்.",
+                'subscribed_port': "🔔 {port} வானிலை எச்சரிக்கை இயக்கப்பட்டது.\n\nநிறுத்த */alerts stop* அனுப்பவும்.",
+                'unsubscribed': "🔕 வானிலை எச்சரிக்கை நிறுத்தப்பட்டது.",
+                'unknown_port': "துறைமுகம் கிடைக்கவில்லை. /alerts Chennai, /alerts Kochi முயற்சிக்கவும் அல்லது உங்கள் இருப்பிடத்தை பகிரவும் 📍"
+            }
+        }
+        
+        # Voice note replies
+        self.voice_messages = {
+            'en': {
+                'media': "📸 Media received! I can answer text messages and voice notes 🎤. Please send your question as text or a voice note.",
+                'heard': "🎤 \"{transcript}\"\n\n{answer}",
+                'unheard': "🎤 Sorry, I couldn't hear any words in that voice note. Please speak clearly and try again, or type your question.",
+                'too_large': "🎤 That voice note is too large. Please send a shorter one.",
+                'too_long': "🎤 That voice note is too long. Please keep it under {seconds} seconds.",
+                'busy': "🎤 Many voice notes are coming in right now. Please send yours again in a minute, or type your question.",
+                'failed': "🎤 Sorry, I couldn't play that voice note. Please try again or type your question."
+            },
+            'hi': {
+                'media': "📸 मीडिया प्राप्त हुआ! मैं टेक्स्ट संदेशों और वॉइस नोट 🎤 का जवाब दे सकता हूं। कृपया अपना प्रश्न टेक्स्ट या वॉइस नोट में भेजें।",
+                'heard': "🎤 \"{transcript}\"\n\n{answer}",
+                'unheard': "🎤 क्षमा करें, उस वॉइस नोट में कोई शब्द सुनाई नहीं दिया। कृपया साफ़ बोलें और फिर से कोशिश करें, या अपना प्रश्न लिखें।",
+                'too_large': "🎤 यह वॉइस नोट बहुत बड़ा है। कृपया छोटा वॉइस नोट भेजें।",
+                'too_long': "🎤 यह वॉइस नोट बहुत लंबा है। कृपया {seconds} सेकंड से छोटा रखें।",
+                'busy': "🎤 अभी बहुत सारे वॉइस नोट आ रहे हैं। कृपया एक मिनट में फिर से भेजें, या अपना प्रश्न लिखें।",
+                'failed': "🎤 क्षमा करें, वह वॉइस नोट चल नहीं पाया। कृपया फिर से कोशिश करें या अपना प्रश्न लिखें।"
+            },
+            'ta': {
+                'media': "📸 மீடியா கிடைத்தது! நான் டெக்ஸ்ட் செய்திகளுக்கும் குரல் குறிப்புகளுக்கும் 🎤 பதிலளிக்க முடியும். உங்கள் கேள்வியை டெக்ஸ்ட் அல்லது குரல் குறிப்பாக அனுப்பவும்.",
+                'heard': "🎤 \"{transcript}\"\n\n{answer}",
+                'unheard': "🎤 மன்னிக்கவும், அந்த குரல் குறிப்பில் வார்த்தைகள் கேட்கவில்லை. தெளிவாக பேசி மீண்டும் முயற்சிக்கவும், அல்லது உங்கள் கேள்வியை தட்டச்சு செய்யவும்.",
+                'too_large': "🎤 அந்த குரல் குறிப்பு மிகப் பெரியது. சிறியதாக அனுப்பவும்.",
+                'too_long': "🎤 அந்த குரல் குறிப்பு மிக நீளமானது. {seconds} வினாடிகளுக்குள் வைக்கவும்.",
+                'busy': "🎤 இப்போது நிறைய குரல் குறிப்புகள் வருகின்றன. ஒரு நிமிடத்தில் மீண்டும் அனுப்பவும், அல்லது உங்கள் கேள்வியை தட்டச்சு செய்யவும்.",
+                'failed': "🎤 மன்னிக்கவும், அந்த குரல் குறிப்பை இயக்க முடியவில்லை. மீண்டும் முயற்சிக்கவும் அல்லது உங்கள் கேள்வியை தட்டச்சு செய்யவும்."
+            }
+        }
         
         # Quick reply templates
         self.quick_replies = {
@@ -126,59 +258,137 @@ class WhatsAppHandler:
     
     def handle_message(self, request) -> Any:
         """Handle incoming WhatsApp messages"""
+        if not self.is_from_twilio(request):
+            logger.warning("WhatsApp webhook without a valid Twilio signature rejected")
+            return str(MessagingResponse()), 403
+        
+        self.resume_broadcasts()
+        if self.async_webhook:
+            return self.enqueue_message(request.form)
+        
         try:
-            # Get message data
-            from_number = request.form.get('From', '')
-            to_number = request.form.get('To', '')
-            message_body = request.form.get('Body', '')
-            media_url = request.form.get('MediaUrl0', '')
-            
-            logger.info(f"WhatsApp message from {from_number}: {message_body}")
-            
-            # Get or create user session
-            user_session = self.get_user_session(from_number)
-            
-            # Process message
-            response_text = self.process_message(message_body, user_session, media_url)
-            
-            # Send response
-            return self.send_response(response_text, user_session)
+            return self.send_response(*self.respond(request.form))
             
         except Exception as e:
             logger.error(f"WhatsApp message handling error: {str(e)}")
             return self.send_error_response()
     
+    def is_from_twilio(self, request) -> bool:
+        """Check X-Twilio-Signature; without credentials there is nothing to check it against"""
+        if self.validator is None:
+            return True
+        url = request.url
+        if self.public_base_url:
+            # Behind a proxy Twilio signs the public address, not the one Flask sees
+            url = f"{self.public_base_url}{request.full_path.rstrip('?')}"
+        return self.validator.validate(url, request.form, request.headers.get('X-Twilio-Signature', ''))
+    
+    def respond(self, form) -> Tuple[str, Optional[str]]:
+        """Reply text and audio URL (or None) for one webhook; updates and saves the sender's session"""
+        # Get message data
+        from_number = form.get('From', '')
+        message_body = form.get('Body', '')
+        media_url = form.get('MediaUrl0', '')
+        media_type = form.get('MediaContentType0', '')
+        location = None
+        if form.get('Latitude') and form.get('Longitude'):
+            location = (float(form['Latitude']), float(form['Longitude']))
+        
+        logger.info(f"WhatsApp message from {from_number}: {message_body}")
+        
+        # Get or create user session
+        user_session = self.get_user_session(from_number)
+        new_user = user_session['conversation_history'].total == 0
+        
+        # Process message
+        response_text = self.process_message(message_body, user_session, media_url, location, media_type)
+        reply_media = user_session.pop('reply_media', None)
+        
+        # Add to conversation history
+        user_session['conversation_history'].append(
+            Turn('bot', response_text, media_url=reply_media or ''), self.history_archive, user_session['phone']
+        )
+        self.user_sessions.save(from_number, user_session)
+        self.usage.record(from_number, {
+            'language': user_session['language'],
+            'menu': user_session['current_menu']
+        }, new_user=new_user)
+        return response_text, reply_media
+    
+    @property
+    def webhooks(self) -> WebhookQueue:
+        """Inbound webhook queue, built on first use"""
+        if self._webhooks is None:
+            self._webhooks = create_webhook_queue(self.prepare_queued_reply, self.send_queued_reply, 'whatsapp')
+        return self._webhooks
+    
+    def start_webhook_queue(self):
+        """Start the queue workers, which also answer messages left by a crash or restart"""
+        if self.async_webhook:
+            self.webhooks.start()
+    
+    def enqueue_message(self, form) -> Any:
+        """Queue a webhook and acknowledge it with empty TwiML; a queue worker sends the reply"""
+        sid = form.get('MessageSid', '')
+        from_number = form.get('From', '')
+        if not sid or not from_number:
+            logger.warning("WhatsApp webhook without MessageSid or From rejected")
+            return str(MessagingResponse()), 400
+        
+        # A Twilio retry of a queued message is acknowledged again, not re-queued
+        self.webhooks.submit(sid, from_number, dict(form))
+        return str(MessagingResponse())
+    
+    def prepare_queued_reply(self, form: Dict[str, str]) -> Dict:
+        """Queue worker: compute the reply to one webhook, saving the session once"""
+        response_text, reply_media = self.respond(form)
+        return {'body': response_text, 'media_url': reply_media}
+    
+    def send_queued_reply(self, form: Dict[str, str], reply: Dict):
+        """Queue worker: send a prepared reply; raises so the queue can retry transient errors"""
+        if not self.client:
+            raise RuntimeError("Twilio client not initialized")
+        sid = self.send_whatsapp_part(form['From'], reply['body'], reply['media_url'])
+        logger.info(f"WhatsApp message sent: {sid}")
+    
     def get_user_session(self, phone_number: str) -> Dict:
-        """Get or create user session"""
-        if phone_number not in self.user_sessions:
-            self.user_sessions[phone_number] = {
+        """Get or create user session; the caller saves it back"""
+        user_session = self.user_sessions.get(phone_number)
+        if user_session is None:
+            user_session = {
                 'phone': phone_number,
                 'language': 'en',
                 'current_menu': 'main',
                 'context': {},
                 'last_activity': datetime.now(),
-                'conversation_history': []
+                'conversation_history': ConversationHistory(self.history_depth)
             }
+        else:
+            user_session['conversation_history'] = ConversationHistory.coerce(
+                user_session.get('conversation_history'), self.history_depth, self.history_archive, phone_number
+            )
         
         # Update last activity
-        self.user_sessions[phone_number]['last_activity'] = datetime.now()
+        user_session['last_activity'] = datetime.now()
         
-        return self.user_sessions[phone_number]
+        return user_session
     
-    def process_message(self, message: str, user_session: Dict, media_url: str = '') -> str:
+    def process_message(self, message: str, user_session: Dict, media_url: str = '',
+                        location: Optional[tuple] = None, media_type: str = '') -> str:
         """Process incoming message and generate response"""
         try:
             # Add to conversation history
-            user_session['conversation_history'].append({
-                'type': 'user',
-                'message': message,
-                'timestamp': datetime.now(),
-                'media_url': media_url
-            })
+            user_session['conversation_history'].append(
+                Turn('user', message, media_url=media_url), self.history_archive, user_session['phone']
+            )
+            
+            # Handle shared locations
+            if location:
+                return self.handle_location_message(location, user_session)
             
             # Handle media messages
             if media_url:
-                return self.handle_media_message(media_url, user_session)
+                return self.handle_media_message(media_url, user_session, media_type)
             
             # Handle text messages
             return self.handle_text_message(message, user_session)
@@ -189,171 +399,122 @@ class WhatsAppHandler:
     
     def handle_text_message(self, message: str, user_session: Dict) -> str:
         """Handle text messages"""
-        message_lower = message.lower().strip()
+        command = self.parser.parse(message, 'whatsapp')
+        intent = command.intent
         language = user_session['language']
         
         # Handle language change
-        if self.is_language_change_request(message_lower):
-            return self.handle_language_change(message_lower, user_session)
-        
-        # Handle menu navigation
-        if self.is_menu_navigation(message_lower):
-            return self.handle_menu_navigation(message_lower, user_session)
+        if intent == 'language':
+            return self.handle_language_change(command.arg, user_session)
         
-        # Handle quick replies
-        if self.is_quick_reply(message, user_session):
-            return self.handle_quick_reply(message, user_session)
-        
-        # Handle specific commands
-        if message_lower.startswith('/'):
-            return self.handle_command(message_lower, user_session)
-        
-        # Handle conversational queries
-        return self.handle_conversational_query(message, user_session)
-    
-    def handle_media_message(self, media_url: str, user_session: Dict) -> str:
-        """Handle media messages (images, audio, etc.)"""
-        try:
-            # For now, acknowledge media and provide instructions
-            language = user_session['language']
-            
-            if language == 'hi':
-                return "📸 मीडिया प्राप्त हुआ! अभी के लिए, कृपया टेक्स्ट संदेश भेजें। जल्द ही इमेज और वॉइस सपोर्ट आएगा।"
-            elif language == 'ta':
-                return "📸 मीडिया கிடைத்தது! தற்போது, தயவுசெய்து டெக்ஸ்ட் செய்திகளை அனுப்பவும். படம் மற்றும் குரல் ஆதரவு விரைவில் வரும்."
-            else:
-                return "📸 Media received! For now, please send text messages. Image and voice support coming soon."
-                
-        except Exception as e:
-            logger.error(f"Media handling error: {str(e)}")
-            return self.get_error_message(user_session['language'])
-    
-    def is_language_change_request(self, message: str) -> bool:
-        """Check if message is a language change request"""
-        language_keywords = [
-            'hindi', 'हिंदी', 'tamil', 'தமிழ்', 'english', 'language',
-            'भाषा', 'மொழி', 'change language', 'भाषा बदलें', 'மொழி மாற்று'
-        ]
-        
-        return any(keyword in message for keyword in language_keywords)
-    
-    def handle_language_change(self, message: str, user_session: Dict) -> str:
-        """Handle language change requests"""
-        if 'hindi' in message or 'हिंदी' in message:
-            user_session['language'] = 'hi'
-            return "✅ भाषा हिंदी में बदल गई है। मैं फिशरमेट हूं, आपका मछली पकड़ने का सहायक। मैं आपकी कैसे मदद कर सकता हूं?"
-        elif 'tamil' in message or 'தமிழ்' in message:
-            user_session['language'] = 'ta'
-            return "✅ மொழி தமிழில் மாற்றப்பட்டது। நான் ஃபிஷர்மேட், உங்கள் மீன்பிடித் துணை. நான் உங்களுக்கு எப்படி உதவ முடியும்?"
-        else:
-            user_session['language'] = 'en'
-            return "✅ Language changed to English. I'm FisherMate, your fishing assistant. How can I help you?"
-    
-    def is_menu_navigation(self, message: str) -> bool:
-        """Check if message is menu navigation"""
-        nav_keywords = ['menu', 'मेनू', 'மெனு', 'back', 'वापस', 'பின்னே', 'home', 'घर', 'வீடு']
-        return any(keyword in message for keyword in nav_keywords)
-    
-    def handle_menu_navigation(self, message: str, user_session: Dict) -> str:
-        """Handle menu navigation"""
-        if 'back' in message or 'वापस' in message or 'பின்னே' in message:
+        # Handle menu navigation and quick-reply buttons
+        if intent == 'menu':
             user_session['current_menu'] = 'main'
-            return self.get_main_menu(user_session['language'])
-        else:
-            return self.get_main_menu(user_session['language'])
-    
-    def is_quick_reply(self, message: str, user_session: Dict) -> bool:
-        """Check if message is a quick reply"""
-        language = user_session['language']
-        current_menu = user_session['current_menu']
-        
-        if current_menu in self.quick_replies.get(language, {}):
-            quick_replies = self.quick_replies[language][current_menu]
-            return any(reply in message for reply in quick_replies)
-        
-        return False
-    
-    def handle_quick_reply(self, message: str, user_session: Dict) -> str:
-        """Handle quick reply selections"""
-        language = user_session['language']
-        
-        # Weather quick replies
-        if '🌦️' in message or '🌤️' in message:
+            return self.get_main_menu(language)
+        elif intent == 'weather_menu':
             user_session['current_menu'] = 'weather'
             return self.get_weather_menu(language)
-        elif '📅' in message:
-            return self.get_weather_forecast(user_session)
-        elif '🌊' in message:
-            return self.get_marine_conditions(user_session)
-        
-        # Legal quick replies
-        elif '⚖️' in message or '🚫' in message:
+        elif intent == 'legal_menu':
             user_session['current_menu'] = 'legal'
             return self.get_legal_menu(language)
-        elif '📋' in message:
-            return self.get_license_info(user_session)
-        
-        # Safety quick replies
-        elif '🦺' in message or '✅' in message:
+        elif intent == 'safety_menu':
             user_session['current_menu'] = 'safety'
             return self.get_safety_menu(language)
-        elif '⚓' in message:
-            return self.get_safety_info(user_session)
-        
-        # Emergency
-        elif '🆘' in message:
-            return self.get_emergency_info(user_session)
-        
-        # Back/Home
-        elif '🔙' in message or '🏠' in message:
-            user_session['current_menu'] = 'main'
-            return self.get_main_menu(language)
         
-        else:
-            return self.handle_conversational_query(message, user_session)
-    
-    def handle_command(self, command: str, user_session: Dict) -> str:
-        """Handle slash commands"""
-        language = user_session['language']
-        
-        if command == '/start':
-            return self.get_welcome_message(language)
-        elif command == '/help':
-            return self.get_help_message(language)
-        elif command == '/weather':
+        # Handle commands and keywords
+        if intent == 'weather':
             return self.get_weather_info(user_session)
-        elif command == '/legal':
+        elif intent == 'forecast':
+            return self.get_weather_forecast(user_session)
+        elif intent == 'marine':
+            return self.get_marine_conditions(user_session)
+        elif intent == 'legal':
             return self.get_legal_info(user_session)
-        elif command == '/safety':
+        elif intent == 'license':
+            return self.get_license_info(user_session)
+        elif intent == 'safety':
             return self.get_safety_info(user_session)
-        elif command == '/emergency':
+        elif intent == 'emergency':
             return self.get_emergency_info(user_session)
-        else:
+        elif intent == 'alerts':
+            return self.handle_alerts_command(command.param, user_session)
+        elif intent in ('start', 'greeting'):
+            return self.get_welcome_message(language)
+        elif intent == 'help':
+            return self.get_help_message(language)
+        elif intent == 'unknown_command':
             return self.get_unknown_command_message(language)
+        
+        return self.get_default_response(language)
+    
+    def handle_media_message(self, media_url: str, user_session: Dict, media_type: str = '') -> str:
+        """Answer voice notes through the chat pipeline; acknowledge other media"""
+        language = user_session['language']
+        messages = self.voice_messages[language]
+        
+        if not media_type.startswith('audio/') or self.media is None:
+            return messages['media']
+        
+        try:
+            transcript = self.media.transcribe(media_url, language)
+            if not transcript:
+                return messages['unheard']
+            
+            response = self.chat({
+                'message': transcript,
+                'language': language,
+                'voice_response': self.voice_reply
+            })
+            
+            if response.get('audio_url'):
+                user_session['reply_media'] = f"{self.public_base_url}{response['audio_url']}"
+            return messages['heard'].format(transcript=transcript, answer=response.get('text', ''))
+            
+        except MediaRejected as e:
+            return messages[e.reason].format(seconds=int(self.media.max_seconds))
+        except Exception as e:
+            logger.error(f"Voice note handling error: {str(e)}")
+            return self.get_error_message(language)
     
-    def handle_conversational_query(self, message: str, user_session: Dict) -> str:
-        """Handle conversational queries using the main chatbot logic"""
+    def handle_location_message(self, location: tuple, user_session: Dict) -> str:
+        """Subscribe to weather alerts at a shared location, or move the subscription there"""
         try:
-            # This would integrate with the main chatbot logic
-            # For now, provide a simple response
-            language = user_session['language']
+            lat, lon = location
+            self.subscriptions.subscribe('whatsapp', user_session['phone'], lat, lon, user_session['language'])
+            return self.alert_messages[user_session['language']]['subscribed_location']
             
-            # Basic keyword matching
-            if any(word in message.lower() for word in ['weather', 'mausam', 'vanilai']):
-                return self.get_weather_info(user_session)
-            elif any(word in message.lower() for word in ['law', 'legal', 'kanoon', 'sattam']):
-                return self.get_legal_info(user_session)
-            elif any(word in message.lower() for word in ['safety', 'suraksha', 'padhukaapu']):
-                return self.get_safety_info(user_session)
-            elif any(word in message.lower() for word in ['emergency', 'help', 'madad', 'udavi']):
-                return self.get_emergency_info(user_session)
-            else:
-                return self.get_default_response(language)
-                
         except Exception as e:
-            logger.error(f"Conversational query error: {str(e)}")
+            logger.error(f"Location handling error: {str(e)}")
             return self.get_error_message(user_session['language'])
     
+    def handle_alerts_command(self, param: str, user_session: Dict) -> str:
+        """'/alerts <port>' subscribes by home port, '/alerts stop' unsubscribes"""
+        messages = self.alert_messages[user_session['language']]
+        
+        if not param:
+            return messages['help']
+        if param.lower() in ('stop', 'off'):
+            self.subscriptions.unsubscribe('whatsapp', user_session['phone'])
+            return messages['unsubscribed']
+        
+        subscription = self.subscriptions.subscribe_port('whatsapp', user_session['phone'], param,
+                                                         user_session['language'])
+        if subscription is None:
+            return messages['unknown_port']
+        return messages['subscribed_port'].format(port=subscription.port.title())
+    
+    def handle_language_change(self, language: str, user_session: Dict) -> str:
+        """Handle language change requests"""
+        user_session['language'] = language
+        self.subscriptions.set_language('whatsapp', user_session['phone'], language)
+        
+        if language == 'hi':
+            return "✅ भाषा हिंदी में बदल गई है। मैं फिशरमेट हूं, आपका मछली पकड़ने का सहायक। मैं आपकी कैसे मदद कर सकता हूं?"
+        elif language == 'ta':
+            return "✅ மொழி தமிழில் மாற்றப்பட்டது। நான் ஃபிஷர்மேட், உங்கள் மீன்பிடித் துணை. நான் உங்களுக்கு எப்படி உதவ முடியும்?"
+        else:
+            return "✅ Language changed to English. I'm FisherMate, your fishing assistant. How can I help you?"
+    
     def get_main_menu(self, language: str) -> str:
         """Get main menu"""
         if language == 'hi':
@@ -542,6 +703,64 @@ Example: "Chennai weather" or "Mumbai weather"
 
 Or type "Menu" for main menu."""
     
+    def get_weather_forecast(self, user_session: Dict) -> str:
+        """Get weather forecast information"""
+        language = user_session['language']
+        
+        if language == 'hi':
+            return """📅 **3-दिन का पूर्वानुमान**
+
+पूर्वानुमान के लिए कृपया अपना स्थान साझा करें या शहर का नाम भेजें।
+
+उदाहरण: "Chennai forecast" या "कोच्चि का पूर्वानुमान"
+
+या मुख्य मेनू के लिए "Menu" लिखें।"""
+        elif language == 'ta':
+            return """📅 **3-நாள் முன்னறிவிப்பு**
+
+முன்னறிவிப்புக்கு தயவுசெய்து உங்கள் இடத்தை பகிர்ந்து கொள்ளுங்கள் அல்லது நகரத்தின் பெயரை அனுப்பவும்.
+
+உதாரணம்: "Chennai forecast" அல்லது "கொச்சி முன்னறிவிப்பு"
+
+அல்லது முதன்மை மெனுவிற்கு "Menu" என்று எழுதுங்கள்."""
+        else:
+            return """📅 **3-Day Forecast**
+
+Please share your location or send city name for the forecast.
+
+Example: "Chennai forecast" or "Kochi forecast"
+
+Or type "Menu" for main menu."""
+    
+    def get_marine_conditions(self, user_session: Dict) -> str:
+        """Get marine conditions information"""
+        language = user_session['language']
+        
+        if language == 'hi':
+            return """🌊 **समुद्री स्थितियां**
+
+लहरों और हवा की जानकारी के लिए कृपया अपना स्थान साझा करें।
+
+⚠️ 40 km/h से तेज़ हवा में समुद्र में न जाएं।
+
+मौसम अलर्ट के लिए "/alerts" लिखें।"""
+        elif language == 'ta':
+            return """🌊 **கடல் நிலைமைகள்**
+
+அலை மற்றும் காற்று தகவலுக்கு தயவுசெய்து உங்கள் இடத்தை பகிர்ந்து கொள்ளுங்கள்.
+
+⚠️ 40 km/h க்கு மேல் காற்று வீசும்போது கடலுக்கு செல்ல வேண்டாம்.
+
+வானிலை எச்சரிக்கைகளுக்கு "/alerts" என்று எழுதுங்கள்."""
+        else:
+            return """🌊 **Marine Conditions**
+
+Please share your location for wave and wind information.
+
+⚠️ Do not go to sea when winds are above 40 km/h.
+
+Type "/alerts" for weather alerts."""
+    
     def get_legal_info(self, user_session: Dict) -> str:
         """Get legal information"""
         language = user_session['language']
@@ -571,6 +790,35 @@ Example: "Tamil Nadu rules" or "Kerala fishing laws"
 
 Or type "Menu" for main menu."""
     
+    def get_license_info(self, user_session: Dict) -> str:
+        """Get fishing license information"""
+        language = user_session['language']
+        
+        if language == 'hi':
+            return """📋 **लाइसेंस जानकारी**
+
+• नाव का पंजीकरण राज्य मत्स्य विभाग में कराएं
+• मछली पकड़ने का लाइसेंस हर साल नवीनीकृत करें
+• समुद्र में बायोमेट्रिक आईडी कार्ड साथ रखें
+
+अपने राज्य के नियमों के लिए राज्य का नाम भेजें, जैसे "Kerala fishing laws"।"""
+        elif language == 'ta':
+            return """📋 **உரிமம் தகவல்**
+
+• படகை மாநில மீன்வளத் துறையில் பதிவு செய்யுங்கள்
+• மீன்பிடி உரிமத்தை ஒவ்வொரு ஆண்டும் புதுப்பிக்கவும்
+• கடலில் பயோமெட்ரிக் அடையாள அட்டையை வைத்திருங்கள்
+
+உங்கள் மாநில விதிகளுக்கு மாநிலத்தின் பெயரை அனுப்பவும், எ.கா. "Kerala fishing laws"."""
+        else:
+            return """📋 **License Information**
+
+• Register your boat with the state Fisheries Department
+• Renew your fishing license every year
+• Carry your biometric ID card at sea
+
+Send your state for its rules, e.g. "Kerala fishing laws"."""
+    
     def get_safety_info(self, user_session: Dict) -> str:
         """Get safety information"""
         language = user_session['language']
@@ -671,6 +919,48 @@ Type "Safety checklist" for detailed information."""
         else:
             return "😔 Sorry, something went wrong. Please try again or type 'Menu'."
     
+    def get_help_message(self, language: str) -> str:
+        """Get help message listing the commands"""
+        if language == 'hi':
+            return """❓ **सहायता**
+
+/weather - मौसम जानकारी
+/legal - मछली पकड़ने के नियम
+/safety - सुरक्षा दिशा-निर्देश
+/emergency - आपातकालीन संपर्क
+/alerts - मौसम अलर्ट
+
+भाषा बदलने के लिए "Hindi", "English" या "Tamil" लिखें। मुख्य मेनू के लिए "Menu" लिखें।"""
+        elif language == 'ta':
+            return """❓ **உதவி**
+
+/weather - வானிலை தகவல்
+/legal - மீன்பிடி விதிகள்
+/safety - பாதுகாப்பு வழிகாட்டுதல்
+/emergency - அவசர தொடர்பு
+/alerts - வானிலை எச்சரிக்கைகள்
+
+மொழி மாற்ற "Hindi", "English" அல்லது "Tamil" என்று எழுதுங்கள். முதன்மை மெனுவிற்கு "Menu" என்று எழுதுங்கள்."""
+        else:
+            return """❓ **Help**
+
+/weather - Weather information
+/legal - Fishing regulations
+/safety - Safety guidelines
+/emergency - Emergency contacts
+/alerts - Weather alerts
+
+Type "Hindi", "English" or "Tamil" to change language. Type "Menu" for main menu."""
+    
+    def get_unknown_command_message(self, language: str) -> str:
+        """Get response for unrecognized slash commands"""
+        if language == 'hi':
+            return "🤔 यह कमांड पहचाना नहीं गया। सभी कमांड देखने के लिए /help लिखें।"
+        elif language == 'ta':
+            return "🤔 இந்த கட்டளை அடையாளம் காணப்படவில்லை. அனைத்து கட்டளைகளையும் பார்க்க /help என்று எழுதுங்கள்."
+        else:
+            return "🤔 Unknown command. Type /help to see all commands."
+    
     def get_default_response(self, language: str) -> str:
         """Get default response for unrecognized messages"""
         if language == 'hi':
@@ -680,19 +970,13 @@ Type "Safety checklist" for detailed information."""
         else:
             return "🤔 I didn't understand that. Please type 'Menu' or ask your question differently."
     
-    def send_response(self, message: str, user_session: Dict) -> Any:
+    def send_response(self, message: str, media_url: Optional[str] = None) -> Any:
         """Send response message"""
         try:
             response = MessagingResponse()
-            response.message(message)
-            
-            # Add to conversation history
-            user_session['conversation_history'].append({
-                'type': 'bot',
-                'message': message,
-                'timestamp': datetime.now()
-            })
-            
+            reply = response.message(message)
+            if media_url:
+                reply.media(media_url)
             return str(response)
             
         except Exception as e:
@@ -705,54 +989,110 @@ Type "Safety checklist" for detailed information."""
         response.message("Sorry, I'm having trouble right now. Please try again later.")
         return str(response)
     
-    def send_whatsapp_message(self, to_number: str, message: str) -> bool:
+    def send_whatsapp_part(self, to_number: str, body: str, media_url: Optional[str] = None) -> str:
+        """Send one WhatsApp message; raises on failure (TwilioRestException carries .status)"""
+        if not to_number.startswith('whatsapp:'):
+            to_number = f"whatsapp:{to_number}"
+        extra = {'media_url': [media_url]} if media_url else {}
+        with bulkhead('twilio'):
+            message = self.client.messages.create(
+                body=body,
+                from_=self.whatsapp_number,
+                to=to_number,
+                **extra
+            )
+        return message.sid
+    
+    def send_whatsapp_message(self, to_number: str, message: str, media_url: Optional[str] = None) -> bool:
         """Send WhatsApp message programmatically"""
         try:
             if not self.client:
                 logger.error("Twilio client not initialized")
                 return False
             
-            message = self.client.messages.create(
-                body=message,
-                from_=self.whatsapp_number,
-                to=f"whatsapp:{to_number}"
-            )
-            
-            logger.info(f"WhatsApp message sent: {message.sid}")
+            sid = self.send_whatsapp_part(to_number, message, media_url)
+            logger.info(f"WhatsApp message sent: {sid}")
             return True
             
         except Exception as e:
             logger.error(f"WhatsApp message sending error: {str(e)}")
             return False
     
+    def resume_broadcasts(self):
+        """Pick up broadcasts interrupted by a crash or restart; once per process"""
+        try:
+            if self.client and (self._broadcasts is not None or os.path.exists(self.broadcast_queue_path)):
+                self.broadcasts.resume_if_due()
+        except Exception as e:
+            logger.error(f"Broadcast resume error: {str(e)}")
+    
+    @property
+    def broadcasts(self) -> BroadcastEngine:
+        """Broadcast engine, built on first use"""
+        if self._broadcasts is None:
+            self._broadcasts = create_broadcast_engine(self.send_whatsapp_part, self.account_sid or 'default',
+                                                       channel='whatsapp')
+        return self._broadcasts
+    
+    def broadcast_whatsapp(self, numbers: list, message: str, wait: bool = True) -> Dict:
+        """Broadcast a WhatsApp message through the rate-limited, resumable queue"""
+        try:
+            if not self.client:
+                logger.error("Twilio client not initialized")
+                return {'success': [], 'failed': numbers, 'total': len(numbers)}
+            
+            job_id = self.broadcasts.submit(numbers, [message])
+            if not wait:
+                return self.broadcasts.progress(job_id)
+            
+            self.broadcasts.wait(job_id)
+            return self.broadcasts.results(job_id)
+            
+        except Exception as e:
+            logger.error(f"WhatsApp broadcast error: {str(e)}")
+            return {
+                'success': [],
+                'failed': numbers,
+                'total': len(numbers),
+                'error': str(e)
+            }
+    
+    def format_weather_alert(self, weather_data: Dict, language: str = 'en') -> str:
+        """Format weather alert for WhatsApp"""
+        try:
+            alert_level = weather_data.get('safety_level', 'unknown')
+            if alert_level not in ('dangerous', 'caution'):
+                alert_level = 'safe'
+            template = self.alert_templates.get(language, self.alert_templates['en'])[alert_level]
+            
+            return template.format(
+                description=weather_data.get('description', 'Weather update'),
+                wind_speed=weather_data.get('wind_speed', 0)
+            )
+            
+        except Exception as e:
+            logger.error(f"Weather alert formatting error: {str(e)}")
+            return "Weather alert service unavailable"
+    
     def get_user_stats(self) -> Dict:
         """Get user statistics"""
         try:
+            usage = self.usage.get_stats()
             stats = {
                 'total_users': len(self.user_sessions),
-                'active_users': 0,
-                'languages': {},
-                'menu_usage': {},
-                'conversation_counts': {}
+                # Distinct senders in the last hour (HyperLogLog estimate)
+                'active_users': usage['active_users'],
+                'languages': usage['users'].get('language', {}),
+                'menu_usage': usage['users'].get('menu', {}),
+                # Messages handled by this worker since it started
+                'total_messages': usage['messages']
             }
             
-            for session in self.user_sessions.values():
-                # Count active users (activity within last hour)
-                if (datetime.now() - session['last_activity']).total_seconds() < 3600:
-                    stats['active_users'] += 1
-                
-                # Language distribution
-                lang = session['language']
-                stats['languages'][lang] = stats['languages'].get(lang, 0) + 1
-                
-                # Menu usage
-                menu = session['current_menu']
-                stats['menu_usage'][menu] = stats['menu_usage'].get(menu, 0) + 1
-                
-                # Conversation counts
-                conv_count = len(session['conversation_history'])
-                stats['conversation_counts'][session['phone']] = conv_count
-            
+            stats['session_store'] = self.user_sessions.get_stats()
+            if self.async_webhook:
+                stats['webhook_queue'] = self.webhooks.get_stats()
+            if self.media is not None:
+                stats['voice_notes'] = self.media.get_stats()
             return stats
             
         except Exception as e:
@@ -763,20 +1103,14 @@ Type "Safety checklist" for detailed information."""
                 'active_users': 0
             }
     
-    def cleanup_old_sessions(self, max_age_hours: int = 24):
-        """Clean up old user sessions"""
+    def cleanup_old_sessions(self) -> int:
+        """Expire idle sessions now; this also runs on the session store's background tick"""
         try:
-            current_time = datetime.now()
-            sessions_to_remove = []
-            
-            for phone, session in self.user_sessions.items():
-                age_hours = (current_time - session['last_activity']).total_seconds() / 3600
-                if age_hours > max_age_hours:
-                    sessions_to_remove.append(phone)
+            expired = self.user_sessions.expire()
+            if expired:
+                logger.info(f"Cleaned up {expired} old sessions")
+            return expired
             
-            for phone in sessions_to_remove:
-                del self.user_sessions[phone]
-                logger.info(f"Cleaned up old session for {phone}")
-                
         except Exception as e:
             logger.error(f"Session cleanup error: {str(e)}")
+            return 0
@@ -0,0 +1,7 @@
+"""Make the backend packages (modules, benchmarks) importable as the app imports them"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'backend')
+sys.path.insert(0, os.path.abspath(BACKEND_DIR))
@@ -0,0 +1,169 @@
+"""
+Unit tests for modules.broadcast: the shared token bucket, job leases,
+retry classification, delivery and retention
+"""
+
+import threading
+import time
+
+import pytest
+
+from modules.broadcast import BroadcastEngine, BroadcastQueue, RateLimiter, is_retryable
+from modules.bulkhead import BulkheadFullError
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class StatusError(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return BroadcastQueue(str(tmp_path / 'broadcasts.db'))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr('modules.broadcast.time.time', clock)
+    return clock
+
+
+def test_token_bucket_burst_then_rate(queue, clock):
+    # 2 tokens/s, burst 2: two free sends, then each waits its turn
+    waits = [queue.take_tokens('acct', 1, rate=2, burst=2) for _ in range(4)]
+    assert waits == [0, 0, 0.5, 1.0]
+    clock.now += 1.0
+    assert queue.take_tokens('acct', 1, rate=2, burst=2) == pytest.approx(0.5)
+
+
+def test_token_bucket_refill_is_capped_at_burst(queue, clock):
+    queue.take_tokens('acct', 2, rate=1, burst=2)
+    clock.now += 60
+    assert queue.take_tokens('acct', 2, rate=1, burst=2) == 0
+    assert queue.take_tokens('acct', 1, rate=1, burst=2) == pytest.approx(1.0)
+
+
+def test_token_bucket_is_shared_by_every_worker(tmp_path, clock):
+    # Two workers, each with its own connection to the same queue file
+    path = str(tmp_path / 'broadcasts.db')
+    first, second = BroadcastQueue(path), BroadcastQueue(path)
+    assert first.take_tokens('acct', 1, rate=1, burst=1) == 0
+    assert second.take_tokens('acct', 1, rate=1, burst=1) == pytest.approx(1.0)
+    assert first.take_tokens('acct', 1, rate=1, burst=1) == pytest.approx(2.0)
+    # Other accounts have their own bucket
+    assert second.take_tokens('other', 1, rate=1, burst=1) == 0
+
+
+def test_pause_holds_every_sender(queue, clock):
+    queue.take_tokens('acct', 0, rate=10, burst=10)
+    RateLimiter(queue, 'acct', rate=10).pause(5)
+    assert queue.take_tokens('acct', 1, rate=10, burst=10) == pytest.approx(5.0)
+    clock.now += 5
+    assert queue.take_tokens('acct', 1, rate=10, burst=10) == 0
+
+
+@pytest.mark.parametrize('error, retryable', [
+    (StatusError(429), True),
+    (StatusError(500), True),
+    (StatusError(503), True),
+    (StatusError(400), False),
+    (StatusError(404), False),
+    (ConnectionError('reset'), True),
+    (TimeoutError('read timed out'), True),
+    (OSError('network unreachable'), True),
+    (BulkheadFullError('twilio', 'full'), True),
+    (TypeError('unexpected keyword'), False),
+    (KeyError('sid'), False),
+    (ValueError('bad body'), False)
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+def test_lease_is_exclusive_until_it_expires(queue, clock):
+    job_id = queue.create_job(['+911'], ['hello'])
+    assert queue.acquire_lease(job_id, 'worker-a', seconds=30)
+    assert not queue.acquire_lease(job_id, 'worker-b', seconds=30)
+    # The holder renews
+    clock.now += 20
+    assert queue.acquire_lease(job_id, 'worker-a', seconds=30)
+    clock.now += 20
+    assert not queue.acquire_lease(job_id, 'worker-b', seconds=30)
+    # A dead holder's lease runs out and another worker takes the job
+    clock.now += 31
+    assert queue.acquire_lease(job_id, 'worker-b', seconds=30)
+    assert not queue.acquire_lease(job_id, 'worker-a', seconds=30)
+
+
+def test_requeue_inflight_and_claim(queue):
+    job_id = queue.create_job(['+911', '+912', '+913'], ['hello'])
+    claimed = queue.claim(job_id, 2)
+    assert len(claimed) == 2
+    assert queue.counts(job_id)['sending'] == 2
+    assert len(queue.claim(job_id, 10)) == 1
+    assert queue.requeue_inflight(job_id) == 3
+    assert queue.counts(job_id)['pending'] == 3
+
+
+def test_prune_forgets_old_finished_jobs(tmp_path, clock):
+    queue = BroadcastQueue(str(tmp_path / 'broadcasts.db'), retention=3600)
+    old = queue.create_job(['+911', '+912'], ['hello'])
+    queue.finish(old)
+    running = queue.create_job(['+913'], ['hello'])
+    clock.now += 3601
+    recent = queue.create_job(['+914'], ['hello'])
+    queue.finish(recent)
+    assert queue.prune() == 1
+    assert queue.get_job(old) is None and queue.numbers(old, 'pending') == []
+    assert queue.get_job(running) is not None
+    assert queue.get_job(recent) is not None
+
+
+def test_engine_retries_transient_errors_only(queue):
+    attempts = {}
+    lock = threading.Lock()
+
+    def send(number, body):
+        with lock:
+            attempts[number] = attempts.get(number, 0) + 1
+            count = attempts[number]
+        if number == '+91flaky' and count < 3:
+            raise StatusError(503)
+        if number == '+91invalid':
+            raise StatusError(400)
+        if number == '+91bug':
+            raise TypeError('send() got an unexpected keyword argument')
+
+    engine = BroadcastEngine(send, queue, RateLimiter(queue, 'acct', rate=1000), workers=2,
+                             max_attempts=5, backoff=0.01)
+    job_id = engine.submit(['+91ok', '+91flaky', '+91invalid', '+91bug'], ['part 1', 'part 2'])
+    progress = engine.wait(job_id, timeout=10, poll=0.02)
+    assert progress['status'] == 'finished'
+    results = engine.results(job_id)
+    assert sorted(results['success']) == ['+91flaky', '+91ok']
+    assert sorted(results['failed']) == ['+91bug', '+91invalid']
+    # Each non-retryable failure was tried once; the flaky number resumed from its first part
+    assert attempts['+91invalid'] == 1 and attempts['+91bug'] == 1
+    assert attempts['+91ok'] == 2
+    assert attempts['+91flaky'] == 4
+
+
+def test_engine_paces_sends_at_the_account_rate(queue):
+    sent = []
+    engine = BroadcastEngine(lambda number, body: sent.append(time.monotonic()), queue,
+                             RateLimiter(queue, 'acct', rate=20, burst=1), workers=4)
+    started = time.monotonic()
+    engine.wait(engine.submit([f"+91{i}" for i in range(6)], ['hi']), timeout=10, poll=0.02)
+    assert len(sent) == 6
+    # One free token, then five at 20/s
+    assert sent[-1] - started >= 0.2
@@ -0,0 +1,115 @@
+"""
+Unit tests for modules.command_parser: one table of (message, channel)
+and the Command the SMS and WhatsApp handlers dispatch on
+"""
+
+import pytest
+
+from modules.command_parser import SMS, WHATSAPP, CommandParser, get_command_parser
+
+CASES = [
+    # Whole tokens only: 'this' is not 'hi', 'history' is not 'hi'
+    ('this', WHATSAPP, (None, None, '')),
+    ('this is rough', WHATSAPP, (None, None, '')),
+    ('this', SMS, (None, None, '')),
+    ('history of ban', SMS, ('legal', None, '')),
+    ('what', SMS, (None, None, '')),
+    ('Welcome', WHATSAPP, (None, None, '')),
+    ('', SMS, (None, None, '')),
+
+    # 'hi' is Hindi only as a whole SMS; otherwise a greeting
+    ('hi', SMS, ('language', 'hi', '')),
+    ('HI', SMS, ('language', 'hi', '')),
+    ('hi there', SMS, ('greeting', None, '')),
+    ('hi', WHATSAPP, ('greeting', None, '')),
+
+    # 'tamil nadu' is a state, so a legal question, not a switch to Tamil
+    ('tamil nadu', SMS, ('legal', None, '')),
+    ('tamil nadu', WHATSAPP, ('legal', None, '')),
+    ('Tamil Nadu ban dates?', WHATSAPP, ('legal', None, '')),
+    ('tamil', WHATSAPP, ('language', 'ta', '')),
+    ('Tamil', SMS, ('language', 'ta', '')),
+    ('தமிழ்நாடு', WHATSAPP, ('legal', None, '')),
+    ('தமிழ்', WHATSAPP, ('language', 'ta', '')),
+
+    # Quick-reply buttons, with and without the emoji presentation selector (VS16)
+    ('🌦 Weather', WHATSAPP, ('weather_menu', None, '')),
+    ('🌦️ Weather', WHATSAPP, ('weather_menu', None, '')),
+    ('⚠ Alerts', WHATSAPP, ('alerts', None, '')),
+    ('⚠️ Alerts', WHATSAPP, ('alerts', None, '')),
+    ('⚖️ Legal Info', WHATSAPP, ('legal_menu', None, '')),
+    ('🦺 Safety', WHATSAPP, ('safety_menu', None, '')),
+    ('✅ Safety Checklist', WHATSAPP, ('safety', None, '')),
+    ('📅 Forecast', WHATSAPP, ('forecast', None, '')),
+    ('🌊 Marine Conditions', WHATSAPP, ('marine', None, '')),
+    ('📋 License Info', WHATSAPP, ('license', None, '')),
+    ('🆘 Emergency', WHATSAPP, ('emergency', None, '')),
+    ('🔙 Back', WHATSAPP, ('menu', None, '')),
+    ('🏠 Main Menu', WHATSAPP, ('menu', None, '')),
+    # A button emoji later in the message is not a button press
+    ('is it 🌊 rough', WHATSAPP, (None, None, '')),
+
+    # Slash commands; unknown ones keep their argument for the reply
+    ('/start', WHATSAPP, ('start', None, '')),
+    ('/help', WHATSAPP, ('help', None, '')),
+    ('/weather Chennai', WHATSAPP, ('weather', None, 'Chennai')),
+    ('/alerts stop', WHATSAPP, ('alerts', None, 'stop')),
+    ('/foo', WHATSAPP, ('unknown_command', None, '')),
+    ('/foo bar', WHATSAPP, ('unknown_command', None, 'bar')),
+    ('/WEATHERX', WHATSAPP, ('unknown_command', None, '')),
+    ('/weather', SMS, ('unknown_command', None, '')),
+
+    # SMS letter commands, alone or with a parameter (old process_sms_message paths)
+    ('W', SMS, ('weather', None, '')),
+    ('w', SMS, ('weather', None, '')),
+    ('W Chennai', SMS, ('weather', None, 'Chennai')),
+    ('W, Chennai', SMS, ('weather', None, 'Chennai')),
+    ('L Kerala', SMS, ('legal', None, 'Kerala')),
+    ('S storm', SMS, ('safety', None, 'storm')),
+    ('A Chennai', SMS, ('alerts', None, 'Chennai')),
+    ('A STOP', SMS, ('alerts', None, 'STOP')),
+    ('E', SMS, ('emergency', None, '')),
+    ('H', SMS, ('help', None, '')),
+    ('M', SMS, ('menu', None, '')),
+    ('EN', SMS, ('language', 'en', '')),
+    ('english', SMS, ('language', 'en', '')),
+    ('TA', SMS, ('language', 'ta', '')),
+    ('W Chennai', WHATSAPP, (None, None, '')),
+
+    # Free text keywords (old handle_text_query / WhatsApp keyword scans)
+    ('weather tomorrow please', SMS, ('weather', None, '')),
+    ('मौसम कैसा है', WHATSAPP, ('weather', None, '')),
+    ('வானிலை', SMS, ('weather', None, '')),
+    ('what is the law on trawling', WHATSAPP, ('legal', None, '')),
+    ('safety tips', SMS, ('safety', None, '')),
+    ('help me', WHATSAPP, ('emergency', None, '')),
+    ('emergency! help', SMS, ('emergency', None, '')),
+    ('namaste', SMS, ('greeting', None, '')),
+    ('menu', WHATSAPP, ('menu', None, '')),
+    ('back to weather', WHATSAPP, ('menu', None, '')),
+    ('change language', WHATSAPP, ('language', 'en', '')),
+    ('hindi me batao', WHATSAPP, ('language', 'hi', '')),
+    # Language beats topic, topic beats greeting, weather beats legal
+    ('hindi weather', WHATSAPP, ('language', 'hi', '')),
+    ('hello, weather?', WHATSAPP, ('weather', None, '')),
+    ('weather ban', SMS, ('weather', None, ''))
+]
+
+
+@pytest.mark.parametrize('message, channel, expected', CASES)
+def test_parse(message, channel, expected):
+    command = CommandParser().parse(message, channel)
+    assert (command.intent, command.arg, command.param) == expected
+
+
+def test_parse_is_memoized_per_channel():
+    parser = CommandParser(memo_size=2)
+    assert parser.parse('hi', SMS) is parser.parse('hi', SMS)
+    assert parser.parse('hi', WHATSAPP).intent == 'greeting'
+    # Past memo_size the memo starts over, with the same results
+    parser.parse('W', SMS)
+    assert parser.parse('hi', SMS).arg == 'hi'
+
+
+def test_shared_parser():
+    assert get_command_parser() is get_command_parser()
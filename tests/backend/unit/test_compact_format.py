@@ -0,0 +1,77 @@
+"""
+Unit tests for modules.compact_format: the MessagePack round trip and
+Accept negotiation
+"""
+
+import json
+from datetime import date, datetime, timezone
+
+import pytest
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+pytest.importorskip('msgpack')
+
+from modules.compact_format import FIELD_CODES, SCHEMA_VERSION, STRING_CODES, pack, unpack, wants_compact  # noqa: E402
+
+WEATHER = {
+    'location': {'name': 'Chennai', 'country': 'IN', 'coordinates': {'lat': 13.125, 'lon': 80.25}},
+    'current': {'temperature': 31.5, 'humidity': 74, 'description': 'light rain', 'wind_speed': 6.25},
+    'safety_assessment': {
+        'level': 'caution',
+        'issues': ['high_wind'],
+        'recommendations': [STRING_CODES[3], 'Custom advice from the harbour master']
+    },
+    'forecast': [{'date': '2026-10-19', 'temp_min': 26.0, 'temp_max': 32.0}],
+    'unlisted_field': None,
+    'error': False
+}
+
+
+def test_round_trip_restores_field_names_and_values():
+    assert unpack(pack(WEATHER)) == WEATHER
+
+
+def test_packed_payload_uses_short_codes_and_sentence_indexes():
+    import msgpack
+
+    envelope = msgpack.unpackb(pack(WEATHER), raw=False)
+    assert envelope['v'] == SCHEMA_VERSION
+    assessment = envelope['d'][FIELD_CODES['safety_assessment']]
+    assert assessment[FIELD_CODES['recommendations']] == [3, 'Custom advice from the harbour master']
+    assert 'unlisted_field' in envelope['d']
+
+
+def test_compact_is_smaller_than_json():
+    assert len(pack(WEATHER)) < len(json.dumps(WEATHER).encode()) * 0.7
+
+
+def test_dates_travel_as_epoch_seconds_and_iso_strings():
+    issued = datetime(2026, 10, 19, 6, 30, tzinfo=timezone.utc)
+    decoded = unpack(pack({'issued_at': issued, 'date': date(2026, 10, 19)}))
+    assert decoded == {'issued_at': int(issued.timestamp()), 'date': '2026-10-19'}
+
+
+def test_floats_are_sent_single_precision():
+    decoded = unpack(pack({'lat': 13.0827}))
+    assert decoded['lat'] == pytest.approx(13.0827, rel=1e-6)
+
+
+def test_unpack_rejects_another_schema_version():
+    import msgpack
+
+    with pytest.raises(ValueError):
+        unpack(msgpack.packb({'v': SCHEMA_VERSION + 1, 'd': {}}))
+
+
+@pytest.mark.parametrize('accept, expected', [
+    ('application/msgpack', True),
+    ('application/x-msgpack', True),
+    ('application/msgpack, application/json;q=0.5', True),
+    ('application/json, application/msgpack;q=0.5', False),
+    ('application/json', False),
+    ('*/*', False),
+    ('', False),
+])
+def test_wants_compact(accept, expected):
+    assert wants_compact(parse_accept_header(accept, MIMEAccept)) is expected
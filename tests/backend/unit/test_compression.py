@@ -0,0 +1,93 @@
+"""
+Unit tests for modules.compression: Accept-Encoding negotiation and the
+after-request compressor
+"""
+
+import gzip
+
+import pytest
+from flask import Flask, Response
+
+from modules import compression
+from modules.compression import ResponseCompressor, negotiate
+
+
+@pytest.fixture
+def encodings(monkeypatch):
+    # Independent of which optional codecs are installed
+    monkeypatch.setattr(compression, 'SUPPORTED_ENCODINGS', ['br', 'zstd', 'gzip'])
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('', None),
+    ('identity', None),
+    ('gzip', 'gzip'),
+    ('gzip, deflate, br', 'br'),
+    ('GZIP;q=1.0, br;q=0.5', 'gzip'),
+    ('br;q=0, gzip', 'gzip'),
+    ('zstd;q=0.9, gzip;q=0.9', 'zstd'),
+    ('*', 'br'),
+    ('*;q=0.5, br;q=0', 'zstd'),
+    ('gzip;q=bogus, zstd;q=0.1', 'zstd'),
+    ('deflate', None),
+])
+def test_negotiate(encodings, header, expected):
+    assert negotiate(header) == expected
+
+
+def test_negotiate_skips_unavailable_codecs(monkeypatch):
+    monkeypatch.setattr(compression, 'SUPPORTED_ENCODINGS', ['gzip'])
+    assert negotiate('br, gzip;q=0.1') == 'gzip'
+    assert negotiate('br, zstd') is None
+
+
+def test_compress_gzip_round_trip():
+    data = b'{"safety": "safe"}' * 100
+    assert gzip.decompress(compression.compress(data, 'gzip')) == data
+    assert gzip.decompress(compression.compress(data, 'gzip', static=True)) == data
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(compression, 'SUPPORTED_ENCODINGS', ['gzip'])
+    app = Flask(__name__)
+    ResponseCompressor(app, min_size=100)
+    body = '{"forecast": "calm"}' * 50
+
+    @app.route('/big')
+    def big():
+        return Response(body, mimetype='application/json')
+
+    @app.route('/small')
+    def small():
+        return Response('{}', mimetype='application/json')
+
+    @app.route('/image')
+    def image():
+        return Response(body, mimetype='image/png')
+
+    @app.route('/not-modified')
+    def not_modified():
+        return Response(status=304)
+
+    app.body = body
+    return app.test_client()
+
+
+def test_large_json_is_compressed(client):
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data).decode() == client.application.body
+
+
+def test_without_accept_encoding_the_body_is_identity(client):
+    response = client.get('/big')
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+
+@pytest.mark.parametrize('path', ['/small', '/image', '/not-modified'])
+def test_ineligible_responses_are_left_alone(client, path):
+    assert 'Content-Encoding' not in client.get(path, headers={'Accept-Encoding': 'gzip'}).headers
@@ -0,0 +1,69 @@
+"""
+Unit tests for modules.conversation_history: the ring buffer and the
+archive's retention
+"""
+
+import pytest
+
+from modules.conversation_history import ConversationHistory, HistoryArchive, Turn
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr('modules.conversation_history.time.time', clock)
+    return clock
+
+
+def archived(archive: HistoryArchive, key: str) -> list:
+    return [row[0] for row in archive._conn().execute(
+        "SELECT message FROM history WHERE key = ? ORDER BY timestamp", (key,)
+    )]
+
+
+def test_ring_keeps_the_newest_turns_and_spills_the_rest(tmp_path, clock):
+    archive = HistoryArchive(str(tmp_path / 'history.db'))
+    history = ConversationHistory(3)
+    for i in range(5):
+        history.append(Turn('user', f"m{i}", timestamp=clock.now + i), archive, '+91a')
+    assert [turn.message for turn in history] == ['m2', 'm3', 'm4']
+    assert history.total == 5
+    assert archived(archive, '+91a') == ['m0', 'm1']
+
+
+def test_archive_drops_turns_past_retention(tmp_path, clock):
+    archive = HistoryArchive(str(tmp_path / 'history.db'), retention=86400)
+    archive.add('+91a', Turn('user', 'old', timestamp=clock.now))
+    clock.now += 12 * 3600
+    archive.add('+91a', Turn('user', 'new', timestamp=clock.now))
+    clock.now += 18 * 3600
+    assert archive.prune() == 1
+    assert archived(archive, '+91a') == ['new']
+
+
+def test_archive_keeps_each_users_newest_turns(tmp_path, clock):
+    archive = HistoryArchive(str(tmp_path / 'history.db'), max_turns=2)
+    for i in range(4):
+        archive.add('+91a', Turn('user', f"a{i}", timestamp=clock.now + i))
+    archive.add('+91b', Turn('user', 'b0', timestamp=clock.now))
+    archive.prune()
+    assert archived(archive, '+91a') == ['a2', 'a3']
+    assert archived(archive, '+91b') == ['b0']
+
+
+def test_archive_prunes_hourly_from_add(tmp_path, clock):
+    archive = HistoryArchive(str(tmp_path / 'history.db'), max_turns=1)
+    archive.add('+91a', Turn('user', 'a0', timestamp=clock.now))
+    archive.add('+91a', Turn('user', 'a1', timestamp=clock.now + 1))
+    assert archived(archive, '+91a') == ['a0', 'a1']
+    clock.now += 3600
+    archive.add('+91a', Turn('user', 'a2', timestamp=clock.now))
+    assert archived(archive, '+91a') == ['a2']
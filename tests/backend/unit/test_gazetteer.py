@@ -0,0 +1,77 @@
+"""
+Unit tests for modules.gazetteer: place, harbour and state lookups as users type them
+"""
+
+import pytest
+
+from modules.gazetteer import Gazetteer, normalize
+from modules.subscriptions import find_port
+
+
+@pytest.fixture(scope='module')
+def gazetteer():
+    return Gazetteer()
+
+
+@pytest.mark.parametrize('query, name', [
+    ('Chennai', 'chennai'),
+    ('  CHENNAI!! ', 'chennai'),
+    ('Madras', 'chennai'),
+    ('tuticorin', 'thoothukudi'),
+    ('Port Blair', 'port blair'),
+    ('port-blair', 'port blair'),
+    ('சென்னை', 'chennai'),
+    ('कन्याकुमारी', 'kanyakumari'),
+    ('Rameshwaram', 'rameswaram'),
+    ('visakapatnam', 'visakhapatnam'),
+])
+def test_find_resolves_spellings_aliases_and_typos(gazetteer, query, name):
+    assert gazetteer.find(query).name == name
+
+
+@pytest.mark.parametrize('query', ['', 'xyzzy', 'london', '12345'])
+def test_find_rejects_unknown_places(gazetteer, query):
+    assert gazetteer.find(query) is None
+
+
+def test_normalize_keeps_native_script_vowel_signs():
+    assert normalize('தூத்துக்குடி') == 'தூத்துக்குடி'
+    assert normalize('Vasco-da-Gama') == 'vasco da gama'
+
+
+def test_find_harbour_only_matches_harbours(gazetteer):
+    assert gazetteer.find_harbour('Kasimedu').name == 'chennai'
+    assert gazetteer.find_harbour('Vizag').name == 'visakhapatnam'
+    # Inland cities and towns without a listed harbour do not match
+    assert gazetteer.find('Madurai') is not None
+    assert gazetteer.find_harbour('Madurai') is None
+    assert gazetteer.find_harbour('Pulicat') is None
+
+
+def test_harbours_keep_their_configured_order(gazetteer):
+    harbours = gazetteer.harbours()
+    assert [place.name for place in harbours[:3]] == ['chennai', 'puducherry', 'cuddalore']
+    assert all(place.harbour for place in harbours)
+
+
+@pytest.mark.parametrize('query, state', [
+    ('Tamil Nadu', 'Tamil Nadu'),
+    ('TN', 'Tamil Nadu'),
+    ('orissa', 'Odisha'),
+    ('केरल', 'Kerala'),
+    ('kochi', 'Kerala'),
+    ('Bombay', 'Maharashtra'),
+    ('kerela', 'Kerala'),
+])
+def test_find_state_by_state_or_place(gazetteer, query, state):
+    assert gazetteer.find_state(query) == state
+
+
+def test_find_state_unknown(gazetteer):
+    assert gazetteer.find_state('atlantis') is None
+
+
+def test_find_port_uses_the_shared_gazetteer():
+    place = find_port('cochin')
+    assert (place.name, place.state) == ('kochi', 'Kerala')
+    assert find_port('bengaluru') is None
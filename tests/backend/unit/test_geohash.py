@@ -0,0 +1,57 @@
+"""
+Unit tests for modules.geohash: encoding, tile bounds and circle cover
+"""
+
+import pytest
+
+from modules import geohash
+
+
+def test_encode_known_point():
+    assert geohash.encode(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+    assert geohash.encode(57.64911, 10.40744, 4) == 'u4pr'
+
+
+def test_tiles_nest_by_prefix():
+    fine = geohash.encode(13.0827, 80.2707, 9)
+    for precision in range(1, 9):
+        assert geohash.encode(13.0827, 80.2707, precision) == fine[:precision]
+
+
+def test_bbox_contains_the_point_and_matches_cell_size():
+    lat, lon = 8.0883, 77.5385
+    for precision in (4, 5, 9):
+        lat_min, lat_max, lon_min, lon_max = geohash.bbox(geohash.encode(lat, lon, precision))
+        assert lat_min <= lat < lat_max and lon_min <= lon < lon_max
+        height, width = geohash.cell_size(precision)
+        assert lat_max - lat_min == pytest.approx(height)
+        assert lon_max - lon_min == pytest.approx(width)
+
+
+def test_cover_includes_neighbouring_tiles_across_a_border():
+    # Just inside the east edge of a tile; the circle spills into the next one
+    lat_min, lat_max, lon_min, lon_max = geohash.bbox('tf34')
+    lat, lon = (lat_min + lat_max) / 2, lon_max - 0.01
+    tiles = geohash.cover(lat, lon, radius_km=5)
+    east = geohash.encode(lat, lon_max + 0.01, len(tiles[0]))
+    assert geohash.encode(lat, lon, len(tiles[0])) in tiles
+    assert east in tiles
+
+
+def test_cover_respects_max_tiles():
+    for radius in (1, 20, 100, 500):
+        tiles = geohash.cover(13.0827, 80.2707, radius, max_tiles=32)
+        assert 0 < len(tiles) <= 32
+        assert len({len(tile) for tile in tiles}) == 1
+
+
+def test_cover_wraps_the_antimeridian():
+    tiles = geohash.cover(0.0, 179.99, radius_km=10)
+    assert any(tile.startswith('8') for tile in tiles)
+    assert any(tile.startswith('2') for tile in tiles)
+
+
+def test_distance_km():
+    assert geohash.distance_km(13.0827, 80.2707, 13.0827, 80.2707) == 0
+    # Chennai to Kanyakumari is about 625 km as the crow flies
+    assert geohash.distance_km(13.0827, 80.2707, 8.0883, 77.5385) == pytest.approx(625, abs=15)
@@ -0,0 +1,56 @@
+"""
+Unit tests for modules.media_pipeline: the transcode timeout
+"""
+
+import os
+import time
+
+import pytest
+
+from modules.media_pipeline import MediaPipeline, MediaRejected
+
+
+def stuck_transcode(source: str, dest: str, max_seconds: float) -> float:
+    with open(dest + '.pid', 'w') as f:
+        f.write(str(os.getpid()))
+    time.sleep(60)
+    return 0.0
+
+
+def write_note(url: str, dest: str, max_bytes: int) -> int:
+    with open(dest, 'wb') as f:
+        f.write(b'OggS')
+    return 4
+
+
+def is_running(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # A killed child not yet reaped is a zombie ('Z')
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc'), reason='needs /proc')
+def test_transcode_timeout_kills_the_stuck_process(tmp_path, monkeypatch):
+    monkeypatch.setattr('modules.media_pipeline.transcode', stuck_transcode)
+    # Keep the work directory so the worker's pid file survives
+    monkeypatch.setattr('modules.media_pipeline.shutil.rmtree', lambda path, ignore_errors=False: None)
+    pipeline = MediaPipeline(voice_handler=None, transcode_timeout=1, workdir=str(tmp_path), fetch=write_note)
+    stuck = pipeline._pool()
+
+    with pytest.raises(MediaRejected) as rejected:
+        pipeline.transcribe('https://api.twilio.com/note')
+    assert rejected.value.reason == 'failed'
+
+    (pid_file,) = tmp_path.glob('voice-*/note.wav.pid')
+    pid = int(pid_file.read_text())
+    deadline = time.monotonic() + 5
+    while is_running(pid) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not is_running(pid)
+
+    # The next note gets a new pool
+    assert pipeline._pool() is not stuck
+    pipeline._pool().shutdown()
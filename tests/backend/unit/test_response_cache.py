@@ -0,0 +1,76 @@
+"""
+Unit tests for modules.response_cache: per-encoding ETags, If-None-Match
+matching and version-keyed rebuilds
+"""
+
+import gzip
+import json
+
+import pytest
+
+from modules.response_cache import CachedResponse, PrecomputedResponseCache
+
+
+@pytest.fixture
+def entry():
+    return CachedResponse('v1', b'{"state": "Kerala"}' * 50)
+
+
+def test_each_encoding_has_its_own_etag(entry):
+    assert entry.etag() == f'"{entry.digest}"'
+    assert entry.etag('gzip') == f'"{entry.digest}-gzip"'
+    assert entry.etag('br') != entry.etag('gzip')
+    assert CachedResponse('v2', entry.body).etag() == entry.etag()
+
+
+@pytest.mark.parametrize('header, encoding, expected', [
+    (None, None, False),
+    ('', None, False),
+    ('*', 'gzip', True),
+    ('"{digest}"', None, True),
+    ('W/"{digest}"', None, True),
+    ('"other", "{digest}-gzip"', 'gzip', True),
+    # Another representation's ETag does not revalidate this one
+    ('"{digest}"', 'gzip', False),
+    ('"{digest}-gzip"', 'br', False),
+    ('"{digest}-gzip"', None, False),
+    ('{digest}', None, False),
+])
+def test_matches(entry, header, encoding, expected):
+    if header is not None:
+        header = header.format(digest=entry.digest)
+    assert entry.matches(header, encoding) is expected
+
+
+def test_variants_are_compressed_once(entry):
+    body, cpu = entry.variant(None)
+    assert (body, cpu) == (entry.body, 0.0)
+    compressed, _ = entry.variant('gzip')
+    assert gzip.decompress(compressed) == entry.body
+    again, cpu = entry.variant('gzip')
+    assert again is compressed and cpu == 0.0
+
+
+def test_cache_rebuilds_only_when_the_version_changes():
+    builds = []
+    cache = PrecomputedResponseCache(lambda payload: json.dumps(payload).encode(), max_entries=2)
+
+    def builder():
+        builds.append(1)
+        return {'laws': len(builds)}
+
+    first = cache.get('kerala', 'v1', builder)
+    assert cache.get('kerala', 'v1', builder) is first
+    assert cache.get('kerala', 'v2', builder).body == b'{"laws": 2}'
+    assert cache.get_stats()['hits'] == 1 and len(builds) == 2
+
+
+def test_cache_does_not_keep_errors_and_evicts_least_recent():
+    cache = PrecomputedResponseCache(lambda payload: json.dumps(payload).encode(), max_entries=2)
+    assert cache.get('goa', 'v1', lambda: {'error': 'unavailable'}) is None
+    for key in ('a', 'b', 'c'):
+        cache.get(key, 'v1', lambda: {'ok': True})
+    assert cache.get_stats()['entries'] == 2
+    misses = cache.misses
+    cache.get('a', 'v1', lambda: {'ok': True})
+    assert cache.misses == misses + 1
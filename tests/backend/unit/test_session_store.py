@@ -0,0 +1,134 @@
+"""
+Unit tests for modules.session_store: the in-process store, the
+session codec, the tiered cache and the expiry ticker
+"""
+
+import sqlite3
+import sys
+from datetime import datetime
+
+from modules.session_store import (
+    ExpiryTicker, MemorySessionStore, SQLiteSessionStore, TieredSessionStore,
+    _deep_sizeof, decode_session, encode_session
+)
+
+
+def session(phone: str, language: str = 'en') -> dict:
+    return {'phone': phone, 'language': language, 'context': {}, 'last_activity': datetime(2025, 7, 17, 6, 30)}
+
+
+def test_codec_round_trip_keeps_datetimes():
+    original = session('+919800000000')
+    assert decode_session(encode_session(original)) == original
+
+
+def test_memory_store_lru_eviction():
+    store = MemorySessionStore(ttl=60, max_entries=2)
+    store.save('a', session('a'))
+    store.save('b', session('b'))
+    store.get('a')
+    store.save('c', session('c'))
+    assert store.get('b') is None
+    assert store.get('a') is not None and store.get('c') is not None
+    assert store.evicted == 1
+
+
+def test_memory_store_expired_session_is_gone(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('modules.session_store.time.time', lambda: now[0])
+    store = MemorySessionStore(ttl=60, tick=10)
+    store.save('a', session('a'))
+    now[0] += 61
+    assert store.get('a') is None
+    assert len(store) == 0
+
+
+def test_memory_store_size_is_kept_on_save_and_delete():
+    store = MemorySessionStore(ttl=60, max_entries=3)
+    sessions = {key: session(key) for key in 'abcd'}
+    for key, value in sessions.items():
+        store.save(key, value)
+    # 'a' was evicted; the total covers the three that remain
+    expected = sum(_deep_sizeof(sessions[key]) for key in 'bcd')
+    assert store.total_bytes == expected
+    assert store.get_stats()['memory_bytes'] == sys.getsizeof(store._entries) + expected
+
+    # Re-saving replaces the old size rather than adding to it
+    sessions['b']['context'] = {'topic': 'weather' * 100}
+    store.save('b', sessions['b'])
+    store.delete('c')
+    assert store.total_bytes == _deep_sizeof(sessions['b']) + _deep_sizeof(sessions['d'])
+
+    store.delete('b')
+    store.delete('d')
+    assert store.total_bytes == 0
+
+
+def test_tiered_store_rereads_a_session_saved_by_another_worker(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    worker_a = TieredSessionStore(SQLiteSessionStore(60, 'sms', path), local_ttl=60)
+    worker_b = TieredSessionStore(SQLiteSessionStore(60, 'sms', path), local_ttl=60)
+
+    worker_a.save('+91', session('+91'))
+    assert worker_b.get('+91')['language'] == 'en'
+    worker_a.save('+91', session('+91', 'hi'))
+
+    # B's cached copy is out of date, so it must not be served or written back
+    stale = worker_b.get('+91')
+    assert stale['language'] == 'hi'
+    assert worker_b.local_misses == 2
+
+    assert worker_b.get('+91')['language'] == 'hi'
+    assert worker_b.local_hits == 1
+
+
+def test_tiered_store_forgets_a_session_deleted_elsewhere(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    worker_a = TieredSessionStore(SQLiteSessionStore(60, 'sms', path), local_ttl=60)
+    worker_b = TieredSessionStore(SQLiteSessionStore(60, 'sms', path), local_ttl=60)
+    worker_a.save('+91', session('+91'))
+    worker_b.get('+91')
+    worker_a.delete('+91')
+    assert worker_b.get('+91') is None
+
+
+def test_sqlite_store_adds_the_version_column_to_an_old_table(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE sessions (namespace TEXT NOT NULL, key TEXT NOT NULL,"
+        " data TEXT NOT NULL, expires_at REAL NOT NULL,"
+        " PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+    )
+    conn.execute("INSERT INTO sessions VALUES ('sms', '+91', ?, 1e12)", (encode_session(session('+91')),))
+    conn.commit()
+    conn.close()
+
+    store = SQLiteSessionStore(60, 'sms', path)
+    assert store.get_versioned('+91') == (session('+91'), '')
+    version = store.save('+91', session('+91', 'ta'))
+    assert store.version('+91') == version != ''
+
+
+def test_expiry_ticker_waits_for_start(monkeypatch):
+    started = []
+    ticker = ExpiryTicker(interval=60)
+    monkeypatch.setattr(ticker, '_start', lambda: started.append(True) or setattr(ticker, '_thread', object()))
+
+    ticker.register(MemorySessionStore(ttl=60))
+    assert started == []
+    ticker.start()
+    ticker.register(MemorySessionStore(ttl=60))
+    assert started == [True]
+
+
+def test_expiry_ticker_is_not_restarted_after_fork(monkeypatch):
+    ticker = ExpiryTicker(interval=60)
+    monkeypatch.setattr(ticker, '_start', lambda: setattr(ticker, '_thread', object()))
+    ticker.register(MemorySessionStore(ttl=60))
+    ticker.start()
+
+    ticker._after_fork()
+    assert ticker._thread is None
+    ticker.register(MemorySessionStore(ttl=60))
+    assert ticker._thread is None
@@ -0,0 +1,125 @@
+"""
+Unit tests for modules.sms_encoding: encoding detection, segment
+accounting, numbered splitting and the GSM-7 fallback policy
+"""
+
+import re
+
+import pytest
+
+from modules.sms_encoding import (
+    GSM7, UCS2, count_segments, count_units, detect_encoding, plan_sms, prepare_text, strip_emoji, to_gsm7
+)
+
+TAMIL = 'புயல் எச்சரிக்கை'
+SUFFIX = re.compile(r' \((\d+)/(\d+)\)$')
+
+
+@pytest.mark.parametrize('text, encoding, units, segments', [
+    ('', GSM7, 0, 1),
+    ('a' * 160, GSM7, 160, 1),
+    ('a' * 161, GSM7, 161, 2),
+    ('a' * 306, GSM7, 306, 2),
+    ('a' * 307, GSM7, 307, 3),
+    # Extension characters cost an escape septet each
+    ('€' * 80, GSM7, 160, 1),
+    ('€' * 80 + 'a', GSM7, 161, 2),
+    ('{}' * 40 + '[', GSM7, 162, 2),
+    ('^' * 77, GSM7, 154, 1),
+    # One character outside GSM-7 turns the whole text into UCS-2
+    ('a' * 69 + 'ம', UCS2, 70, 1),
+    ('a' * 70 + 'ம', UCS2, 71, 2),
+    ('ம' * 134, UCS2, 134, 2),
+    ('ம' * 135, UCS2, 135, 3),
+    # Characters beyond the BMP are surrogate pairs: two code units
+    ('a' * 68 + '🌊', UCS2, 70, 1),
+    ('a' * 69 + '🌊', UCS2, 71, 2),
+    ('🌊' * 35, UCS2, 70, 1),
+    ('🌊' * 36, UCS2, 72, 2),
+    # ... and in UCS-2 an extension character is a single unit
+    ('€' * 69 + 'ம', UCS2, 70, 1)
+])
+def test_segment_boundaries(text, encoding, units, segments):
+    assert detect_encoding(text) == encoding
+    assert count_units(text) == units
+    assert count_segments(text) == segments
+
+
+@pytest.mark.parametrize('length, segments', [(160, 1), (161, 2), (1530, 10)])
+def test_plan_within_max_segments_is_one_unnumbered_message(length, segments):
+    text = 'a' * length
+    plan = plan_sms(text, fallback='off', max_segments=10)
+    assert plan.parts == [text]
+    assert plan.segments == [segments]
+
+
+def words(count: int) -> str:
+    return ' '.join(f"w{i:03d}" for i in range(count))
+
+
+def check_numbered(plan, max_segments: int, text: str):
+    total = len(plan.parts)
+    assert total > 1
+    for i, (part, segments) in enumerate(zip(plan.parts, plan.segments)):
+        assert SUFFIX.search(part).groups() == (str(i + 1), str(total))
+        assert segments == count_segments(part) <= max_segments
+    # Split at spaces only: nothing lost, nothing cut mid-word
+    body = ' '.join(SUFFIX.sub('', part) for part in plan.parts)
+    assert body == text
+
+
+@pytest.mark.parametrize('count', [40, 120, 300, 320, 330, 400])
+def test_overflow_is_split_into_numbered_messages(count):
+    text = words(count)
+    plan = plan_sms(text, fallback='off', max_segments=1)
+    check_numbered(plan, 1, text)
+
+
+def test_suffix_growing_a_digit_is_resplit():
+    # 1339 septets: nine 153-septet segments by size, but " (9/9)"
+    # suffixes and word breaks push it to ten parts, so every part is
+    # re-split for the longer " (10/10)"
+    text = ' '.join(['x'] * 670)
+    assert -(-count_units(text) // 153) == 9
+    plan = plan_sms(text, fallback='off', max_segments=1)
+    assert len(plan.parts) == 10
+    check_numbered(plan, 1, text)
+
+
+def test_overflow_ucs2_counts_surrogate_pairs():
+    text = ' '.join(['மழை 🌧'] * 60)
+    plan = plan_sms(text, fallback='off', max_segments=2)
+    assert plan.encoding == UCS2
+    check_numbered(plan, 2, text)
+
+
+@pytest.mark.parametrize('text, fallback, expected', [
+    # Already GSM-7: untouched in every mode
+    ('Wind 20 km/h', 'off', 'Wind 20 km/h'),
+    ('Wind 20 km/h', 'strip', 'Wind 20 km/h'),
+    # Typographic punctuation and meaningful emoji transliterate to GSM-7
+    ('“Stay ashore” — wind 40°', 'transliterate', '"Stay ashore" - wind 40 deg'),
+    ('\U0001f6a8 Cyclone ⚠️', 'transliterate', '!! Cyclone !'),
+    ('Fuel ₹100 \U0001f41f', 'transliterate', 'Fuel Rs100'),
+    ('ça va', 'transliterate', 'ca va'),
+    # off keeps them, and the text stays UCS-2
+    ('“Stay ashore”', 'off', '“Stay ashore”'),
+    # Tamil cannot become GSM-7: transliterate leaves it alone...
+    (TAMIL + ' \U0001f30a', 'transliterate', TAMIL + ' \U0001f30a'),
+    # ...strip still drops the emoji, a surrogate pair each
+    (TAMIL + ' \U0001f30a', 'strip', TAMIL),
+    ('\U0001f6a8 ' + TAMIL, 'strip', TAMIL)
+])
+def test_fallback_modes(text, fallback, expected):
+    assert prepare_text(text, fallback) == expected
+
+
+def test_fallback_changes_the_plan_encoding():
+    text = '“Stay ashore” ' + 'a' * 60
+    assert plan_sms(text, fallback='off').encoding == UCS2
+    assert plan_sms(text, fallback='transliterate').encoding == GSM7
+
+
+def test_to_gsm7_keeps_what_it_cannot_map():
+    assert to_gsm7(TAMIL) == TAMIL
+    assert strip_emoji('a \ufe0f\u200d b') == 'a b'
@@ -0,0 +1,62 @@
+"""
+Unit tests for modules.subscriptions: tile and radius lookups
+"""
+
+import pytest
+
+from modules import geohash
+from modules.subscriptions import SubscriptionRegistry, group_recipients, tile_of
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return SubscriptionRegistry(str(tmp_path / 'subscriptions.db'))
+
+
+def addresses(subscriptions) -> list:
+    return sorted(s.address for s in subscriptions)
+
+
+def test_in_tiles_matches_by_geohash_prefix(registry):
+    registry.subscribe('sms', '+91a', 13.0827, 80.2707)
+    registry.subscribe('sms', '+91b', 13.0830, 80.2710)
+    registry.subscribe('sms', '+91c', 8.0883, 77.5385)
+
+    chennai = tile_of(13.0827, 80.2707)
+    assert addresses(registry.in_tiles([chennai])) == ['+91a', '+91b']
+    assert addresses(registry.in_tiles([chennai, tile_of(8.0883, 77.5385)])) == ['+91a', '+91b', '+91c']
+    assert registry.tiles() == sorted({chennai, tile_of(8.0883, 77.5385)})
+
+
+def test_near_finds_neighbours_in_the_next_tile(registry):
+    lat_min, lat_max, lon_min, lon_max = geohash.bbox(tile_of(13.0827, 80.2707))
+    lat = (lat_min + lat_max) / 2
+    # Two boats 2 km apart on either side of a tile border
+    registry.subscribe('whatsapp', 'west', lat, lon_max - 0.009)
+    registry.subscribe('whatsapp', 'east', lat, lon_max + 0.009)
+    registry.subscribe('whatsapp', 'far', lat, lon_max + 0.5)
+    assert tile_of(lat, lon_max - 0.009) != tile_of(lat, lon_max + 0.009)
+
+    assert addresses(registry.near(lat, lon_max - 0.009, radius_km=5)) == ['east', 'west']
+
+
+def test_update_location_moves_the_subscription(registry):
+    registry.subscribe('sms', '+91a', 13.0827, 80.2707, port='Chennai')
+    assert registry.update_location('sms', '+91a', 8.0883, 77.5385)
+    assert not registry.update_location('sms', '+91missing', 8.0883, 77.5385)
+
+    moved = registry.get('sms', '+91a')
+    assert (moved.lat, moved.lon, moved.port) == (8.0883, 77.5385, None)
+    assert registry.in_tiles([tile_of(13.0827, 80.2707)]) == []
+
+
+def test_unsubscribe_and_grouping(registry):
+    registry.subscribe('sms', '+91a', 13.0, 80.0, language='ta')
+    registry.subscribe('sms', '+91b', 13.0, 80.0, language='ta')
+    registry.subscribe('whatsapp', '+91a', 13.0, 80.0)
+    assert group_recipients(registry.near(13.0, 80.0, 1)) == {
+        ('sms', 'ta'): ['+91a', '+91b'], ('whatsapp', 'en'): ['+91a']
+    }
+    assert registry.unsubscribe('sms', '+91b')
+    assert not registry.unsubscribe('sms', '+91b')
+    assert len(registry) == 2
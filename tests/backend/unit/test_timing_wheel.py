@@ -0,0 +1,57 @@
+"""
+Unit tests for modules.timing_wheel
+"""
+
+from modules.timing_wheel import TimingWheel
+
+
+def test_keys_expire_once_their_deadline_passes():
+    wheel = TimingWheel(tick=1, span=10, now=100)
+    wheel.schedule('a', 103)
+    wheel.schedule('b', 105.5)
+    assert wheel.advance(102) == []
+    assert wheel.advance(103) == ['a']
+    assert wheel.advance(105) == []
+    assert wheel.advance(106) == ['b']
+    assert len(wheel) == 0
+
+
+def test_reschedule_moves_the_deadline():
+    wheel = TimingWheel(tick=1, span=10, now=0)
+    wheel.schedule('a', 2)
+    wheel.schedule('a', 8)
+    assert wheel.advance(5) == []
+    assert 'a' in wheel
+    assert wheel.advance(8) == ['a']
+
+
+def test_cancel_removes_the_key():
+    wheel = TimingWheel(tick=1, span=10, now=0)
+    wheel.schedule('a', 2)
+    wheel.cancel('a')
+    wheel.cancel('missing')
+    assert 'a' not in wheel
+    assert wheel.advance(5) == []
+
+
+def test_deadline_beyond_the_span_waits_for_a_later_turn():
+    wheel = TimingWheel(tick=1, span=5, now=0)
+    # Filed in bucket 13 % 6 == 1, which the first turn visits before it is due
+    wheel.schedule('far', 13)
+    assert wheel.advance(6) == []
+    assert 'far' in wheel
+    assert wheel.advance(13) == ['far']
+
+
+def test_deadline_in_the_past_expires_on_next_advance():
+    wheel = TimingWheel(tick=1, span=10, now=50)
+    wheel.schedule('late', 40)
+    assert wheel.advance(50) == ['late']
+
+
+def test_long_pause_visits_every_bucket_once():
+    wheel = TimingWheel(tick=1, span=10, now=0)
+    for second in range(1, 11):
+        wheel.schedule(second, second)
+    assert sorted(wheel.advance(1000)) == list(range(1, 11))
+    assert len(wheel) == 0
@@ -0,0 +1,63 @@
+"""
+Unit tests for modules.usage_stats: HyperLogLog estimates, sliding
+windows and per-channel counters
+"""
+
+import pytest
+
+from modules.usage_stats import ChannelUsage, HyperLogLog, SlidingWindowHLL, hash_key
+
+
+@pytest.mark.parametrize('count', [0, 1, 10, 1000, 50000])
+def test_hyperloglog_estimate(count):
+    sketch = HyperLogLog(p=12)
+    for i in range(count):
+        sketch.add(f"+9198{i:08d}")
+    # ~1.6% standard error at p=12; allow four of them
+    assert abs(sketch.count() - count) <= max(1, 0.065 * count)
+
+
+def test_hyperloglog_ignores_repeats():
+    sketch = HyperLogLog()
+    for _ in range(100):
+        for i in range(50):
+            sketch.add(str(i))
+    assert abs(sketch.count() - 50) <= 2
+
+
+def test_hash_key_is_stable():
+    # Same value in every worker (unlike hash())
+    assert hash_key('+919800000000') == hash_key('+919800000000')
+    assert hash_key('a') != hash_key('b')
+
+
+def test_sliding_window_forgets_old_slices():
+    window = SlidingWindowHLL(window=100, buckets=10)
+    for i in range(200):
+        window.add_hash(hash_key(f"old{i}"), now=1000)
+    for i in range(50):
+        window.add_hash(hash_key(f"new{i}"), now=1050)
+    assert abs(window.count(now=1050) - 250) <= 12
+    # 1000 is out of the window at 1105, 1050 is still in
+    assert abs(window.count(now=1105) - 50) <= 3
+    assert window.count(now=1200) == 0
+
+
+def test_sliding_window_reuses_a_slot_for_a_new_epoch():
+    window = SlidingWindowHLL(window=10, buckets=2)
+    window.add_hash(hash_key('a'), now=0)
+    # Same slot, one full window later: the old registers are cleared first
+    window.add_hash(hash_key('b'), now=10)
+    assert window.count(now=10) == 1
+
+
+def test_channel_usage_counts_messages_and_senders():
+    usage = ChannelUsage('test', active_window=3600, retention_window=86400)
+    for i in range(30):
+        usage.record(f"+91{i % 10}", {'language': 'ta' if i % 2 else 'en'}, new_user=i < 10)
+    stats = usage.get_stats()
+    assert stats['messages'] == 30
+    assert stats['new_users'] == 10
+    assert stats['senders'] == 10
+    assert stats['active_users'] == 10
+    assert stats['users']['language'] == {'en': 5, 'ta': 5}
@@ -0,0 +1,166 @@
+"""
+Unit tests for modules.webhook_queue: duplicate MessageSids, per-sender
+order, leases and retried sends
+"""
+
+import pytest
+
+from modules.webhook_queue import Inbox, WebhookQueue
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class StatusError(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+@pytest.fixture
+def inbox(tmp_path):
+    return Inbox(str(tmp_path / 'inbox.db'))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr('modules.webhook_queue.time.time', clock)
+    return clock
+
+
+def form(sid: str, sender: str, body: str = 'hi') -> dict:
+    return {'MessageSid': sid, 'From': sender, 'Body': body}
+
+
+def make_queue(inbox, prepare=None, send=None, **kwargs) -> WebhookQueue:
+    return WebhookQueue(prepare or (lambda f: {'body': f['Body']}), send or (lambda f, reply: None),
+                        inbox, 'whatsapp', **kwargs)
+
+
+def test_duplicate_sid_is_not_queued_again(inbox):
+    queue = make_queue(inbox)
+    queue.start = lambda: None
+    assert queue.submit('SM1', '+91a', form('SM1', '+91a'))
+    assert not queue.submit('SM1', '+91a', form('SM1', '+91a'))
+    assert inbox.counts('whatsapp')['pending'] == 1
+
+
+def test_duplicate_sid_is_recognised_after_processing(inbox):
+    inbox.add('whatsapp', 'SM1', '+91a', form('SM1', '+91a'))
+    assert make_queue(inbox)._work_once('w/0') == 'processed'
+    assert not inbox.add('whatsapp', 'SM1', '+91a', form('SM1', '+91a'))
+
+
+def test_one_sender_at_a_time_oldest_first(inbox):
+    inbox.add('whatsapp', 'SM1', '+91a', form('SM1', '+91a', 'first'))
+    inbox.add('whatsapp', 'SM2', '+91a', form('SM2', '+91a', 'second'))
+    inbox.add('whatsapp', 'SM3', '+91b', form('SM3', '+91b'))
+
+    first = inbox.claim('whatsapp', 'w/0')
+    assert first[1]['Body'] == 'first'
+    # +91a has a message in flight, so the next worker gets +91b
+    assert inbox.claim('whatsapp', 'w/1')[1]['MessageSid'] == 'SM3'
+    assert inbox.claim('whatsapp', 'w/2') is None
+
+    inbox.finish(first[0], 'w/0')
+    assert inbox.claim('whatsapp', 'w/2')[1]['Body'] == 'second'
+
+
+def test_expired_lease_is_taken_over(inbox, clock):
+    inbox.add('whatsapp', 'SM1', '+91a', form('SM1', '+91a'))
+    message_id = inbox.claim('whatsapp', 'dead/0', seconds=60)[0]
+    clock.now += 30
+    assert inbox.claim('whatsapp', 'w/0') is None
+    clock.now += 31
+    assert inbox.claim('whatsapp', 'w/0')[0] == message_id
+    # The first owner can no longer record an outcome
+    assert not inbox.finish(message_id, 'dead/0')
+    assert not inbox.renew(message_id, 'dead/0')
+    assert inbox.finish(message_id, 'w/0')
+
+
+def test_renewed_lease_is_kept(inbox, clock):
+    inbox.add('whatsapp', 'SM1', '+91a', form('SM1', '+91a'))
+    message_id = inbox.claim('whatsapp', 'w/0', seconds=60)[0]
+    for _ in range(5):
+        clock.now += 40
+        assert inbox.renew(message_id, 'w/0', seconds=60)
+    assert inbox.claim('whatsapp', 'w/1') is None
+    assert inbox.finish(message_id, 'w/0')
+
+
+def test_transient_send_error_retries_without_preparing_again(inbox, clock, monkeypatch):
+    monkeypatch.setattr('modules.webhook_queue.random.uniform', lambda low, high: 1.0)
+    prepared, sent = [], []
+
+    def send(f, reply):
+        sent.append(reply)
+        if len(sent) < 3:
+            raise StatusError(503)
+
+    queue = make_queue(inbox, prepare=lambda f: prepared.append(f) or {'body': 'reply'}, send=send, backoff=2)
+    inbox.add('whatsapp', 'SM1', '+91a', form('SM1', '+91a'))
+    inbox.add('whatsapp', 'SM2', '+91a', form('SM2', '+91a'))
+
+    assert queue._work_once('w/0') == 'retry'
+    # The sender's next message waits behind the retry
+    assert queue._work_once('w/0') is None
+    clock.now += 2
+    assert queue._work_once('w/0') == 'retry'
+    clock.now += 3
+    assert queue._work_once('w/0') is None
+    clock.now += 1
+    assert queue._work_once('w/0') == 'processed'
+
+    assert len(prepared) == 1
+    assert sent == [{'body': 'reply'}] * 3
+    assert queue._work_once('w/0') == 'processed'
+    assert inbox.counts('whatsapp') == {'pending': 0, 'processing': 0, 'done': 2, 'failed': 0}
+
+
+def test_permanent_send_error_fails_at_once(inbox):
+    def send(f, reply):
+        raise StatusError(400)
+
+    inbox.add('whatsapp', 'SM1', '+91a', form('SM1', '+91a'))
+    assert make_queue(inbox, send=send)._work_once('w/0') == 'failed'
+    assert inbox.counts('whatsapp')['failed'] == 1
+
+
+def test_send_fails_after_max_attempts(inbox, clock):
+    def send(f, reply):
+        raise ConnectionError('reset')
+
+    queue = make_queue(inbox, send=send, max_attempts=2, backoff=1)
+    inbox.add('whatsapp', 'SM1', '+91a', form('SM1', '+91a'))
+    assert queue._work_once('w/0') == 'retry'
+    clock.now += 5
+    assert queue._work_once('w/0') == 'failed'
+
+
+def test_prepare_error_is_not_retried(inbox):
+    def prepare(f):
+        raise KeyError('language')
+
+    inbox.add('whatsapp', 'SM1', '+91a', form('SM1', '+91a'))
+    assert make_queue(inbox, prepare=prepare)._work_once('w/0') == 'failed'
+    assert inbox.counts('whatsapp')['failed'] == 1
+
+
+def test_stored_reply_is_sent_by_the_worker_taking_over(inbox, clock):
+    inbox.add('whatsapp', 'SM1', '+91a', form('SM1', '+91a'))
+    # A worker computed the reply, then died before sending it
+    message_id = inbox.claim('whatsapp', 'dead/0', seconds=60)[0]
+    inbox.checkpoint(message_id, 'dead/0', {'body': 'saved'})
+    clock.now += 61
+
+    sent = []
+    queue = make_queue(inbox, prepare=lambda f: pytest.fail('prepared twice'), send=lambda f, r: sent.append(r))
+    assert queue._work_once('w/0') == 'processed'
+    assert sent == [{'body': 'saved'}]